@@ -0,0 +1,3 @@
+"""
+Benchmarks for the sophisticated markdown parser
+"""
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Adversarial markdown corpus: malformed OCR-style sections that drive the
+parser's regexes into super-linear backtracking
+
+Each case is a small valid paper whose second question has one huge
+unbroken run of a pathological token as its solution. Run from the
+repository root to time every case in default and hardened mode; it exits
+non-zero unless hardened mode parses every case fully (three questions,
+none cut short by the question budget, question 2 with its four options
+and answer):
+
+    python -m benchmarks.adversarial --repeat 2000 --output adversarial.json
+
+or write the corpus out as markdown files (e.g. for ``--batch``):
+
+    python -m benchmarks.adversarial --write-dir corpus/
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+from test_md_parser import SophisticatedMarkdownParser
+
+# Pathological token per case; each is repeated ``repeat`` times
+ADVERSARIAL_CASES = {
+    'digit_run': '7',                      # \d+ rescanned from every digit
+    'open_paren_digits': '(1',             # option and marks digit patterns
+    'dotted_numbers': '1.',                # dotted option grammar
+    'numbered_options': '(1)',             # option markers with no answer
+    'lettered_options': 'A)',
+    'unclosed_markdown_image': '![](',     # [^)]+ scans to the end per marker
+    'unclosed_html_image': '<img src="',   # nested [^>]+/[^"]+ backtracking
+    'unclosed_latex_image': '\\includegraphics{',
+    'unclosed_fraction': '\\frac{',        # clean_markdown's \frac{...}{...}
+    'unclosed_math': '$x ',
+    'solution_markers': 'Solution ',
+    'answer_whitespace': 'Correct answer is ',
+}
+
+PAPER_TEMPLATE = """# JEE (Main)-2025 Session-1
+
+Time: 3 hrs. M.M: 300
+
+1. A well formed question about a circle of radius 2.
+(1) $4 \\pi$
+(2) $2 \\pi$
+(3) $\\pi$
+(4) $8 \\pi$
+Ans. (1)
+Sol. Area is $\\pi r^{2}=4 \\pi$
+
+2. Malformed OCR section
+(1) 1
+(2) 2
+(3) 3
+(4) 4
+Ans. (2)
+Sol. {payload}
+
+3. Another well formed question about a matrix.
+(1) 1
+(2) 2
+(3) 3
+(4) 4
+Ans. (3)
+Sol. Direct computation.
+"""
+
+
+def generate_case(name, repeat=2000):
+    return PAPER_TEMPLATE.replace('{payload}', ADVERSARIAL_CASES[name] * repeat)
+
+
+def generate_corpus(repeat=2000):
+    """{case name: markdown} for every adversarial case."""
+    return {name: generate_case(name, repeat) for name in ADVERSARIAL_CASES}
+
+
+def time_case(parser, content):
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        result = parser.parse_markdown_content(content)
+        seconds = time.perf_counter() - started
+    flagged = [question['questionIndex'] for question in result['questions'] if question.get('flags')]
+    return {'seconds': seconds, 'questions': len(result['questions']), 'flagged': flagged,
+            'problems': parse_problems(result)}
+
+
+def parse_problems(result):
+    """Ways a case's parse falls short of the paper it was generated from."""
+    problems = []
+    questions = result['questions']
+    if len(questions) != 3:
+        problems.append(f'{len(questions)} questions instead of 3')
+    for question in questions:
+        if question.get('flags'):
+            problems.append(f"question {question['questionIndex']} flagged {','.join(question['flags'])}")
+    malformed = next((question for question in questions if question['questionIndex'] == '2'), None)
+    if malformed is not None:
+        details = malformed['questionDetails'][0]
+        if len(details['possibleAnswers']) != 4 or details['correctAnswer'] != 'B':
+            problems.append(f"question 2 parsed with {len(details['possibleAnswers'])} options "
+                            f"and answer {details['correctAnswer']}")
+    return problems
+
+
+def run(repeat=2000, budget=None, cases=None, skip_default=()):
+    default_parser = SophisticatedMarkdownParser()
+    hardened_parser = SophisticatedMarkdownParser(hardened=True, question_budget=budget)
+    results = {}
+    for name in cases or ADVERSARIAL_CASES:
+        content = generate_case(name, repeat)
+        row = {'chars': len(content)}
+        # Some cases effectively never finish without a budget
+        if name not in skip_default:
+            row['default'] = time_case(default_parser, content)
+        row['hardened'] = time_case(hardened_parser, content)
+        results[name] = row
+        default_seconds = f"{row['default']['seconds']:8.3f}s" if 'default' in row else '  skipped'
+        print(f"{name:<24} default {default_seconds}  hardened {row['hardened']['seconds']:8.3f}s  "
+              f"flagged {','.join(row['hardened']['flagged']) or '-'}", file=sys.stderr)
+        for problem in row['hardened']['problems']:
+            print(f'❌ {name} (hardened): {problem}', file=sys.stderr)
+    return {
+        'repeat': repeat,
+        'questionBudget': hardened_parser.question_budget,
+        'results': results
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Time the parser on an adversarial markdown corpus')
+    arg_parser.add_argument('--repeat', type=int, default=2000, help='repetitions of the pathological token per case')
+    arg_parser.add_argument('--budget', type=float, default=None, help='hardened-mode CPU seconds per question')
+    arg_parser.add_argument('--cases', nargs='+', choices=list(ADVERSARIAL_CASES), help='cases to run (default: all)')
+    arg_parser.add_argument('--skip-default', nargs='*', default=['unclosed_html_image'], metavar='CASE',
+                            help='cases not to run without a budget (default: unclosed_html_image)')
+    arg_parser.add_argument('--write-dir', metavar='DIR', help='write the corpus as <case>.md files instead of timing it')
+    arg_parser.add_argument('--output', metavar='PATH', help="write results JSON to PATH (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    if args.write_dir:
+        os.makedirs(args.write_dir, exist_ok=True)
+        for name, content in generate_corpus(args.repeat).items():
+            with open(os.path.join(args.write_dir, f'{name}.md'), 'w', encoding='utf-8') as f:
+                f.write(content)
+        print(f'💾 {len(ADVERSARIAL_CASES)} adversarial papers written to: {args.write_dir}', file=sys.stderr)
+        return
+
+    report = run(args.repeat, args.budget, args.cases, set(args.skip_default))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'💾 Adversarial results saved to: {args.output}', file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    return 1 if any(row['hardened']['problems'] for row in report['results'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Ingest and query latency of the SQLite question bank
+
+Synthetic papers (spread over several years) are parsed once, written out
+as tutorial JSON and ingested into a fresh bank; each query is then timed
+over many runs. Run from the repository root:
+
+    python -m benchmarks.bank_bench --questions 100000 --output bank.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import statistics
+
+from question_bank import QuestionBank
+from test_md_parser import SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+YEARS = ['2019', '2020', '2021', '2022', '2023', '2024', '2025']
+
+# (label, search() keyword arguments); the filter values, tutorial and page
+# depth of the others come from the ingested data (see build_queries)
+QUERIES = [
+    ('common word', {'text': 'equation'}),
+    ('rare word', {'text': 'nucleus'}),
+    ('two words', {'text': 'capacitor circuit'}),
+    ('word + marks', {'text': 'polymer', 'marks': '4'}),
+    ('phrase', {'match': '"integral of"'}),
+    ('prefix', {'match': 'oxid*'}),
+]
+DEEP_PAGE_OFFSET = 1000
+
+
+def build_queries(bank, limit):
+    """QUERIES plus the filtered, one-tutorial and deep-page queries.
+
+    Their values are read back from the bank (a question matching
+    'velocity', a question from the middle of the bank, and how far the
+    'force' matches go), so each query has results even when --questions
+    covers only one or two papers.
+    """
+    total = bank.stats()['questions']
+    middle = bank.search(limit=1, offset=total // 2)[0]
+    velocity = (bank.search(text='velocity', limit=1) or [middle])[0]
+    force_matches = len(bank.search(text='force', limit=total))
+    return QUERIES + [
+        ('word + subject + year', {'text': 'velocity', 'subject': velocity['subject'], 'year': velocity['year']}),
+        ('filters only', {'subject': middle['subject'], 'year': middle['year'], 'marks': middle['marks']}),
+        ('one tutorial', {'tutorial_id': middle['tutorialId']}),
+        ('deep page', {'text': 'force', 'offset': max(0, min(DEEP_PAGE_OFFSET, force_matches - limit))}),
+    ]
+
+
+def write_tutorials(workdir, total_questions, paper_size):
+    """Parse synthetic papers and save their tutorial JSON; returns the paths."""
+    parser = SophisticatedMarkdownParser()
+    paths = []
+    for number in range(-(-total_questions // paper_size)):
+        year = YEARS[number % len(YEARS)]
+        content = generate_paper(paper_size, seed=number).replace('(Main)-2025', f'(Main)-{year}', 1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = parser.parse_markdown_content(content)
+        tutorial = parser.generate_json(result['examInfo'], result['questions'])
+        tutorial['tutorialId'] = f'bench_{year}_{number}'
+        path = os.path.join(workdir, f'tutorial_{number}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(tutorial, f, ensure_ascii=False)
+        paths.append(path)
+        print(f'   parsed paper {number + 1} ({year})', file=sys.stderr)
+    return paths
+
+
+def time_query(bank, arguments, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        results = bank.search(**arguments)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'results': len(results),
+        'medianMs': statistics.median(timings),
+        'p95Ms': timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1],
+        'maxMs': timings[-1]
+    }
+
+
+def run(total_questions=100000, paper_size=2000, runs=50, limit=20):
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = write_tutorials(workdir, total_questions, paper_size)
+        db_path = os.path.join(workdir, 'bank.sqlite')
+        bank = QuestionBank(db_path)
+        try:
+            started = time.perf_counter()
+            failures = [error for _, _, error in bank.ingest_paths(paths) if error]
+            ingest_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            bank.optimize()
+            optimize_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            list(bank.ingest_paths(paths))
+            reingest_seconds = time.perf_counter() - started
+            questions = bank.stats()['questions']
+            print(f'🗃️  {questions} questions ingested in {ingest_seconds:.2f}s '
+                  f'({questions / ingest_seconds:.0f}/s), unchanged re-ingest {reingest_seconds:.2f}s',
+                  file=sys.stderr)
+
+            queries = {}
+            for label, arguments in build_queries(bank, limit):
+                row = {'arguments': arguments, **time_query(bank, {'limit': limit, **arguments}, runs)}
+                queries[label] = row
+                print(f"{label:<24} {row['results']:>4} results  median {row['medianMs']:7.2f} ms  "
+                      f"p95 {row['p95Ms']:7.2f} ms", file=sys.stderr)
+                if not row['results']:
+                    print(f'⚠️  {label} returned nothing for {arguments}; its timing only measures a miss',
+                          file=sys.stderr)
+        finally:
+            bank.close()
+        database_bytes = os.path.getsize(db_path)
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'questions': questions,
+        'tutorials': len(paths),
+        'ingestFailures': failures,
+        'ingestSeconds': ingest_seconds,
+        'questionsPerSecond': questions / ingest_seconds,
+        'optimizeSeconds': optimize_seconds,
+        'unchangedReingestSeconds': reingest_seconds,
+        'databaseBytes': database_bytes,
+        'runs': runs,
+        'limit': limit,
+        'queries': queries
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmark question-bank ingestion and search')
+    arg_parser.add_argument('--questions', type=int, default=100000, help='total questions to index')
+    arg_parser.add_argument('--paper-size', type=int, default=2000, help='questions per synthetic paper')
+    arg_parser.add_argument('--runs', type=int, default=50, help='timed runs per query')
+    arg_parser.add_argument('--limit', type=int, default=20, help='results per query')
+    arg_parser.add_argument('--output', metavar='PATH', help="write results JSON to PATH (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    report = run(args.questions, args.paper_size, args.runs, args.limit)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'💾 Question bank results saved to: {args.output}', file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
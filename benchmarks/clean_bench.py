@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+clean_markdown throughput: the math-span tokenizer and LRU vs the old regex chain
+
+Every string clean_markdown sees while parsing a solution-heavy synthetic
+paper is recorded, then cleaned by the previous whole-string chain of six
+substitutions and by the current clean_markdown, both with a cold and a warm
+LRU. Full parse throughput is measured with each cleaner too. Run from the
+repository root:
+
+    python -m benchmarks.clean_bench --questions 2000 --math-density 0.5 --output clean.json
+"""
+
+import io
+import re
+import sys
+import json
+import argparse
+import platform
+import contextlib
+from datetime import datetime
+
+from test_md_parser import PARSER_VERSION, SophisticatedMarkdownParser
+from benchmarks.parser_bench import best_of
+from benchmarks.synthetic import generate_paper
+
+
+def legacy_clean_markdown(parser, text):
+    """clean_markdown as of PARSER_VERSION 2, for comparison."""
+    text = re.sub(r'\$\$([\s\S]*?)\$\$', r'$$\1$$', text)
+    text = re.sub(r'\$([^$]+)\$', r'$\1$', text)
+    text = re.sub(r'\\frac\{([^}]+)\}\{([^}]+)\}', r'(\1)/(\2)', text)
+    text = re.sub(r'\^([^{}\s]+)', r'^\1', text)
+    text = re.sub(r'_([^{}\s]+)', r'_\1', text)
+    text = parser.convert_latex_symbols(text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def recorded_strings(content):
+    parser = SophisticatedMarkdownParser()
+    strings = []
+    clean_markdown = parser.clean_markdown
+    parser.clean_markdown = lambda text: strings.append(text) or clean_markdown(text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser.extract_questions(content)
+    return strings
+
+
+def run(questions=2000, repeat=3, **paper_options):
+    content = generate_paper(questions, **paper_options)
+    strings = recorded_strings(content)
+
+    parser = SophisticatedMarkdownParser()
+    legacy_seconds, _ = best_of(repeat, lambda: [legacy_clean_markdown(parser, text) for text in strings])
+
+    def cold():
+        parser._cached_clean.cache_clear()
+        return [parser.clean_markdown(text) for text in strings]
+
+    cold_seconds, _ = best_of(repeat, cold)
+    cache = parser._cached_clean.cache_info()
+    warm_seconds, _ = best_of(repeat, lambda: [parser.clean_markdown(text) for text in strings])
+
+    legacy_parser = SophisticatedMarkdownParser()
+    legacy_parser.clean_markdown = lambda text: legacy_clean_markdown(legacy_parser, text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_parse_seconds, parsed = best_of(repeat, lambda: legacy_parser.extract_questions(content))
+        parse_seconds, _ = best_of(repeat, lambda: SophisticatedMarkdownParser().extract_questions(content))
+
+    return {
+        'parserVersion': PARSER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'repeat': repeat,
+        'paperOptions': paper_options,
+        'questions': len(parsed),
+        'strings': len(strings),
+        'chars': sum(len(text) for text in strings),
+        'legacyCleanSeconds': legacy_seconds,
+        'coldCleanSeconds': cold_seconds,
+        'warmCleanSeconds': warm_seconds,
+        'coldCacheHits': cache.hits,
+        'coldCacheMisses': cache.misses,
+        'cleanSpeedup': legacy_seconds / cold_seconds if cold_seconds else None,
+        'legacyParseSeconds': legacy_parse_seconds,
+        'parseSeconds': parse_seconds,
+        'legacyQuestionsPerSecond': len(parsed) / legacy_parse_seconds if legacy_parse_seconds else None,
+        'questionsPerSecond': len(parsed) / parse_seconds if parse_seconds else None
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmark clean_markdown against the old regex chain')
+    arg_parser.add_argument('--questions', type=int, default=2000)
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the fastest is kept')
+    arg_parser.add_argument('--math-density', type=float, default=0.5, help='share of stem/solution tokens that are math')
+    arg_parser.add_argument('--option-style', choices=['numbered', 'lettered', 'mixed'], default='numbered')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', metavar='PATH', help="write results JSON to PATH (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    report = run(args.questions, args.repeat, math_density=args.math_density,
+                 option_style=args.option_style, seed=args.seed)
+    print(f"🧹 {report['strings']} strings: old chain {report['legacyCleanSeconds']:.3f}s, "
+          f"clean_markdown {report['coldCleanSeconds']:.3f}s cold / {report['warmCleanSeconds']:.3f}s warm "
+          f"({report['cleanSpeedup']:.2f}x); parse {report['legacyQuestionsPerSecond']:.0f} → "
+          f"{report['questionsPerSecond']:.0f} questions/s", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'💾 Clean benchmark results saved to: {args.output}', file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
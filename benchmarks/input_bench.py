@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Peak RSS of reading a paper into a str versus parsing it through an mmap
+
+Each measurement runs in a fresh interpreter so its peak RSS (ru_maxrss)
+belongs to that one parse. Pages of the mapped file count towards RSS once
+touched (as clean, reclaimable file pages), so the peak Python heap is
+measured too, in a second interpreter under tracemalloc. Run from the
+repository root:
+
+    python -m benchmarks.input_bench --questions 2000 20000 --output input.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+import contextlib
+import subprocess
+
+from test_md_parser import SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+DEFAULT_QUESTIONS = [2000, 20000]
+MODES = ['read', 'mmap']
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def parse_file(parser, mode, path):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if mode == 'read':
+            with open(path, 'r', encoding='utf-8') as f:
+                return parser.parse_markdown_content(f.read())
+        return parser.parse_markdown_file(path)
+
+
+def measure_heap(mode, path):
+    """Peak traced Python heap of one parse, in bytes."""
+    parser = SophisticatedMarkdownParser()
+    parser.buffer_patterns
+    tracemalloc.start()
+    parse_file(parser, mode, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'peakHeapBytes': peak}
+
+
+def measure(mode, path):
+    """Parse ``path`` in this process; returns the timing and RSS row."""
+    parser = SophisticatedMarkdownParser()
+    if mode == 'mmap':
+        # Build the bytes patterns outside the measured parse
+        parser.buffer_patterns
+    baseline = peak_rss_bytes()
+    started = time.perf_counter()
+    result = parse_file(parser, mode, path)
+    seconds = time.perf_counter() - started
+    peak = peak_rss_bytes()
+    file_bytes = os.path.getsize(path)
+    return {
+        'mode': mode,
+        'fileBytes': file_bytes,
+        'questions': len(result['questions']),
+        'seconds': seconds,
+        'baselineRssBytes': baseline,
+        'peakRssBytes': peak,
+        'parseRssBytes': peak - baseline,
+        'parseRssPerFileByte': (peak - baseline) / file_bytes
+    }
+
+
+def measure_in_child(mode, path, heap=False):
+    command = [sys.executable, '-m', 'benchmarks.input_bench', '--child', mode, path]
+    if heap:
+        command.append('--heap')
+    completed = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def run(question_counts=None, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in question_counts or DEFAULT_QUESTIONS:
+            path = os.path.join(workdir, f'paper_{count}.md')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(generate_paper(count, seed=seed))
+            for mode in MODES:
+                row = measure_in_child(mode, path)
+                row.update(measure_in_child(mode, path, heap=True))
+                row['peakHeapPerFileByte'] = row['peakHeapBytes'] / row['fileBytes']
+                results.append(row)
+                print(f"{count:>7} questions  {row['fileBytes'] / 2**20:7.1f} MB  {mode:<4}  "
+                      f"{row['seconds']:7.2f}s  peak {row['peakRssBytes'] / 2**20:7.1f} MB  "
+                      f"parse +{row['parseRssBytes'] / 2**20:7.1f} MB "
+                      f"({row['parseRssPerFileByte']:.2f}x file)  "
+                      f"heap {row['peakHeapBytes'] / 2**20:7.1f} MB ({row['peakHeapPerFileByte']:.2f}x file)",
+                      file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': results
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Compare peak RSS of str and mmap input against file size')
+    arg_parser.add_argument('--questions', type=int, nargs='+', default=DEFAULT_QUESTIONS,
+                            help='synthetic paper sizes, in questions')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    arg_parser.add_argument('--heap', action='store_true', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--output', metavar='PATH', help="write results JSON to PATH (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    if args.child:
+        mode, path = args.child
+        json.dump(measure_heap(mode, path) if args.heap else measure(mode, path), sys.stdout)
+        return
+
+    report = run(args.questions, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'💾 Input benchmark results saved to: {args.output}', file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Eager question dicts vs LazyQuestion records
+
+For each paper size, times a stem-and-answer-only workload (what the
+question-assigner listing needs) and full serialization, both with
+extract_questions() and with extract_questions(lazy=True), after checking
+that the lazy records serialize to the same dicts. Run from the repository
+root:
+
+    python -m benchmarks.lazy_bench --sizes 100 1000 10000 --output lazy.json
+"""
+
+import io
+import sys
+import json
+import argparse
+import platform
+import contextlib
+from datetime import datetime
+
+from test_md_parser import PARSER_VERSION, SophisticatedMarkdownParser
+from benchmarks.parser_bench import best_of
+from benchmarks.synthetic import generate_paper
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+
+def bench_size(parser, size, repeat=3, **paper_options):
+    content = generate_paper(size, **paper_options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        eager = parser.extract_questions(content)
+        lazy = [question.to_dict() for question in parser.extract_questions(content, lazy=True)]
+        assert [question for question in lazy if question] == eager
+
+        def eager_listing():
+            return [
+                (question['questionDetails'][0]['text'], question['questionDetails'][0]['correctAnswer'])
+                for question in parser.extract_questions(content)
+            ]
+
+        def lazy_listing():
+            return [(question.text, question.correct_answer) for question in parser.extract_questions(content, lazy=True)]
+
+        def lazy_full():
+            return [question.to_dict() for question in parser.extract_questions(content, lazy=True)]
+
+        eager_seconds, eager_rows = best_of(repeat, eager_listing)
+        lazy_seconds, lazy_rows = best_of(repeat, lazy_listing)
+        assert lazy_rows == eager_rows
+        full_seconds, _ = best_of(repeat, lambda: parser.extract_questions(content))
+        lazy_full_seconds, _ = best_of(repeat, lazy_full)
+
+    return {
+        'size': size,
+        'questions': len(eager),
+        'stemAnswerEagerSeconds': eager_seconds,
+        'stemAnswerLazySeconds': lazy_seconds,
+        'stemAnswerSpeedup': eager_seconds / lazy_seconds if lazy_seconds else None,
+        'fullEagerSeconds': full_seconds,
+        'fullLazySeconds': lazy_full_seconds,
+        'fullLazyOverhead': lazy_full_seconds / full_seconds if full_seconds else None
+    }
+
+
+def run(sizes=None, repeat=3, **paper_options):
+    parser = SophisticatedMarkdownParser()
+    results = []
+    for size in sizes or DEFAULT_SIZES:
+        row = bench_size(parser, size, repeat, **paper_options)
+        results.append(row)
+        print(f"{size:>7} questions  stems+answers eager {row['stemAnswerEagerSeconds']:7.3f}s  "
+              f"lazy {row['stemAnswerLazySeconds']:7.3f}s  ({row['stemAnswerSpeedup']:.2f}x)  "
+              f"full lazy/eager {row['fullLazyOverhead']:.2f}", file=sys.stderr)
+    return {
+        'parserVersion': PARSER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'repeat': repeat,
+        'paperOptions': paper_options,
+        'results': results
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmark lazy question records against eager parsing')
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='question counts to benchmark')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the fastest is kept')
+    arg_parser.add_argument('--option-style', choices=['numbered', 'lettered', 'mixed'], default='numbered')
+    arg_parser.add_argument('--math-density', type=float, default=0.2, help='share of stem/solution tokens that are math')
+    arg_parser.add_argument('--image-rate', type=float, default=0.1)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', metavar='PATH', help="write results JSON to PATH (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat, option_style=args.option_style, math_density=args.math_density,
+                 image_rate=args.image_rate, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'💾 Lazy question benchmark results saved to: {args.output}', file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: nested question dicts vs the slotted question_model classes,
+and the peak RSS of the single-paper CLI, which streams questions into the
+JSON writer, against parsing the whole paper before writing it (POSIX only)
+
+Run from the repository root:
+
+    python -m benchmarks.memory_bench --questions 50000 --cli-questions 50000 --output memory.json
+"""
+
+import io
+import os
+import gc
+import sys
+import json
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+
+from question_model import Question
+from test_md_parser import SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+
+def retained_bytes(build):
+    """Bytes still allocated after ``build()`` returns, while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def peak_bytes(build):
+    """Peak traced allocation while ``build()`` runs, its result included."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        build()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(num_questions=50000, seed=0):
+    parser = SophisticatedMarkdownParser()
+    content = generate_paper(num_questions, seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        questions = parser.extract_questions(content)
+        # Parsing straight to models never holds the whole paper as dicts
+        dict_parse_peak = peak_bytes(lambda: parser.extract_questions(content))
+        model_parse_peak = peak_bytes(lambda: parser.extract_question_models(content))
+    del content
+    # Both representations are rebuilt from the same JSON lines so neither
+    # shares strings with the parser's own output
+    lines = [json.dumps(question, ensure_ascii=False) for question in questions]
+    del questions
+
+    dict_bytes, dicts = retained_bytes(lambda: [json.loads(line) for line in lines])
+    model_bytes, models = retained_bytes(lambda: [Question.from_dict(json.loads(line)) for line in lines])
+    assert [model.to_dict() for model in models] == dicts
+
+    count = len(lines)
+    return {
+        'questions': count,
+        'dictBytes': dict_bytes,
+        'modelBytes': model_bytes,
+        'dictBytesPerQuestion': dict_bytes / count if count else None,
+        'modelBytesPerQuestion': model_bytes / count if count else None,
+        'modelToDictRatio': model_bytes / dict_bytes if dict_bytes else None,
+        'dictParsePeakBytes': dict_parse_peak,
+        'modelParsePeakBytes': model_parse_peak
+    }
+
+
+# Run in a fresh interpreter so ru_maxrss is this parse's peak alone
+CLI_PEAK_RSS_SCRIPT = """
+import sys, resource
+from test_md_parser import SophisticatedMarkdownParser, main
+if sys.argv[1] == 'stream':
+    main([sys.argv[2]])
+else:
+    parser = SophisticatedMarkdownParser()
+    result = parser.parse_markdown_file(sys.argv[2])
+    parser.write_json(sys.stdout, result['examInfo'], result['questions'])
+sys.stderr.write(str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+"""
+
+
+def cli_peak_rss(num_questions=50000, seed=0):
+    """Peak RSS in KB (Linux units) of writing one paper's JSON: streamed vs whole result.
+    
+    Both peaks include the paper's mapped pages, which are file-backed and
+    can be reclaimed; on top of those the streamed run only holds the
+    question spans, while the other holds every parsed question.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'paper.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(generate_paper(num_questions, seed=seed))
+        report = {'questions': num_questions, 'paperBytes': os.path.getsize(path)}
+        for mode, key in (('stream', 'streamingPeakKB'), ('whole', 'wholeResultPeakKB')):
+            finished = subprocess.run([sys.executable, '-c', CLI_PEAK_RSS_SCRIPT, mode, path], cwd=root,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+            report[key] = int(finished.stderr.strip().splitlines()[-1])
+    report['streamingToWholeRatio'] = report['streamingPeakKB'] / report['wholeResultPeakKB']
+    return report
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Compare memory held by question dicts and slotted models')
+    arg_parser.add_argument('--questions', type=int, default=50000)
+    arg_parser.add_argument('--cli-questions', type=int, default=50000,
+                            help='questions in the paper the CLI peak RSS is measured on (0 to skip)')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', metavar='PATH', help='write results JSON to PATH (default: stdout)')
+    args = arg_parser.parse_args(argv)
+
+    report = run(args.questions, args.seed)
+    print(f"{report['questions']} questions: dicts {report['dictBytes'] / 1e6:.1f} MB, "
+          f"models {report['modelBytes'] / 1e6:.1f} MB ({report['modelToDictRatio']:.0%}); parse peak "
+          f"{report['dictParsePeakBytes'] / 1e6:.1f} MB as dicts, {report['modelParsePeakBytes'] / 1e6:.1f} MB as models",
+          file=sys.stderr)
+    if args.cli_questions:
+        cli = report['cliPeakRss'] = cli_peak_rss(args.cli_questions, args.seed)
+        print(f"CLI on {cli['questions']} questions ({cli['paperBytes'] / 1e6:.1f} MB): peak RSS streamed "
+              f"{cli['streamingPeakKB'] / 1024:.0f} MB, whole result {cli['wholeResultPeakKB'] / 1024:.0f} MB",
+              file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
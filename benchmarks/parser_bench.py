@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the sophisticated markdown parser
+
+Run from the repository root:
+
+    python -m benchmarks.parser_bench --sizes 10 100 1000 --output bench.json
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+from datetime import datetime
+
+from test_md_parser import PARSER_VERSION, SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 50000]
+
+# Stages timed separately over the already segmented questions
+EXTRACT_STAGES = [
+    'extract_question_text',
+    'extract_options',
+    'extract_correct_answer',
+    'extract_solution',
+    'extract_images',
+    'extract_marks'
+]
+
+
+def best_of(repeat, func):
+    """Run ``func`` ``repeat`` times; return (fastest seconds, last result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def bench_size(parser, size, repeat=3, **paper_options):
+    content = generate_paper(size, **paper_options)
+    # Broken questions print an error line each; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse_seconds, result = best_of(repeat, lambda: parser.parse_markdown_content(content))
+
+        stages = {}
+        stages['segment'], matches = best_of(repeat, lambda: parser.find_question_matches(content))
+        contents = [match['content'] for match in matches]
+        stages['build_span_table'], tables = best_of(
+            repeat, lambda: [parser.build_span_table(text) for text in contents]
+        )
+        for stage in EXTRACT_STAGES:
+            method = getattr(parser, stage)
+            stages[stage], _ = best_of(
+                repeat, lambda: [method(text, table) for text, table in zip(contents, tables)]
+            )
+        stems = [parser.extract_question_text(text, table) for text, table in zip(contents, tables)]
+        stages['determine_subject'], _ = best_of(repeat, lambda: [parser.determine_subject(stem) for stem in stems])
+
+    generate_seconds, json_output = best_of(
+        repeat, lambda: parser.generate_json(result['examInfo'], result['questions'])
+    )
+
+    def dump():
+        buffer = io.StringIO()
+        json.dump(json_output, buffer, indent=2, ensure_ascii=False)
+        return buffer.tell()
+
+    dump_seconds, json_chars = best_of(repeat, dump)
+
+    def stream(compact):
+        buffer = io.StringIO()
+        parser.write_json(buffer, result['examInfo'], result['questions'], compact=compact)
+        return buffer.tell()
+
+    stream_seconds, _ = best_of(repeat, lambda: stream(False))
+    stream_compact_seconds, compact_chars = best_of(repeat, lambda: stream(True))
+
+    questions = len(result['questions'])
+    return {
+        'size': size,
+        'markdownChars': len(content),
+        'questions': questions,
+        'parseSeconds': parse_seconds,
+        'questionsPerSecond': questions / parse_seconds if parse_seconds else None,
+        'microsecondsPerQuestion': parse_seconds / questions * 1e6 if questions else None,
+        'stages': stages,
+        'generateJsonSeconds': generate_seconds,
+        'jsonDumpSeconds': dump_seconds,
+        'jsonChars': json_chars,
+        'streamJsonSeconds': stream_seconds,
+        'streamCompactSeconds': stream_compact_seconds,
+        'compactChars': compact_chars
+    }
+
+
+def run(sizes=None, repeat=3, **paper_options):
+    parser = SophisticatedMarkdownParser()
+    results = []
+    for size in sizes or DEFAULT_SIZES:
+        row = bench_size(parser, size, repeat, **paper_options)
+        results.append(row)
+        print(f"{size:>7} questions  {row['parseSeconds']:8.3f}s  "
+              f"{row['microsecondsPerQuestion'] or 0:8.1f} us/question  "
+              f"dump {row['jsonDumpSeconds']:.3f}s", file=sys.stderr)
+    return {
+        'parserVersion': PARSER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'repeat': repeat,
+        'paperOptions': paper_options,
+        'results': results
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmark the markdown parser on synthetic papers')
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='question counts to benchmark')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the fastest is kept')
+    arg_parser.add_argument('--option-style', choices=['numbered', 'lettered', 'mixed'], default='numbered')
+    arg_parser.add_argument('--math-density', type=float, default=0.2, help='share of stem/solution tokens that are math')
+    arg_parser.add_argument('--table-rate', type=float, default=0.05)
+    arg_parser.add_argument('--image-rate', type=float, default=0.1)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', metavar='PATH', help="write results JSON to PATH (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat, option_style=args.option_style, math_density=args.math_density,
+                 table_rate=args.table_rate, image_rate=args.image_rate, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'💾 Benchmark results saved to: {args.output}', file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Publish throughput and resume speedup over a simulated remote store
+
+Synthetic tutorials (with shared Mathpix-style images) are published to a
+local-directory store that sleeps ``--latency`` seconds per upload, like a
+network round trip. Timed scenarios: a cold publish with one worker and
+with ``--workers``, a no-op re-run, and a resume after the publish process
+was killed (SIGKILL) once ``--interrupt-at`` of its objects were published.
+Run from the repository root:
+
+    python -m benchmarks.publish_bench --tutorials 200 --latency 0.02 --output publish.json
+"""
+
+import io
+import os
+import sys
+import json
+import glob
+import time
+import random
+import signal
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+
+from object_store import FilesystemStore
+from publisher import Publisher, PublishManifest
+from image_assets import open_image_source
+from test_md_parser import SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+# synthetic.generate_question's default paper id; _image() picks one of 40 crops
+IMAGE_NAME = '2025_09_17_886c37eabb910c4e21e2g-{:02d}.jpg'
+IMAGE_COUNT = 40
+
+
+class LatencyStore(FilesystemStore):
+    """Local-directory store that takes ``latency`` seconds per put."""
+
+    def __init__(self, root, latency):
+        super().__init__(root)
+        self.latency = latency
+
+    def put(self, key, data, content_type=None):
+        time.sleep(self.latency)
+        super().put(key, data, content_type)
+
+
+def write_inputs(workdir, tutorials, questions, image_bytes, seed):
+    parser = SophisticatedMarkdownParser()
+    tutorial_dir = os.path.join(workdir, 'tutorials')
+    image_dir = os.path.join(workdir, 'images')
+    os.makedirs(tutorial_dir)
+    os.makedirs(image_dir)
+    rng = random.Random(seed)
+    for number in range(1, IMAGE_COUNT + 1):
+        with open(os.path.join(image_dir, IMAGE_NAME.format(number)), 'wb') as f:
+            f.write(b'\xff\xd8\xff' + rng.randbytes(image_bytes))
+    for number in range(tutorials):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = parser.parse_markdown_content(generate_paper(questions, image_rate=0.3, seed=seed + number))
+        tutorial = parser.generate_json(result['examInfo'], result['questions'])
+        tutorial['tutorialId'] = f'bench_{number}'
+        with open(os.path.join(tutorial_dir, f'tutorial_{number}.json'), 'w', encoding='utf-8') as f:
+            json.dump(tutorial, f, ensure_ascii=False)
+    return tutorial_dir, image_dir
+
+
+def load_tutorials(tutorial_dir):
+    tutorials = []
+    for path in sorted(glob.glob(os.path.join(tutorial_dir, '*.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            tutorials.append(json.load(f))
+    return tutorials
+
+
+def publish(tutorial_dir, image_dir, store_dir, manifest_path, latency, workers):
+    source = open_image_source(image_dir)
+    manifest = PublishManifest(manifest_path)
+    try:
+        publisher = Publisher(LatencyStore(store_dir, latency), manifest, source, workers=workers)
+        return publisher.publish(load_tutorials(tutorial_dir))
+    finally:
+        manifest.close()
+        source.close()
+
+
+def manifest_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        return f.read().count(b'\n')
+
+
+def summarize(report):
+    return {
+        'seconds': report['seconds'],
+        'published': report['image']['published'] + report['tutorial']['published'],
+        'skipped': report['image']['skipped'] + report['tutorial']['skipped'],
+        'failed': report['image']['failed'] + report['tutorial']['failed']
+    }
+
+
+def run(tutorials=200, questions=50, image_bytes=50000, latency=0.02, workers=8, interrupt_at=0.5, seed=0):
+    with tempfile.TemporaryDirectory() as workdir:
+        tutorial_dir, image_dir = write_inputs(workdir, tutorials, questions, image_bytes, seed)
+        scenarios = {}
+
+        def scenario(name, store, workers):
+            row = summarize(publish(tutorial_dir, image_dir, os.path.join(workdir, store),
+                                    os.path.join(workdir, store + '.ndjson'), latency, workers))
+            scenarios[name] = row
+            print(f"{name:<18} {row['seconds']:7.2f}s  published {row['published']:>5}  "
+                  f"skipped {row['skipped']:>5}  failed {row['failed']}", file=sys.stderr)
+            return row
+
+        scenario('cold_1_worker', 'serial', 1)
+        cold = scenario('cold', 'pooled', workers)
+        scenario('rerun_unchanged', 'pooled', workers)
+
+        # Kill a publish part-way through, then resume it in this process
+        command = [sys.executable, '-m', 'benchmarks.publish_bench', '--child', tutorial_dir, image_dir,
+                   os.path.join(workdir, 'resumed'), os.path.join(workdir, 'resumed.ndjson'),
+                   '--latency', str(latency), '--workers', str(workers)]
+        child = subprocess.Popen(command)
+        manifest_path = os.path.join(workdir, 'resumed.ndjson')
+        while child.poll() is None and manifest_lines(manifest_path) < cold['published'] * interrupt_at:
+            time.sleep(0.005)
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+        resumed = scenario('resume_after_kill', 'resumed', workers)
+        scenarios['resume_after_kill']['speedupVsRestart'] = cold['seconds'] / resumed['seconds']
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'tutorials': tutorials,
+        'questionsPerTutorial': questions,
+        'imageBytes': image_bytes,
+        'latencySeconds': latency,
+        'workers': workers,
+        'interruptAt': interrupt_at,
+        'scenarios': scenarios
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmark resumable publishing over a simulated remote store')
+    arg_parser.add_argument('--tutorials', type=int, default=200)
+    arg_parser.add_argument('--questions', type=int, default=50, help='questions per tutorial')
+    arg_parser.add_argument('--image-bytes', type=int, default=50000, help='size of each synthetic image')
+    arg_parser.add_argument('--latency', type=float, default=0.02, help='simulated seconds per upload')
+    arg_parser.add_argument('--workers', type=int, default=8)
+    arg_parser.add_argument('--interrupt-at', type=float, default=0.5,
+                            help='share of the objects published before the interrupted run is killed')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--child', nargs=4, metavar=('TUTORIALS', 'IMAGES', 'STORE', 'MANIFEST'),
+                            help=argparse.SUPPRESS)
+    arg_parser.add_argument('--output', metavar='PATH', help="write results JSON to PATH (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    if args.child:
+        publish(*args.child, args.latency, args.workers)
+        return
+
+    report = run(args.tutorials, args.questions, args.image_bytes, args.latency, args.workers,
+                 args.interrupt_at, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'💾 Publish benchmark results saved to: {args.output}', file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
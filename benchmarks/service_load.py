@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Local load test for the parsing service
+
+Starts parse_service.py on a free port, then, for each concurrency level,
+has that many keep-alive clients POST a synthetic paper back to back and
+records client-side latency, successful throughput and 429 rejections.
+The service's own /stats snapshot is included at the end. Run from the
+repository root:
+
+    python -m benchmarks.service_load --workers 2 --queue-depth 4 --concurrency 1 4 16 --output load.json
+"""
+
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import subprocess
+
+from latency_stats import percentiles
+from benchmarks.synthetic import generate_paper
+
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def read_response(reader):
+    """(status, body bytes) of one HTTP/1.1 response (Content-Length or chunked)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+    headers = dict((name.strip().lower(), value.strip())
+                   for name, value in (line.split(':', 1) for line in header_lines))
+    if headers.get('transfer-encoding') == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            if size == 0:
+                await reader.readuntil(b'\r\n')
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b''.join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(status_line.split()[1]), body
+
+
+async def request(port, connection, method, path, body=b''):
+    """Send one request over ``connection`` ([reader, writer] or Nones); reconnects when needed."""
+    if connection[0] is None:
+        connection[:] = await asyncio.open_connection('127.0.0.1', port)
+    reader, writer = connection
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+                 + body)
+    await writer.drain()
+    status, response = await read_response(reader)
+    if status == 429:
+        # The service closes after refusing an upload it did not read
+        writer.close()
+        connection[:] = [None, None]
+    return status, response
+
+
+async def client(port, body, deadline, results):
+    connection = [None, None]
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status, response = await request(port, connection, 'POST', '/parse', body)
+            elapsed = time.perf_counter() - started
+            if status == 200:
+                results['latencies'].append(elapsed)
+                results['questions'] += response.count(b'\n') - 1
+            elif status == 429:
+                results['rejected'] += 1
+                await asyncio.sleep(0.05)
+            else:
+                results['errors'] += 1
+    finally:
+        if connection[1] is not None:
+            connection[1].close()
+
+
+async def load_level(port, body, concurrency, seconds):
+    results = {'latencies': [], 'questions': 0, 'rejected': 0, 'errors': 0}
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(client(port, body, deadline, results) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'completed': len(results['latencies']),
+        'rejected': results['rejected'],
+        'errors': results['errors'],
+        'requestsPerSecond': len(results['latencies']) / elapsed,
+        'questionsPerSecond': results['questions'] / elapsed,
+        'latencyMs': percentiles(results['latencies'])
+    }
+
+
+async def wait_until_up(port, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            connection = [None, None]
+            status, _ = await request(port, connection, 'GET', '/health')
+            connection[1].close()
+            if status == 200:
+                return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+        await asyncio.sleep(0.1)
+
+
+async def run_levels(port, body, levels, seconds):
+    await wait_until_up(port)
+    results = []
+    for concurrency in levels:
+        row = await load_level(port, body, concurrency, seconds)
+        results.append(row)
+        latency = row['latencyMs']
+        print(f"{concurrency:>4} clients  {row['requestsPerSecond']:7.1f} req/s  "
+              f"{row['questionsPerSecond']:8.0f} questions/s  p50 {latency.get('p50', 0):7.1f} ms  "
+              f"p99 {latency.get('p99', 0):7.1f} ms  429s {row['rejected']}", file=sys.stderr)
+    connection = [None, None]
+    _, stats = await request(port, connection, 'GET', '/stats')
+    connection[1].close()
+    return results, json.loads(stats)
+
+
+def run(workers=2, queue_depth=4, levels=None, questions=90, seconds=5.0, seed=0):
+    body = generate_paper(questions, seed=seed).encode('utf-8')
+    port = free_port()
+    command = [sys.executable, 'parse_service.py', '--port', str(port), '--workers', str(workers),
+               '--queue-depth', str(queue_depth)]
+    service = subprocess.Popen(command, stderr=subprocess.DEVNULL)
+    try:
+        results, stats = asyncio.run(run_levels(port, body, levels or DEFAULT_CONCURRENCY, seconds))
+    finally:
+        service.terminate()
+        service.wait()
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': workers,
+        'queueDepth': queue_depth,
+        'questionsPerUpload': questions,
+        'uploadBytes': len(body),
+        'secondsPerLevel': seconds,
+        'levels': results,
+        'serviceStats': stats
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Load-test the parsing service locally')
+    arg_parser.add_argument('--workers', type=int, default=2, help='service parser processes')
+    arg_parser.add_argument('--queue-depth', type=int, default=4, help='service queue depth')
+    arg_parser.add_argument('--concurrency', type=int, nargs='+', default=DEFAULT_CONCURRENCY,
+                            help='concurrent clients per level')
+    arg_parser.add_argument('--questions', type=int, default=90, help='questions per uploaded paper')
+    arg_parser.add_argument('--seconds', type=float, default=5.0, help='duration of each level')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--output', metavar='PATH', help="write results JSON to PATH (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    report = run(args.workers, args.queue_depth, args.concurrency, args.questions, args.seconds, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'💾 Load test results saved to: {args.output}', file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Synthetic JEE-style exam paper generator for the markdown parser benchmarks
+"""
+
+import random
+
+SUBJECT_WORDS = {
+    'MATHEMATICS': [
+        'function', 'matrix', 'integral', 'derivative', 'parabola', 'ellipse', 'circle',
+        'probability', 'polynomial', 'equation', 'vector', 'limit', 'triangle', 'binomial'
+    ],
+    'PHYSICS': [
+        'force', 'velocity', 'capacitor', 'circuit', 'current', 'wavelength', 'lens',
+        'momentum', 'acceleration', 'electron', 'frequency', 'energy', 'mirror', 'nucleus'
+    ],
+    'CHEMISTRY': [
+        'reaction', 'molecule', 'compound', 'equilibrium', 'oxidation', 'catalyst', 'acid',
+        'alcohol', 'ketone', 'polymer', 'isomer', 'carbon', 'hydrogen', 'bond'
+    ]
+}
+
+FILLER_WORDS = [
+    'the', 'value', 'of', 'is', 'equal', 'to', 'if', 'then', 'let', 'be', 'a', 'given',
+    'such', 'that', 'find', 'which', 'following', 'correct', 'statement', 'number', 'where'
+]
+
+MATH_SNIPPETS = [
+    r'$\mathrm{x}^{2}+\mathrm{y}^{2}=1$',
+    r'$\frac{a}{b}$',
+    r'$\sqrt{3}$',
+    r'$\alpha+\beta=\gamma$',
+    r'$\int_{0}^{1} f(x) d x$',
+    r'$\lim _{x \rightarrow 0} \frac{\sin x}{x}$',
+    r'$\mathrm{n} \in \mathrm{N}$',
+    r'$\mathrm{K}_{\mathrm{p}}^{0}$',
+    r'$2 \mathrm{dm}^{3}$',
+    r'$\theta \leq \pi$',
+    r'$\mathrm{CH}_{3} \mathrm{OH}$',
+    r'$x_{1}, x_{2}, \ldots, x_{n}$'
+]
+
+DISPLAY_MATH = (
+    '$$\n\\begin{aligned}\n& \\Rightarrow f^{\\prime}(x)=\\frac{1}{x} \\\\\n'
+    '& \\therefore \\int_{1}^{e} \\frac{d x}{x}=1\n\\end{aligned}\n$$'
+)
+
+TABLE = (
+    '| | $\\mathrm{t}=0$ | $\\mathrm{t}_{\\text {eq }}$ |\n'
+    '| :--- | :--- | :--- |\n'
+    '| A | 0.1 mol | $0.1-\\mathrm{x}$ |\n'
+    '| B | a mol | $a-2 \\mathrm{x}$ |'
+)
+
+
+def _image(rng, paper_id):
+    return (
+        f'![](https://cdn.mathpix.com/cropped/2025_09_17_{paper_id}-{rng.randint(1, 40):02d}.jpg'
+        f'?height={rng.randint(100, 500)}&width={rng.randint(200, 700)}'
+        f'&top_left_y={rng.randint(0, 2500)}&top_left_x={rng.randint(0, 1200)})'
+    )
+
+
+def _sentence(rng, subject, words, math_density):
+    parts = []
+    for _ in range(words):
+        roll = rng.random()
+        if roll < math_density:
+            parts.append(rng.choice(MATH_SNIPPETS))
+        elif roll < math_density + 0.15:
+            parts.append(rng.choice(SUBJECT_WORDS[subject]))
+        else:
+            parts.append(rng.choice(FILLER_WORDS))
+    return ' '.join(parts)
+
+
+def generate_question(rng, number, subject, option_style='numbered', math_density=0.2,
+                      table_rate=0.05, image_rate=0.1, numeric_rate=0.2, paper_id='886c37eabb910c4e21e2g'):
+    """Return one question block: stem, options, Ans. and Sol. sections."""
+    lines = [f'{number}. {_sentence(rng, subject, rng.randint(12, 40), math_density)}']
+    if rng.random() < image_rate:
+        lines.append(_image(rng, paper_id))
+    if rng.random() < table_rate:
+        lines.append(TABLE)
+    
+    numeric = rng.random() < numeric_rate
+    if numeric:
+        answer = f'({rng.randint(0, 120)})'
+    else:
+        for k in range(1, 5):
+            marker = f'({k})' if option_style == 'numbered' else f'{chr(64 + k)})'
+            lines.append(f'{marker} {_sentence(rng, subject, rng.randint(1, 6), math_density)}')
+        choice = rng.randint(1, 4)
+        answer = f'({choice})' if option_style == 'numbered' else chr(64 + choice)
+    lines.append(f'Ans. {answer}')
+    
+    solution = [f'Sol. {_sentence(rng, subject, rng.randint(10, 30), math_density)}']
+    if rng.random() < math_density:
+        solution.append(DISPLAY_MATH)
+    if rng.random() < table_rate:
+        solution.append(TABLE)
+    solution.append(_sentence(rng, subject, rng.randint(5, 20), math_density))
+    lines.append('\n'.join(solution))
+    return '\n'.join(lines)
+
+
+def generate_paper(num_questions, option_style='numbered', math_density=0.2, table_rate=0.05,
+                   image_rate=0.1, numeric_rate=0.2, seed=0):
+    """Generate a synthetic Mathpix-style JEE paper with ``num_questions`` questions.
+    
+    ``option_style`` is 'numbered' for (1)..(4), 'lettered' for A)..D) or
+    'mixed' to alternate per question. Subjects rotate every third of the
+    paper like a real JEE Main paper.
+    """
+    rng = random.Random(seed)
+    subjects = list(SUBJECT_WORDS)
+    out = [
+        '# JEE (Main)-2025 (Online) Session-2\n\n'
+        'Time: 3 hrs .\nM.M : 300\n'
+    ]
+    per_subject = max(1, -(-num_questions // len(subjects)))
+    for number in range(1, num_questions + 1):
+        subject = subjects[min((number - 1) // per_subject, len(subjects) - 1)]
+        if (number - 1) % per_subject == 0:
+            out.append(f'\n## {subject}\n\n## SECTION-A\n')
+        style = option_style
+        if option_style == 'mixed':
+            style = 'numbered' if number % 2 else 'lettered'
+        out.append(generate_question(rng, number, subject, style, math_density,
+                                     table_rate, image_rate, numeric_rate))
+        out.append('\n\n')
+    return ''.join(out)
@@ -0,0 +1,22 @@
+"""
+Shared pytest fixtures: the checked-in sample paper and a synthetic one
+"""
+
+import os
+
+import pytest
+
+from benchmarks.synthetic import generate_paper
+
+COMPREHENSIVE_PAPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'comprehensive_test.md')
+
+
+@pytest.fixture(scope='session')
+def comprehensive_paper():
+    with open(COMPREHENSIVE_PAPER, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture(scope='session')
+def synthetic_paper():
+    return generate_paper(60, option_style='mixed', math_density=0.3, image_rate=0.3, seed=7)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Watch a drop folder and re-parse markdown papers as they change
+
+Editors drop (or overwrite) papers in a shared folder; each *.md file that
+settles (no writes for ``--debounce`` seconds) and whose content hash
+changed since it was last parsed is parsed on a background process pool,
+and its generate_json output is replaced atomically (temp file + rename):
+
+    python drop_watcher.py /srv/drop --output-dir /srv/parsed --workers 4 --log watch.ndjson
+
+Changes are picked up with inotify (through ctypes) on Linux and by polling
+the folder's file stats elsewhere or with ``--poll``. Each parse reports its
+latency from the first change seen to the output being in place.
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import errno
+import ctypes
+import ctypes.util
+import select
+import signal
+import struct
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from latency_stats import percentiles
+from test_md_parser import DEFAULT_QUESTION_BUDGET, FORMAT_PROFILES, parse_paper_file
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL_INTERVAL = 0.5
+STATE_FILE_NAME = '.drop_watcher_state.json'
+# Times a paper is parsed again after its worker died before it counts as failed
+MAX_CRASH_RETRIES = 1
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct('iIII')   # wd, mask, cookie, len; then len bytes of name
+
+
+def is_paper(name):
+    # Editors' swap/backup files and our own temp files never count as drops
+    return name.endswith('.md') and not name.startswith(('.', '~', '#'))
+
+
+class InotifyWatcher:
+    """Names of changed entries in one directory, from Linux inotify via ctypes."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f'inotify_add_watch failed for {directory}')
+        self.directory = directory
+
+    def changes(self, timeout):
+        """Block up to ``timeout`` seconds; returns changed names (None = rescan everything)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+                offset += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Names of changed entries in one directory, by comparing (mtime, size) snapshots."""
+
+    def __init__(self, directory, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        names = {name for name, stat in snapshot.items() if self.snapshot.get(name) != stat}
+        names.update(set(self.snapshot) - set(snapshot))
+        self.snapshot = snapshot
+        return names
+
+    def close(self):
+        pass
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class DropWatcher:
+    """Debounce, dedupe by content hash, parse in a pool, report drop-to-output latency.
+
+    The content hash of each paper's last successful parse is kept in a
+    state file next to the outputs, so a restart only parses papers that
+    changed while the watcher was down. A paper that changes again while it
+    is being parsed is parsed once more afterwards. When a worker dies the
+    pool is replaced and the papers it was parsing are queued again.
+    """
+
+    def __init__(self, drop_dir, output_dir=None, workers=None, debounce=DEFAULT_DEBOUNCE, compact=False,
+                 parser_options=None, poll=False, poll_interval=DEFAULT_POLL_INTERVAL, log=None):
+        self.drop_dir = os.path.abspath(drop_dir)
+        self.output_dir = os.path.abspath(output_dir or drop_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.debounce = debounce
+        self.compact = compact
+        self.parser_options = parser_options
+        self.log = log
+        self.state_path = os.path.join(self.output_dir, STATE_FILE_NAME)
+        self.hashes = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.hashes = json.load(f)
+
+        self.watcher = None
+        if not poll:
+            try:
+                self.watcher = InotifyWatcher(self.drop_dir)
+            except (OSError, AttributeError) as error:
+                print(f'⚠️  inotify unavailable ({error}); polling every {poll_interval}s', file=sys.stderr)
+        if self.watcher is None:
+            self.watcher = PollingWatcher(self.drop_dir, poll_interval)
+
+        self.pool = None
+        self.pending = {}       # name -> (first change seen, last change seen)
+        self.running = {}       # name -> (future, content hash, first change seen, pool)
+        self.rerun = {}         # name -> first change seen while it was being parsed
+        self.crashes = {}       # name -> parses of it lost to a dead worker in a row
+        self.latencies = []
+        self.counts = {'parsed': 0, 'unchanged': 0, 'failed': 0}
+        self.stopping = False
+
+    def run(self, once=False):
+        """Watch until SIGINT/SIGTERM (or, with ``once``, until the current files are done)."""
+        handlers = {signum: signal.signal(signum, lambda *_: setattr(self, 'stopping', True))
+                    for signum in (signal.SIGINT, signal.SIGTERM)}
+        os.makedirs(self.output_dir, exist_ok=True)
+        print(f'👀 Watching {self.drop_dir} with {type(self.watcher).__name__} '
+              f'({self.workers} workers, {self.debounce}s debounce)', file=sys.stderr)
+        self._note(self._all_papers())
+        try:
+            while not self.stopping:
+                changes = self.watcher.changes(self.debounce / 2 if self.pending else 1.0)
+                self._note(self._all_papers() if changes is None else changes)
+                self._submit_settled()
+                self._collect_finished()
+                if once and not self.pending and not self.running and not self.rerun:
+                    break
+            wait([future for future, _, _, _ in self.running.values()])
+            self._collect_finished()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.watcher.close()
+        self.print_summary()
+
+    def _all_papers(self):
+        return {os.path.basename(path) for path in glob.glob(os.path.join(self.drop_dir, '*.md'))}
+
+    def _note(self, names):
+        now = time.time()
+        for name in names:
+            if not is_paper(name):
+                continue
+            if name in self.running:
+                self.rerun.setdefault(name, now)
+                continue
+            first_seen = self.pending[name][0] if name in self.pending else now
+            self.pending[name] = (first_seen, now)
+
+    def _submit_settled(self):
+        now = time.time()
+        for name, (first_seen, last_seen) in list(self.pending.items()):
+            if now - last_seen < self.debounce or name in self.running:
+                continue
+            del self.pending[name]
+            path = os.path.join(self.drop_dir, name)
+            try:
+                content_hash = file_hash(path)
+            except FileNotFoundError:
+                continue
+            if self.hashes.get(name) == content_hash:
+                self.counts['unchanged'] += 1
+                continue
+            json_path = os.path.join(self.output_dir, os.path.splitext(name)[0] + '.json')
+            task = (parse_paper_file, path, json_path, self.compact, self.parser_options)
+            try:
+                future = self._pool().submit(*task)
+            except BrokenProcessPool:
+                # A worker died while the pool sat idle
+                self._drop_pool(self.pool)
+                future = self._pool().submit(*task)
+            self.running[name] = (future, content_hash, first_seen, self.pool)
+
+    def _pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    def _drop_pool(self, pool):
+        """Shut down a broken pool; the next submit starts a new one."""
+        # Every paper on the broken pool lands here; only the first drops it
+        if self.pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def _collect_finished(self):
+        for name, (future, content_hash, first_seen, pool) in list(self.running.items()):
+            if not future.done():
+                continue
+            del self.running[name]
+            try:
+                row = future.result()
+            except BrokenProcessPool as error:
+                self._drop_pool(pool)
+                crashes = self.crashes.get(name, 0) + 1
+                if crashes <= MAX_CRASH_RETRIES:
+                    self.crashes[name] = crashes
+                    print(f'⚠️  {name}: parser worker died; queued to parse again', file=sys.stderr)
+                    # Already settled, unless it changed while it was being parsed
+                    self.pending[name] = (first_seen, self.rerun.pop(name, first_seen))
+                    continue
+                row = {'file': name, 'questions': 0, 'error': f'{type(error).__name__}: {error}'}
+            except Exception as error:
+                row = {'file': name, 'questions': 0, 'error': f'{type(error).__name__}: {error}'}
+            self.crashes.pop(name, None)
+            row['dropToOutputSeconds'] = time.time() - first_seen
+            if row['error']:
+                self.counts['failed'] += 1
+                print(f"❌ {name}: {row['error']}", file=sys.stderr)
+            else:
+                self.counts['parsed'] += 1
+                self.latencies.append(row['dropToOutputSeconds'])
+                self.hashes[name] = content_hash
+                self._save_state()
+                print(f"✅ {name} → {os.path.basename(row['output'])}: {row['questions']} questions, "
+                      f"parse {row['seconds']:.2f}s, drop to output {row['dropToOutputSeconds']:.2f}s",
+                      file=sys.stderr)
+            if self.log:
+                with open(self.log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            if name in self.rerun:
+                first_seen = self.rerun.pop(name)
+                self.pending[name] = (first_seen, time.time())
+
+    def _save_state(self):
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.hashes, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.state_path)
+
+    def print_summary(self):
+        latency = percentiles(self.latencies)
+        latency_note = (f", drop to output p50 {latency['p50'] / 1000:.2f}s p95 {latency['p95'] / 1000:.2f}s "
+                        f"max {latency['max'] / 1000:.2f}s") if latency else ''
+        print(f"📚 {self.counts['parsed']} parsed, {self.counts['unchanged']} unchanged, "
+              f"{self.counts['failed']} failed{latency_note}", file=sys.stderr)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Re-parse markdown papers as they are dropped into a folder')
+    arg_parser.add_argument('drop_dir', help='folder to watch for *.md papers')
+    arg_parser.add_argument('--output-dir', help='where <name>.json goes (default: the drop folder)')
+    arg_parser.add_argument('--workers', type=int, default=None, help='parser processes (default: CPU count)')
+    arg_parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                            help='seconds without writes before a file counts as dropped')
+    arg_parser.add_argument('--poll', action='store_true', help='poll file stats instead of using inotify')
+    arg_parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL)
+    arg_parser.add_argument('--once', action='store_true', help='process what is in the folder, then exit')
+    arg_parser.add_argument('--log', metavar='PATH', help='append one NDJSON row per parse (with dropToOutputSeconds)')
+    arg_parser.add_argument('--compact', action='store_true', help='write JSON without indentation')
+    arg_parser.add_argument('--format-profile', choices=['auto', *FORMAT_PROFILES], default='auto')
+    arg_parser.add_argument('--hardened', action='store_true',
+                            help='linear-time image scanning and a per-question CPU budget for malformed OCR output')
+    arg_parser.add_argument('--question-budget', type=float, metavar='SECONDS',
+                            help=f'CPU seconds per question before it is flagged (default with --hardened: {DEFAULT_QUESTION_BUDGET})')
+    args = arg_parser.parse_args(argv)
+
+    if not os.path.isdir(args.drop_dir):
+        arg_parser.error(f'{args.drop_dir} is not a directory')
+    watcher = DropWatcher(args.drop_dir, args.output_dir, args.workers, args.debounce, args.compact, {
+        'format_profile': args.format_profile,
+        'hardened': args.hardened,
+        'question_budget': args.question_budget
+    }, args.poll, args.poll_interval, args.log)
+    watcher.run(once=args.once)
+    return 1 if watcher.counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
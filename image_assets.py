@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Content-addressed image pipeline for parsed papers
+
+Every ``textImages[].src`` that extract_images collected (markdown, HTML and
+includegraphics references) is resolved against a local image directory or
+archive (.zip/.tar*) and hashed. Identical images are uploaded once, across
+questions and papers, through a bounded thread pool with retries, and each
+``src`` is rewritten to the stored path:
+
+    python image_assets.py output/*.json --images mathpix_export.zip --store assets/ --in-place
+
+Storage is pluggable through object_store.ObjectStore; FilesystemStore
+writes under a local directory so the pipeline runs offline.
+"""
+
+import os
+import abc
+import sys
+import json
+import time
+import zipfile
+import tarfile
+import hashlib
+import argparse
+import mimetypes
+import threading
+from urllib.parse import unquote, urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from object_store import FilesystemStore, call_with_retries
+
+# Named by content alone, so one image used by several papers (or subjects,
+# or years) is stored once; templates with {folder} or {year} dedupe only
+# within a folder/year
+DEFAULT_KEY_TEMPLATE = 'images/{digest}{ext}'
+
+IMAGE_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+    (b'RIFF', '.webp'),
+    (b'<svg', '.svg'),
+    (b'<?xml', '.svg'),
+]
+
+
+def image_extension(name, data):
+    """Lowercased extension of ``name``, or one sniffed from the image bytes."""
+    ext = os.path.splitext(name)[1].lower()
+    if ext:
+        return '.jpg' if ext == '.jpeg' else ext
+    for signature, sniffed in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return sniffed
+    return ''
+
+
+def src_candidates(src):
+    """Relative paths to try for an image reference, most specific first.
+
+    URLs (e.g. Mathpix CDN links with ?height=... queries) are reduced to
+    their path; every reference also falls back to its bare file name.
+    """
+    path = unquote(urlsplit(src).path if '://' in src else src.split('?')[0])
+    path = path.replace('\\', '/').lstrip('/')
+    while path.startswith('./'):
+        path = path[2:]
+    candidates = [path] if path and '://' not in src else []
+    name = path.rsplit('/', 1)[-1]
+    if name and name not in candidates:
+        candidates.append(name)
+    return candidates
+
+
+def src_query(src):
+    """The query string of an image reference (Mathpix crop parameters), or ''."""
+    return urlsplit(src).query if '://' in src else src.partition('?')[2]
+
+
+class ImageSource(abc.ABC):
+    """Image files by relative path, with a file-name index for fallbacks."""
+
+    def __init__(self, names):
+        self.names = set(names)
+        self.by_basename = {}
+        for name in sorted(self.names):
+            self.by_basename.setdefault(name.rsplit('/', 1)[-1], []).append(name)
+
+    def matches(self, src):
+        """Files ``src`` may refer to: the exact path if present, else every file with its name."""
+        candidates = src_candidates(src)
+        for candidate in candidates:
+            if candidate in self.names:
+                return [candidate]
+        return self.by_basename.get(candidates[-1], []) if candidates else []
+
+    def resolve(self, src):
+        """Name of the file ``src`` refers to, or None if there is none or several."""
+        matches = self.matches(src)
+        return matches[0] if len(matches) == 1 else None
+
+    @abc.abstractmethod
+    def read(self, name):
+        """The bytes of file ``name``; called from several upload threads at once."""
+
+    def close(self):
+        pass
+
+
+class DirectorySource(ImageSource):
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        names = []
+        for directory, _, files in os.walk(self.root):
+            relative = os.path.relpath(directory, self.root).replace(os.sep, '/')
+            prefix = '' if relative == '.' else relative + '/'
+            names.extend(prefix + name for name in files)
+        super().__init__(names)
+
+    def read(self, name):
+        with open(os.path.join(self.root, *name.split('/')), 'rb') as f:
+            return f.read()
+
+
+class ZipSource(ImageSource):
+    # ZipFile serializes member reads internally, so worker threads share it
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path)
+        super().__init__(info.filename for info in self.archive.infolist() if not info.is_dir())
+
+    def read(self, name):
+        return self.archive.read(name)
+
+    def close(self):
+        self.archive.close()
+
+
+class TarSource(ImageSource):
+    def __init__(self, path):
+        self.archive = tarfile.open(path)
+        self.members = {member.name.removeprefix('./'): member for member in self.archive.getmembers() if member.isfile()}
+        self.lock = threading.Lock()
+        super().__init__(self.members)
+
+    def read(self, name):
+        # TarFile shares one file position between readers
+        with self.lock:
+            return self.archive.extractfile(self.members[name]).read()
+
+    def close(self):
+        self.archive.close()
+
+
+def open_image_source(path):
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    if zipfile.is_zipfile(path):
+        return ZipSource(path)
+    if tarfile.is_tarfile(path):
+        return TarSource(path)
+    raise ValueError(f'{path} is not a directory, zip or tar archive')
+
+
+class ImagePipeline:
+    """Resolve, dedupe, upload and rewrite the images of parsed tutorials.
+
+    ``process`` runs in three passes: every referenced image is resolved
+    and hashed (collect, sequentially from local disk; only the digests
+    are kept), the unique ones are read again and uploaded through
+    ``workers`` threads (skipping keys the store already has, retrying
+    failures with exponential backoff), and finally each
+    ``textImages[].src`` is rewritten in place (rewrite). References that cannot be resolved unambiguously or uploaded
+    keep their original ``src``.
+    """
+
+    def __init__(self, source, store, key_template=DEFAULT_KEY_TEMPLATE, workers=8, retries=3, backoff=0.5):
+        self.source = source
+        self.store = store
+        self.key_template = key_template
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+    def image_key(self, tutorial, name, digest, ext):
+        return self.key_template.format(
+            folder=str(tutorial.get('subject', '')).lower(),
+            year=tutorial.get('year', ''),
+            digest=digest,
+            ext=ext,
+            name=name.rsplit('/', 1)[-1]
+        )
+
+    def collect(self, tutorials, report):
+        """Resolve and hash every referenced image.
+
+        Returns ({key: (source file name, sha256)}, [(tutorial position,
+        image dict, key)]); image bytes are read to hash them and dropped. Unresolvable references go to
+        report['missing']; references whose file is ambiguous (several files
+        share the name) or that are distinct crops (query strings) of one
+        file go to report['ambiguous'] and keep their ``src``.
+        """
+        resolved = []
+        crops = {}          # source file name -> query strings it is referenced with
+        for position, tutorial in enumerate(tutorials):
+            for question in tutorial['questions']:
+                for detail in question['questionDetails']:
+                    for image in detail['textImages']:
+                        report['references'] += 1
+                        reference = {'tutorialId': tutorial.get('tutorialId'),
+                                     'questionId': question['questionId'], 'src': image['src']}
+                        matches = self.source.matches(image['src'])
+                        if not matches:
+                            report['missing'].append(reference)
+                        elif len(matches) > 1:
+                            report['ambiguous'].append({**reference, 'matches': matches,
+                                                        'reason': 'several files have this name'})
+                        else:
+                            crops.setdefault(matches[0], set()).add(src_query(image['src']))
+                            resolved.append((position, tutorial, image, reference, matches[0]))
+
+        hashed = {}         # source file name -> (sha256 hex, extension)
+        uploads = {}
+        rewrites = []
+        for position, tutorial, image, reference, name in resolved:
+            if len(crops[name]) > 1:
+                report['ambiguous'].append({**reference, 'matches': [name],
+                                            'reason': 'different crops of this file'})
+                continue
+            if name not in hashed:
+                data = self.source.read(name)
+                hashed[name] = (hashlib.sha256(data).hexdigest(), image_extension(name, data))
+            digest, ext = hashed[name]
+            key = self.image_key(tutorial, name, digest, ext)
+            uploads.setdefault(key, (name, digest))
+            rewrites.append((position, image, key))
+        report['uniqueImages'] = len(uploads)
+        return uploads, rewrites
+
+    def rewrite(self, rewrites, stored):
+        """Point each reference whose key was stored at the stored copy."""
+        for _, image, key in rewrites:
+            if key in stored:
+                image['src'] = self.store.url(key)
+
+    def process(self, tutorials):
+        started = time.perf_counter()
+        report = {'references': 0, 'uniqueImages': 0, 'uploaded': 0, 'alreadyStored': 0,
+                  'uploadedBytes': 0, 'missing': [], 'ambiguous': [], 'failed': []}
+        uploads, rewrites = self.collect(tutorials, report)
+
+        stored = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(call_with_retries,
+                            lambda key=key, name=name: self._upload(key, lambda: self.source.read(name)),
+                            self.retries, self.backoff): key
+                for key, (name, _) in uploads.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    uploaded_bytes = future.result()
+                except Exception as error:
+                    report['failed'].append({'key': key, 'error': f'{type(error).__name__}: {error}'})
+                    continue
+                stored.add(key)
+                if uploaded_bytes is None:
+                    report['alreadyStored'] += 1
+                else:
+                    report['uploaded'] += 1
+                    report['uploadedBytes'] += uploaded_bytes
+
+        self.rewrite(rewrites, stored)
+        report['seconds'] = time.perf_counter() - started
+        return report
+
+    def _upload(self, key, load):
+        """Store one image unless present; returns bytes uploaded, or None if it already existed.
+
+        ``load()`` reads the image only once it is known to be needed.
+        """
+        if self.store.exists(key):
+            return None
+        data = load()
+        self.store.put(key, data, mimetypes.guess_type(key)[0])
+        return len(data)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Upload the images referenced by parsed papers and rewrite their src')
+    arg_parser.add_argument('tutorials', nargs='+', help='tutorial JSON files (generate_json output)')
+    arg_parser.add_argument('--images', required=True, help='image directory or .zip/.tar archive')
+    arg_parser.add_argument('--store', required=True, help='filesystem store root directory')
+    arg_parser.add_argument('--base-url', help='prefix for rewritten src values (default: the bare storage key)')
+    arg_parser.add_argument('--key-template', default=DEFAULT_KEY_TEMPLATE,
+                            help='storage key with {folder} {year} {digest} {ext} {name} '
+                                 f'(default: {DEFAULT_KEY_TEMPLATE})')
+    arg_parser.add_argument('--workers', type=int, default=8, help='concurrent uploads')
+    arg_parser.add_argument('--retries', type=int, default=3, help='retries per failed upload')
+    output = arg_parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--in-place', action='store_true', help='rewrite the tutorial files')
+    output.add_argument('--output-dir', help='write rewritten tutorials here')
+    args = arg_parser.parse_args(argv)
+
+    tutorials = []
+    for path in args.tutorials:
+        with open(path, 'r', encoding='utf-8') as f:
+            tutorials.append(json.load(f))
+
+    source = open_image_source(args.images)
+    try:
+        pipeline = ImagePipeline(source, FilesystemStore(args.store, args.base_url), args.key_template,
+                                 args.workers, args.retries)
+        report = pipeline.process(tutorials)
+    finally:
+        source.close()
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for path, tutorial in zip(args.tutorials, tutorials):
+        target = path if args.in_place else os.path.join(args.output_dir, os.path.basename(path))
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(tutorial, f, indent=2, ensure_ascii=False)
+
+    print(f"🖼️  {report['references']} image references, {report['uniqueImages']} unique: "
+          f"{report['uploaded']} uploaded ({report['uploadedBytes'] / 1024:.0f} KB), "
+          f"{report['alreadyStored']} already stored in {report['seconds']:.2f}s", file=sys.stderr)
+    for missing in report['missing']:
+        print(f"⚠️  {missing['tutorialId']} {missing['questionId']}: image not found: {missing['src']}", file=sys.stderr)
+    for ambiguous in report['ambiguous']:
+        print(f"⚠️  {ambiguous['tutorialId']} {ambiguous['questionId']}: {ambiguous['reason']}: {ambiguous['src']} "
+              f"({', '.join(ambiguous['matches'])})", file=sys.stderr)
+    for failed in report['failed']:
+        print(f"❌ {failed['key']}: {failed['error']}", file=sys.stderr)
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
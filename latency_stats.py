@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+Latency summaries shared by the parse service, the drop watcher and the benchmarks
+"""
+
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    """{'p50': ..., 'max': ...} of ``values`` in milliseconds (nearest rank)."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    summary = {f'p{point}': ordered[min(len(ordered) - 1, -(-len(ordered) * point // 100) - 1)] * 1000
+               for point in points}
+    summary['max'] = ordered[-1] * 1000
+    return summary
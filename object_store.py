@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Pluggable object storage for images and tutorial JSON
+
+Backends implement ObjectStore; FilesystemStore keeps objects under a local
+directory so image uploads and publishing can run (and be tested) offline.
+A cloud backend subclasses ObjectStore the same way and may keep its own
+connection pool, since the pipelines call it from several threads.
+"""
+
+import os
+import abc
+import time
+import threading
+
+
+class ObjectStore(abc.ABC):
+    """Storage backend addressed by key ('images/<sha256>.png').
+
+    Implementations must be safe to call from several threads at once; any
+    exception from put() is retried by the callers.
+    """
+
+    @abc.abstractmethod
+    def exists(self, key):
+        """Whether ``key`` is already stored."""
+
+    @abc.abstractmethod
+    def put(self, key, data, content_type=None):
+        """Store ``data`` (bytes) under ``key``, replacing any previous object."""
+
+    def url(self, key):
+        """What references to a stored key are rewritten to."""
+        return key
+
+
+# The name image_assets used before the publisher shared the interface
+ImageStore = ObjectStore
+
+
+class FilesystemStore(ObjectStore):
+    def __init__(self, root, base_url=None):
+        self.root = root
+        self.base_url = base_url
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, key, data, content_type=None):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per process and thread, so concurrent publishers never share a temp file
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def url(self, key):
+        return self.base_url.rstrip('/') + '/' + key if self.base_url else key
+
+
+def call_with_retries(func, retries=3, backoff=0.5):
+    """Call ``func()``, retrying exceptions with exponential backoff; the last one propagates."""
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
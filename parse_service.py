@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Local HTTP parsing service: markdown in, questions out as NDJSON
+
+A stdlib asyncio server in front of a bounded process pool of
+SophisticatedMarkdownParser workers, so many editors can share one parser
+without blocking each other:
+
+    python parse_service.py --port 8765 --workers 4 --queue-depth 16
+    curl --data-binary @paper.md http://127.0.0.1:8765/parse
+
+Endpoints:
+
+    POST /parse    body is the markdown (UTF-8). The response streams
+                   application/x-ndjson: first {"examInfo": {...}}, then one
+                   question per line. 429 (with Retry-After) when every
+                   worker is busy and the queue is full; 408 when the body
+                   does not arrive within the body timeout.
+    GET  /stats    request counters, latency percentiles and throughput
+    GET  /health   liveness
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import multiprocessing
+from collections import deque
+from urllib.parse import urlsplit
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from latency_stats import percentiles
+from test_md_parser import DEFAULT_QUESTION_BUDGET, FORMAT_PROFILES, SophisticatedMarkdownParser, orjson
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_DEPTH = 16
+DEFAULT_MAX_BODY_BYTES = 32 * 1024 * 1024
+HEADER_TIMEOUT = 30
+DEFAULT_BODY_TIMEOUT = 60
+SHUTDOWN_GRACE = 30
+STREAM_CHUNK_BYTES = 64 * 1024
+LATENCY_WINDOW = 10000
+THROUGHPUT_WINDOW = 60
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 408: 'Request Timeout',
+    411: 'Length Required', 413: 'Payload Too Large', 429: 'Too Many Requests', 500: 'Internal Server Error'
+}
+
+_service_parser = None
+
+
+def _init_service_worker(parser_options):
+    global _service_parser
+    _service_parser = SophisticatedMarkdownParser(**parser_options)
+    # The parser reports progress with print(); workers have no one to show it to
+    sys.stdout = open(os.devnull, 'w')
+
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+def parse_upload(body):
+    """Worker task: parse one upload; returns (NDJSON lines as bytes, question count, parse seconds)."""
+    started = time.perf_counter()
+    content = body.decode('utf-8')
+    result = _service_parser.parse_markdown_content(content)
+    lines = [_dumps({'examInfo': result['examInfo']})]
+    lines.extend(_dumps(question) for question in result['questions'])
+    return lines, len(result['questions']), time.perf_counter() - started
+
+
+class ServiceStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters = {
+            'requests': 0, 'completed': 0, 'rejected': 0, 'failed': 0,
+            'questions': 0, 'bytesIn': 0, 'bytesOut': 0
+        }
+        self.latencies = deque(maxlen=LATENCY_WINDOW)       # request received -> response sent
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)     # request received -> worker started
+        self.parse_times = deque(maxlen=LATENCY_WINDOW)
+        self.completions = deque()                           # (monotonic time, questions)
+
+    def record(self, latency, parse_seconds, questions):
+        now = time.monotonic()
+        self.counters['completed'] += 1
+        self.counters['questions'] += questions
+        self.latencies.append(latency)
+        self.parse_times.append(parse_seconds)
+        self.queue_waits.append(max(0.0, latency - parse_seconds))
+        self.completions.append((now, questions))
+        while self.completions and self.completions[0][0] < now - THROUGHPUT_WINDOW:
+            self.completions.popleft()
+
+    def snapshot(self, active, capacity, workers):
+        uptime = time.monotonic() - self.started
+        recent_window = min(uptime, THROUGHPUT_WINDOW) or 1
+        return {
+            'uptimeSeconds': uptime,
+            'workers': workers,
+            'capacity': capacity,
+            'active': active,
+            'counters': dict(self.counters),
+            'latencyMs': percentiles(self.latencies),
+            'queueWaitMs': percentiles(self.queue_waits),
+            'parseMs': percentiles(self.parse_times),
+            'throughput': {
+                'requestsPerSecond': self.counters['completed'] / uptime if uptime else 0,
+                'questionsPerSecond': self.counters['questions'] / uptime if uptime else 0,
+                'recentRequestsPerSecond': len(self.completions) / recent_window,
+                'recentQuestionsPerSecond': sum(count for _, count in self.completions) / recent_window
+            }
+        }
+
+
+class ParseService:
+    """HTTP front end over a process pool of parsers.
+
+    At most ``workers`` uploads parse at once and ``queue_depth`` more wait
+    for a worker; further uploads are refused with 429 before their body
+    is read. An upload only takes its slot once its whole body has
+    arrived, and a body that takes longer than ``body_timeout`` seconds
+    is answered with 408, so a slow or vanished client never holds a slot.
+    """
+
+    def __init__(self, workers=None, queue_depth=DEFAULT_QUEUE_DEPTH, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                 parser_options=None, body_timeout=DEFAULT_BODY_TIMEOUT):
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + queue_depth
+        self.max_body_bytes = max_body_bytes
+        self.body_timeout = body_timeout
+        self.parser_options = parser_options or {}
+        self.active = 0
+        self.connections = set()
+        self.stats = ServiceStats()
+        self.pool = self._new_pool()
+
+    def _new_pool(self):
+        # Workers forked from the server would inherit its open client sockets
+        # and keep those connections alive after the server closes them
+        context = None
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_service_worker,
+                                   initargs=(self.parser_options,))
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        bound = server.sockets[0].getsockname()
+        print(f'🚀 Parsing service on http://{bound[0]}:{bound[1]} '
+              f'({self.workers} workers, {self.capacity - self.workers} queued)', file=sys.stderr)
+        await stop.wait()
+
+        # Finish the uploads already accepted, then drop idle keep-alive connections
+        server.close()
+        deadline = time.monotonic() + SHUTDOWN_GRACE
+        while self.active and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for writer in list(self.connections):
+            writer.close()
+        while self.connections and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        await server.wait_closed()
+        self.pool.shutdown(cancel_futures=True)
+        print('👋 Parsing service stopped', file=sys.stderr)
+
+    async def handle(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HEADER_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                    break
+                request_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+                try:
+                    method, target, version = request_line.split(' ', 2)
+                    headers = {}
+                    for line in header_lines:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                except ValueError:
+                    await self._send_json(writer, 400, {'error': 'malformed request'}, False)
+                    break
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                keep_alive = await self.route(method, urlsplit(target).path, headers, reader, writer, keep_alive)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def route(self, method, path, headers, reader, writer, keep_alive):
+        """Answer one request; returns whether the connection stays open."""
+        if path == '/parse':
+            if method != 'POST':
+                await self._send_json(writer, 405, {'error': 'use POST'}, keep_alive, {'Allow': 'POST'})
+                return keep_alive
+            return await self.parse(headers, reader, writer, keep_alive)
+        if path in ('/stats', '/health'):
+            if method != 'GET':
+                await self._send_json(writer, 405, {'error': 'use GET'}, keep_alive, {'Allow': 'GET'})
+                return keep_alive
+            body = {'status': 'ok'} if path == '/health' else self.stats.snapshot(self.active, self.capacity, self.workers)
+            await self._send_json(writer, 200, body, keep_alive)
+            return keep_alive
+        await self._send_json(writer, 404, {'error': f'no route for {path}'}, keep_alive)
+        return keep_alive
+
+    async def parse(self, headers, reader, writer, keep_alive):
+        self.stats.counters['requests'] += 1
+        if 'content-length' not in headers:
+            await self._send_json(writer, 411, {'error': 'Content-Length required'}, False)
+            return False
+        length = headers['content-length']
+        if not (length.isascii() and length.isdigit()):
+            await self._send_json(writer, 400, {'error': 'Content-Length must be a non-negative integer'}, False)
+            return False
+        length = int(length)
+        if length > self.max_body_bytes:
+            await self._send_json(writer, 413, {'error': f'upload over {self.max_body_bytes} bytes'}, False)
+            return False
+        if self.active >= self.capacity:
+            # Refuse before reading the body; the unread body means closing
+            return await self._reject(writer, False)
+
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), self.body_timeout)
+        except asyncio.IncompleteReadError:
+            # The client went away mid-upload; there is no one to answer
+            return False
+        except asyncio.TimeoutError:
+            await self._send_json(writer, 408, {'error': f'body not received within {self.body_timeout}s'}, False)
+            return False
+        if self.active >= self.capacity:
+            # The slots filled up while this body was arriving
+            return await self._reject(writer, keep_alive)
+
+        self.active += 1
+        try:
+            received = time.perf_counter()
+            self.stats.counters['bytesIn'] += length
+            pool = self.pool
+            try:
+                lines, questions, parse_seconds = await asyncio.get_running_loop().run_in_executor(
+                    pool, parse_upload, body
+                )
+            except UnicodeDecodeError as error:
+                self.stats.counters['failed'] += 1
+                await self._send_json(writer, 400, {'error': f'upload is not UTF-8: {error}'}, keep_alive)
+                return keep_alive
+            except BrokenProcessPool:
+                self.stats.counters['failed'] += 1
+                # Every request on the crashed pool lands here; only the first replaces it
+                if self.pool is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.pool = self._new_pool()
+                await self._send_json(writer, 500, {'error': 'parser worker crashed'}, keep_alive)
+                return keep_alive
+            except Exception as error:
+                self.stats.counters['failed'] += 1
+                await self._send_json(writer, 500, {'error': f'{type(error).__name__}: {error}'}, keep_alive)
+                return keep_alive
+
+            await self._stream_ndjson(writer, lines, questions, keep_alive)
+            self.stats.record(time.perf_counter() - received, parse_seconds, questions)
+            return keep_alive
+        finally:
+            self.active -= 1
+
+    async def _reject(self, writer, keep_alive):
+        self.stats.counters['rejected'] += 1
+        await self._send_json(writer, 429, {'error': 'overloaded', 'active': self.active}, keep_alive,
+                              {'Retry-After': '1'})
+        return keep_alive
+
+    async def _stream_ndjson(self, writer, lines, questions, keep_alive):
+        writer.write(self._head(200, 'application/x-ndjson', keep_alive,
+                                {'Transfer-Encoding': 'chunked', 'X-Question-Count': str(questions)}))
+        chunk = []
+        size = 0
+        for line in lines:
+            chunk.append(line)
+            chunk.append(b'\n')
+            size += len(line) + 1
+            if size >= STREAM_CHUNK_BYTES:
+                await self._write_chunk(writer, b''.join(chunk))
+                chunk = []
+                size = 0
+        if chunk:
+            await self._write_chunk(writer, b''.join(chunk))
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def _write_chunk(self, writer, data):
+        writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.stats.counters['bytesOut'] += len(data)
+        # Slow readers hold their own request, not the event loop
+        await writer.drain()
+
+    def _head(self, status, content_type, keep_alive, extra_headers=None):
+        lines = [f'HTTP/1.1 {status} {REASONS[status]}', f'Content-Type: {content_type}',
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(f'{name}: {value}' for name, value in (extra_headers or {}).items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _send_json(self, writer, status, body, keep_alive, extra_headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        writer.write(self._head(status, 'application/json', keep_alive,
+                                {'Content-Length': str(len(data)), **(extra_headers or {})}))
+        writer.write(data)
+        await writer.drain()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Serve the markdown parser over HTTP with a worker pool')
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    arg_parser.add_argument('--workers', type=int, default=None, help='parser processes (default: CPU count)')
+    arg_parser.add_argument('--queue-depth', type=int, default=DEFAULT_QUEUE_DEPTH,
+                            help='uploads waiting for a worker before new ones get 429')
+    arg_parser.add_argument('--max-body-mb', type=float, default=DEFAULT_MAX_BODY_BYTES / 2**20,
+                            help='largest accepted upload')
+    arg_parser.add_argument('--body-timeout', type=float, default=DEFAULT_BODY_TIMEOUT, metavar='SECONDS',
+                            help='time allowed to receive an upload before it gets 408')
+    arg_parser.add_argument('--format-profile', choices=['auto', *FORMAT_PROFILES], default='auto')
+    arg_parser.add_argument('--hardened', action='store_true',
+                            help='linear-time image scanning and a per-question CPU budget for malformed OCR output')
+    arg_parser.add_argument('--question-budget', type=float, metavar='SECONDS',
+                            help=f'CPU seconds per question before it is flagged (default with --hardened: {DEFAULT_QUESTION_BUDGET})')
+    args = arg_parser.parse_args(argv)
+
+    service = ParseService(args.workers, args.queue_depth, int(args.max_body_mb * 2**20), {
+        'format_profile': args.format_profile,
+        'hardened': args.hardened,
+        'question_budget': args.question_budget
+    }, args.body_timeout)
+    asyncio.run(service.serve(args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
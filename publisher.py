@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Resumable bulk publisher for parsed tutorials and their images
+
+Every object (content-addressed image, tutorial JSON) is uploaded through a
+pool of worker threads over an ObjectStore backend, and its content hash and
+status are appended to an NDJSON manifest as soon as it completes. A re-run,
+after a crash or with new papers, skips every object whose hash the manifest
+already records as published:
+
+    python publisher.py output/*.json --store published/ --images mathpix_export.zip
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import mimetypes
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from object_store import FilesystemStore, call_with_retries
+from image_assets import DEFAULT_KEY_TEMPLATE as DEFAULT_IMAGE_KEY_TEMPLATE, ImagePipeline, open_image_source
+
+DEFAULT_MANIFEST_PATH = 'publish_manifest.ndjson'
+DEFAULT_TUTORIAL_KEY_TEMPLATE = 'tutorials/{folder}/{year}/{tutorialId}.json'
+
+
+class PublishManifest:
+    """Append-only NDJSON journal of publish results, one line per attempt.
+
+    The last line for a key wins; a line cut short by a crash is ignored.
+    compact() rewrites the file with one line per key.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        torn = False
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    torn = not line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[entry['key']] = entry
+        self.journal = open(path, 'a', encoding='utf-8')
+        if torn:
+            # End the cut-short line so the next record starts on its own
+            self.journal.write('\n')
+
+    def is_published(self, key, content_hash):
+        entry = self.entries.get(key)
+        return entry is not None and entry['status'] == 'published' and entry['hash'] == content_hash
+
+    def record(self, key, content_hash, status, **fields):
+        entry = {'key': key, 'hash': content_hash, 'status': status,
+                 'at': datetime.now().isoformat(timespec='seconds'), **fields}
+        self.entries[key] = entry
+        self.journal.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        # One line per completed upload survives the process dying
+        self.journal.flush()
+
+    def compact(self):
+        self.journal.close()
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(temp_path, self.path)
+        self.journal = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        self.journal.close()
+
+
+class Publisher:
+    """Publish tutorials (and, given an image source, their images) to a store.
+
+    Images go first, so a published tutorial never points at a missing
+    image; a tutorial whose images failed is held back (recorded as
+    failed) until a later run stores them. With ``verify`` a manifest hit
+    is only skipped if the store still has the object. Images the store
+    already has under their content-addressed key are never uploaded again,
+    whatever the manifest says.
+    """
+
+    def __init__(self, store, manifest, image_source=None, key_template=DEFAULT_TUTORIAL_KEY_TEMPLATE,
+                 image_key_template=DEFAULT_IMAGE_KEY_TEMPLATE, workers=8, retries=3, backoff=0.5, verify=False):
+        self.store = store
+        self.manifest = manifest
+        self.image_source = image_source
+        self.key_template = key_template
+        self.image_key_template = image_key_template
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.verify = verify
+
+    def tutorial_key(self, tutorial):
+        return self.key_template.format(
+            folder=str(tutorial.get('subject', '')).lower(),
+            year=tutorial.get('year', ''),
+            board=tutorial.get('board', ''),
+            tutorialId=tutorial['tutorialId']
+        )
+
+    def publish(self, tutorials):
+        started = time.perf_counter()
+        report = {
+            'image': {'published': 0, 'skipped': 0, 'failed': 0},
+            'tutorial': {'published': 0, 'skipped': 0, 'failed': 0},
+            'bytes': 0,
+            'failures': []
+        }
+
+        blocked = set()
+        if self.image_source is not None:
+            pipeline = ImagePipeline(self.image_source, self.store, self.image_key_template)
+            image_report = {'references': 0, 'uniqueImages': 0, 'missing': [], 'ambiguous': []}
+            uploads, rewrites = pipeline.collect(tutorials, image_report)
+            report['missingImages'] = image_report['missing']
+            report['ambiguousImages'] = image_report['ambiguous']
+            jobs = [
+                (key, digest, 'image', lambda name=name: self.image_source.read(name))
+                for key, (name, digest) in uploads.items()
+            ]
+            stored = self._run(jobs, report)
+            pipeline.rewrite(rewrites, stored)
+            blocked = {position for position, _, key in rewrites if key not in stored}
+
+        jobs = []
+        for position, tutorial in enumerate(tutorials):
+            key = self.tutorial_key(tutorial)
+            if position in blocked:
+                self.manifest.record(key, None, 'failed', kind='tutorial', error='images not published')
+                report['tutorial']['failed'] += 1
+                report['failures'].append({'key': key, 'error': 'images not published'})
+                continue
+            data = json.dumps(tutorial, indent=2, ensure_ascii=False).encode('utf-8')
+            jobs.append((key, hashlib.sha256(data).hexdigest(), 'tutorial', lambda data=data: data))
+        self._run(jobs, report)
+
+        self.manifest.compact()
+        report['seconds'] = time.perf_counter() - started
+        return report
+
+    def _run(self, jobs, report):
+        """Upload the jobs not already published; returns every key now published."""
+        published = set()
+        pending = []
+        for key, content_hash, kind, load in jobs:
+            if self.manifest.is_published(key, content_hash) and (not self.verify or self.store.exists(key)):
+                published.add(key)
+                report[kind]['skipped'] += 1
+            else:
+                pending.append((key, content_hash, kind, load))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(call_with_retries, lambda key=key, kind=kind, load=load: self._put(key, kind, load),
+                            self.retries, self.backoff): (key, content_hash, kind)
+                for key, content_hash, kind, load in pending
+            }
+            for future in as_completed(futures):
+                key, content_hash, kind = futures[future]
+                try:
+                    size = future.result()
+                except Exception as error:
+                    message = f'{type(error).__name__}: {error}'
+                    self.manifest.record(key, content_hash, 'failed', kind=kind, error=message)
+                    report[kind]['failed'] += 1
+                    report['failures'].append({'key': key, 'error': message})
+                    continue
+                published.add(key)
+                if size is None:
+                    self.manifest.record(key, content_hash, 'published', kind=kind, bytes=0)
+                    report[kind]['skipped'] += 1
+                    continue
+                self.manifest.record(key, content_hash, 'published', kind=kind, bytes=size)
+                report[kind]['published'] += 1
+                report['bytes'] += size
+        return published
+
+    def _put(self, key, kind, load):
+        """Upload one object; returns its size, or None for an image the store already has."""
+        # Image keys are content-addressed, so a stored key already holds these bytes
+        if kind == 'image' and self.store.exists(key):
+            return None
+        data = load()
+        self.store.put(key, data, mimetypes.guess_type(key)[0])
+        return len(data)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Publish parsed tutorials and their images, resumably')
+    arg_parser.add_argument('tutorials', nargs='+', help='tutorial JSON files (generate_json output)')
+    arg_parser.add_argument('--store', required=True, help='local directory backend root')
+    arg_parser.add_argument('--base-url', help='prefix for rewritten image src values')
+    arg_parser.add_argument('--images', help='image directory or .zip/.tar archive to publish images from')
+    arg_parser.add_argument('--manifest', default=DEFAULT_MANIFEST_PATH,
+                            help=f'publish manifest (default: {DEFAULT_MANIFEST_PATH})')
+    arg_parser.add_argument('--key-template', default=DEFAULT_TUTORIAL_KEY_TEMPLATE,
+                            help='tutorial key with {folder} {year} {board} {tutorialId} '
+                                 f'(default: {DEFAULT_TUTORIAL_KEY_TEMPLATE})')
+    arg_parser.add_argument('--workers', type=int, default=8, help='concurrent uploads')
+    arg_parser.add_argument('--retries', type=int, default=3, help='retries per failed upload')
+    arg_parser.add_argument('--verify', action='store_true', help='re-upload manifest entries missing from the store')
+    args = arg_parser.parse_args(argv)
+
+    tutorials = []
+    for path in args.tutorials:
+        with open(path, 'r', encoding='utf-8') as f:
+            tutorials.append(json.load(f))
+
+    image_source = open_image_source(args.images) if args.images else None
+    manifest = PublishManifest(args.manifest)
+    try:
+        publisher = Publisher(FilesystemStore(args.store, args.base_url), manifest, image_source,
+                              args.key_template, workers=args.workers, retries=args.retries, verify=args.verify)
+        report = publisher.publish(tutorials)
+    finally:
+        manifest.close()
+        if image_source is not None:
+            image_source.close()
+
+    for kind in ('image', 'tutorial'):
+        counts = report[kind]
+        print(f"📤 {kind}s: {counts['published']} published, {counts['skipped']} already published, "
+              f"{counts['failed']} failed", file=sys.stderr)
+    for missing in report.get('missingImages', []):
+        print(f"⚠️  {missing['tutorialId']} {missing['questionId']}: image not found: {missing['src']}", file=sys.stderr)
+    for ambiguous in report.get('ambiguousImages', []):
+        print(f"⚠️  {ambiguous['tutorialId']} {ambiguous['questionId']}: {ambiguous['reason']}: {ambiguous['src']} "
+              f"({', '.join(ambiguous['matches'])})", file=sys.stderr)
+    for failure in report['failures']:
+        print(f"❌ {failure['key']}: {failure['error']}", file=sys.stderr)
+    print(f"✅ {report['bytes'] / 1024:.0f} KB in {report['seconds']:.2f}s; manifest: {args.manifest}", file=sys.stderr)
+    return 1 if report['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
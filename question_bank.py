@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+SQLite question bank: full-text search across every parsed paper
+
+Tutorials (generate_json output, or markdown parsed on the way in) are
+stored one row per question with subject, year, marks and tutorialId
+columns, and an FTS5 index over each question's stem, options and solution:
+
+    python question_bank.py ingest papers/ output/*.json
+    python question_bank.py search capacitor --subject Physics --year 2024
+    python question_bank.py search --marks 4 --year 2024 --limit 50
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import contextlib
+from datetime import datetime
+
+from test_md_parser import SophisticatedMarkdownParser
+
+DEFAULT_DB_PATH = 'question_bank.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tutorials (
+    tutorial_id TEXT PRIMARY KEY,
+    title TEXT,
+    subject TEXT,
+    year TEXT,
+    source TEXT,
+    content_hash TEXT,
+    total_questions INTEGER,
+    ingested_at TEXT
+);
+CREATE INDEX IF NOT EXISTS tutorials_source ON tutorials (source);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    tutorial_id TEXT NOT NULL,
+    question_index INTEGER,
+    question_id TEXT,
+    subject TEXT,
+    year TEXT,
+    marks TEXT,
+    question TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_tutorial ON questions (tutorial_id, question_index);
+CREATE INDEX IF NOT EXISTS questions_filters ON questions (subject, year, marks);
+CREATE VIRTUAL TABLE IF NOT EXISTS question_text USING fts5(
+    stem, options, solution, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# question_text rowids are questions.id; every query filters through this join
+FILTER_COLUMNS = {'subject': 'q.subject', 'year': 'q.year', 'marks': 'q.marks', 'tutorial_id': 'q.tutorial_id'}
+
+
+def question_texts(question):
+    """(stem, options, solution) text of one parsed question, as indexed."""
+    details = question['questionDetails']
+    stem = '\n'.join(detail['text'] for detail in details)
+    options = '\n'.join(
+        option['text'] for detail in details for option in detail['possibleAnswers'].values()
+    )
+    return stem, options, question.get('solution', '')
+
+
+def plain_text_query(text):
+    """Turn free text into an FTS5 query that requires every word, with no operators."""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def find_source_files(source):
+    """Expand a directory (every *.json and *.md inside it, recursively), a glob or a file."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '**', '*.json'), recursive=True)
+        paths += glob.glob(os.path.join(source, '**', '*.md'), recursive=True)
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+@contextlib.contextmanager
+def savepoint(db, name):
+    """Apply the block's writes all or nothing, inside the batch transaction.
+
+    A failure (after deletes, say) is rolled back to the savepoint, so
+    earlier uncommitted batch writes survive and nothing half-applied is
+    committed by the next flush.
+    """
+    if not db.in_transaction:
+        db.execute('BEGIN')
+    db.execute(f'SAVEPOINT {name}')
+    try:
+        yield
+    except BaseException:
+        db.execute(f'ROLLBACK TO {name}')
+        db.execute(f'RELEASE {name}')
+        raise
+    db.execute(f'RELEASE {name}')
+
+
+class QuestionBank:
+    """Question-bank index in one SQLite file.
+
+    Writes are batched: inserts accumulate in an open transaction that is
+    committed every ``batch_questions`` questions (and on flush/close).
+    Re-ingesting a tutorialId (or another tutorial from the same source
+    file) replaces its questions, and each tutorial is applied all or
+    nothing; a source file whose bytes have not changed since it was
+    ingested is skipped.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, batch_questions=5000, parser=None):
+        self.path = path
+        self.batch_questions = batch_questions
+        self.parser = parser
+        self.pending_writes = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        try:
+            self.db.executescript(SCHEMA)
+        except sqlite3.OperationalError as error:
+            if 'fts5' in str(error):
+                raise RuntimeError('this SQLite build has no FTS5; the question bank needs it') from error
+            raise
+
+    # Ingestion
+
+    def ingest_tutorial(self, tutorial, source=None, content_hash=None):
+        """Index one generate_json-shaped tutorial, replacing any earlier copy of its
+        tutorialId and any tutorial previously ingested from the same ``source``.
+
+        Nothing changes if the tutorial cannot be indexed (e.g. a question
+        without a questionId): the error is raised after rolling back.
+        """
+        with savepoint(self.db, 'ingest_tutorial'):
+            count = self._ingest_tutorial(tutorial, source, content_hash)
+        self.pending_writes += count + 1
+        if self.pending_writes >= self.batch_questions:
+            self.flush()
+        return count
+
+    def _ingest_tutorial(self, tutorial, source, content_hash):
+        tutorial_id = tutorial['tutorialId']
+        self.remove_tutorial(tutorial_id, commit=False)
+        if source is not None:
+            # generate_json stamps a new tutorialId every run, so a regenerated
+            # file would otherwise be indexed next to its previous copy
+            previous = self.db.execute('SELECT tutorial_id FROM tutorials WHERE source = ?', (source,)).fetchall()
+            for (previous_id,) in previous:
+                self.remove_tutorial(previous_id, commit=False)
+
+        questions = tutorial['questions']
+        next_id = self.db.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM questions').fetchone()[0]
+        question_rows = []
+        text_rows = []
+        for offset, question in enumerate(questions):
+            row_id = next_id + offset
+            question_rows.append((
+                row_id,
+                tutorial_id,
+                int(question['questionIndex']),
+                question['questionId'],
+                question['subject'],
+                tutorial['year'],
+                question['marks'],
+                json.dumps(question, ensure_ascii=False, separators=(',', ':'))
+            ))
+            text_rows.append((row_id, *question_texts(question)))
+
+        self.db.execute(
+            'INSERT INTO tutorials (tutorial_id, title, subject, year, source, content_hash, total_questions, ingested_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (tutorial_id, tutorial.get('tutorialTitle'), tutorial.get('subject'), tutorial['year'],
+             source, content_hash, len(questions), datetime.now().isoformat(timespec='seconds'))
+        )
+        self.db.executemany('INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?)', question_rows)
+        self.db.executemany(
+            'INSERT INTO question_text (rowid, stem, options, solution) VALUES (?, ?, ?, ?)', text_rows
+        )
+        return len(questions)
+
+    def ingest_json_file(self, path):
+        """Index a tutorial JSON file; returns the number of questions, or None when unchanged."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        source = os.path.abspath(path)
+        content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if self._ingested_from(source, content_hash):
+            return None
+        return self.ingest_tutorial(json.loads(data), source=source, content_hash=content_hash)
+
+    def ingest_markdown_file(self, path):
+        """Parse a markdown paper and index it; returns the number of questions, or None when unchanged.
+
+        generate_json stamps tutorialIds with the current time, so a paper
+        keeps the id it was first indexed under (looked up by its path);
+        new papers get ``<subject>_<year>_<content hash>``.
+        """
+        source = os.path.abspath(path)
+        with open(path, 'rb') as f:
+            content_hash = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        row = self.db.execute('SELECT tutorial_id, content_hash FROM tutorials WHERE source = ?', (source,)).fetchone()
+        if row and row[1] == content_hash:
+            return None
+
+        if self.parser is None:
+            self.parser = SophisticatedMarkdownParser()
+        result = self.parser.parse_markdown_file(path)
+        tutorial = self.parser.generate_json(result['examInfo'], result['questions'])
+        exam_info = result['examInfo']
+        tutorial['tutorialId'] = row[0] if row else f"{exam_info['subject']}_{exam_info['year']}_{content_hash[:12]}"
+        return self.ingest_tutorial(tutorial, source=source, content_hash=content_hash)
+
+    def ingest_paths(self, paths):
+        """Index every .json/.md path; yields (path, questions or None if unchanged, error)."""
+        for path in paths:
+            try:
+                if path.endswith('.md'):
+                    count = self.ingest_markdown_file(path)
+                else:
+                    count = self.ingest_json_file(path)
+                yield path, count, None
+            except Exception as error:
+                yield path, 0, f'{type(error).__name__}: {error}'
+        self.flush()
+
+    def _ingested_from(self, source, content_hash):
+        row = self.db.execute('SELECT 1 FROM tutorials WHERE source = ? AND content_hash = ?', (source, content_hash)).fetchone()
+        return row is not None
+
+    def remove_tutorial(self, tutorial_id, commit=True):
+        ids = 'SELECT id FROM questions WHERE tutorial_id = ?'
+        self.db.execute(f'DELETE FROM question_text WHERE rowid IN ({ids})', (tutorial_id,))
+        self.db.execute('DELETE FROM questions WHERE tutorial_id = ?', (tutorial_id,))
+        self.db.execute('DELETE FROM tutorials WHERE tutorial_id = ?', (tutorial_id,))
+        if commit:
+            self.flush()
+
+    def flush(self):
+        self.db.commit()
+        self.pending_writes = 0
+
+    def optimize(self):
+        """Merge the FTS index segments; worth running after a large ingest."""
+        self.flush()
+        self.db.execute("INSERT INTO question_text (question_text) VALUES ('optimize')")
+        self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+    # Queries
+
+    def search(self, text=None, subject=None, year=None, marks=None, tutorial_id=None,
+               limit=20, offset=0, match=None):
+        """Questions matching every word of ``text`` (or the raw FTS5 expression ``match``)
+        and all of the given column filters, best match first.
+
+        Each result has tutorialId, questionId, questionIndex, subject, year,
+        marks and the stored question; text searches add a highlighted
+        ``snippet``. Without text, questions come in tutorial order.
+        """
+        query = match or (plain_text_query(text) if text else None)
+        filters = {'subject': subject, 'year': year, 'marks': marks, 'tutorial_id': tutorial_id}
+        where = [f'{FILTER_COLUMNS[name]} = ?' for name, value in filters.items() if value is not None]
+        params = [str(value) for value in filters.values() if value is not None]
+
+        columns = 'q.tutorial_id, q.question_id, q.question_index, q.subject, q.year, q.marks, q.question'
+        if query:
+            sql = (f"SELECT {columns}, snippet(question_text, -1, '[', ']', '…', 16) "
+                   'FROM question_text JOIN questions q ON q.id = question_text.rowid '
+                   'WHERE question_text MATCH ?')
+            params.insert(0, query)
+            if where:
+                sql += ' AND ' + ' AND '.join(where)
+            sql += ' ORDER BY question_text.rank'
+        else:
+            sql = f'SELECT {columns}, NULL FROM questions q'
+            if where:
+                sql += ' WHERE ' + ' AND '.join(where)
+            sql += ' ORDER BY q.tutorial_id, q.question_index'
+        sql += ' LIMIT ? OFFSET ?'
+        params += [limit, offset]
+
+        results = []
+        for tutorial_id, question_id, question_index, subject, year, marks, question, snippet in self.db.execute(sql, params):
+            result = {
+                'tutorialId': tutorial_id,
+                'questionId': question_id,
+                'questionIndex': question_index,
+                'subject': subject,
+                'year': year,
+                'marks': marks,
+                'question': json.loads(question)
+            }
+            if snippet is not None:
+                result['snippet'] = snippet
+            results.append(result)
+        return results
+
+    def stats(self):
+        tutorials = self.db.execute('SELECT COUNT(*) FROM tutorials').fetchone()[0]
+        questions = self.db.execute('SELECT COUNT(*) FROM questions').fetchone()[0]
+        subjects = dict(self.db.execute('SELECT subject, COUNT(*) FROM questions GROUP BY subject ORDER BY subject'))
+        years = dict(self.db.execute('SELECT year, COUNT(*) FROM questions GROUP BY year ORDER BY year'))
+        return {'tutorials': tutorials, 'questions': questions, 'subjects': subjects, 'years': years}
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Index parsed papers in SQLite and search across them')
+    arg_parser.add_argument('--db', default=DEFAULT_DB_PATH, help=f'question bank file (default: {DEFAULT_DB_PATH})')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help='index tutorial JSON files and/or markdown papers')
+    ingest.add_argument('sources', nargs='+', help='files, directories or glob patterns (*.json, *.md)')
+    ingest.add_argument('--batch-questions', type=int, default=5000, help='questions per committed transaction')
+    ingest.add_argument('--optimize', action='store_true', help='merge the full-text index afterwards')
+
+    search = commands.add_parser('search', help='print matching questions as NDJSON')
+    search.add_argument('text', nargs='*', help='words that must all appear in the stem, options or solution')
+    search.add_argument('--match', help='raw FTS5 query instead of plain words (e.g. "capacitor NOT charge")')
+    search.add_argument('--subject')
+    search.add_argument('--year')
+    search.add_argument('--marks')
+    search.add_argument('--tutorial-id')
+    search.add_argument('--limit', type=int, default=20)
+    search.add_argument('--offset', type=int, default=0)
+
+    commands.add_parser('stats', help='print question counts by subject and year')
+    args = arg_parser.parse_args(argv)
+
+    bank = QuestionBank(args.db, batch_questions=getattr(args, 'batch_questions', 5000))
+    try:
+        if args.command == 'ingest':
+            paths = [path for source in args.sources for path in find_source_files(source)]
+            if not paths:
+                arg_parser.error('no .json or .md files match the given sources')
+            started = time.perf_counter()
+            indexed = skipped = failed = questions = 0
+            for path, count, error in bank.ingest_paths(paths):
+                if error:
+                    failed += 1
+                    print(f'❌ {path}: {error}', file=sys.stderr)
+                elif count is None:
+                    skipped += 1
+                else:
+                    indexed += 1
+                    questions += count
+            if args.optimize:
+                bank.optimize()
+            print(f'🗃️  {indexed} papers ({questions} questions) indexed, {skipped} unchanged, {failed} failed '
+                  f'in {time.perf_counter() - started:.2f}s', file=sys.stderr)
+            return 1 if failed else 0
+
+        if args.command == 'search':
+            started = time.perf_counter()
+            results = bank.search(' '.join(args.text) or None, args.subject, args.year, args.marks,
+                                  args.tutorial_id, args.limit, args.offset, args.match)
+            elapsed = time.perf_counter() - started
+            for result in results:
+                sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+            print(f'🔎 {len(results)} results in {elapsed * 1000:.1f} ms', file=sys.stderr)
+            return 0
+
+        json.dump(bank.stats(), sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write('\n')
+        return 0
+    finally:
+        bank.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
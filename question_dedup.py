@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate question detection with MinHash signatures and LSH banding
+
+Each question's stem and options are normalized (math delimiters, LaTeX
+spacing/sizing commands, braces and all whitespace stripped, casefolded),
+cut into character shingles and summarized as a MinHash signature. The
+signature is split into bands; questions sharing any band bucket are
+candidates, and candidates whose estimated Jaccard similarity reaches the
+threshold are recorded as duplicate pairs. The index lives in SQLite
+(usually the question bank's own file), so adding a paper only compares its
+questions against the buckets already stored:
+
+    python question_dedup.py --db question_bank.sqlite update
+    python question_dedup.py --db question_bank.sqlite clusters --min-similarity 0.9
+"""
+
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import operator
+from array import array
+
+from question_bank import DEFAULT_DB_PATH, QuestionBank, find_source_files, savepoint
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16          # 8 rows per band: candidates from ~0.7 similarity
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_SHINGLE_SIZE = 5
+MIN_NORMALIZED_CHARS = 16   # shorter (e.g. image-only) questions are not indexed
+
+MATH_DELIMITERS = re.compile(r'\$\$?|\\[()\[\]]')
+LATEX_NOISE = re.compile(
+    r'\\(?:left|right|[bB]igg?[lr]?|displaystyle|mathrm|text|operatorname)\b|\\q?quad\b|\\[,;:! ]|[{}~]'
+)
+WHITESPACE = re.compile(r'\s+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedup_settings (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS dedup_tutorials (
+    tutorial_id TEXT PRIMARY KEY,
+    version TEXT
+);
+CREATE TABLE IF NOT EXISTS dedup_questions (
+    id INTEGER PRIMARY KEY,
+    tutorial_id TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dedup_questions_tutorial ON dedup_questions (tutorial_id);
+CREATE TABLE IF NOT EXISTS dedup_buckets (
+    band INTEGER,
+    bucket INTEGER,
+    question INTEGER,
+    PRIMARY KEY (band, bucket, question)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dedup_pairs (
+    a INTEGER,
+    b INTEGER,
+    similarity REAL,
+    PRIMARY KEY (a, b)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS dedup_pairs_b ON dedup_pairs (b);
+"""
+
+
+def normalize_text(text):
+    """Strip math delimiters, LaTeX spacing/sizing noise and whitespace; casefold."""
+    text = MATH_DELIMITERS.sub(' ', text)
+    text = LATEX_NOISE.sub(' ', text)
+    return WHITESPACE.sub('', text).casefold()
+
+
+def question_fingerprint_text(question):
+    """Normalized stem plus options (sorted, so reordered options still match)."""
+    stems = []
+    options = []
+    for detail in question['questionDetails']:
+        stems.append(normalize_text(detail['text']))
+        options.extend(normalize_text(option['text']) for option in detail['possibleAnswers'].values())
+    return ''.join(stems) + '|' + '|'.join(sorted(options))
+
+
+def shingles(text, size=DEFAULT_SHINGLE_SIZE):
+    encoded = text.encode('utf-8')
+    return {encoded[i:i + size] for i in range(max(1, len(encoded) - size + 1))}
+
+
+def minhash_signature(shingle_set, num_perm=DEFAULT_NUM_PERM):
+    """``num_perm`` 32-bit minima, one per hash function.
+
+    SHAKE-128 gives every shingle ``num_perm`` independent 32-bit hashes in
+    one call; the signature is the column-wise minimum over all shingles.
+    """
+    values = array('I', b''.join([hashlib.shake_128(shingle).digest(4 * num_perm) for shingle in shingle_set]))
+    return array('I', [min(values[i::num_perm]) for i in range(num_perm)])
+
+
+def estimated_similarity(signature, other):
+    """Share of equal MinHash values, an estimate of the shingle sets' Jaccard similarity."""
+    return sum(map(operator.eq, signature, other)) / len(signature)
+
+
+def band_buckets(signature, bands):
+    """One 64-bit bucket key per band of the signature."""
+    rows = len(signature) // bands
+    data = signature.tobytes()
+    width = rows * signature.itemsize
+    return [
+        int.from_bytes(hashlib.blake2b(data[band * width:(band + 1) * width], digest_size=8).digest(),
+                       'little', signed=True)
+        for band in range(bands)
+    ]
+
+
+class DuplicateIndex:
+    """Persistent MinHash/LSH index of questions, keyed by (tutorialId, questionId).
+
+    The signature settings are fixed when the index is created; reopening it
+    with different ones raises ValueError rather than mixing signatures.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                 threshold=DEFAULT_THRESHOLD, shingle_size=DEFAULT_SHINGLE_SIZE, batch_questions=5000):
+        if num_perm % bands:
+            raise ValueError(f'num_perm ({num_perm}) must be a multiple of bands ({bands})')
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.batch_questions = batch_questions
+        self.pending_writes = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        self.db.executescript(SCHEMA)
+        self._check_settings()
+
+    def _check_settings(self):
+        settings = {'num_perm': str(self.num_perm), 'bands': str(self.bands), 'shingle_size': str(self.shingle_size)}
+        stored = dict(self.db.execute('SELECT name, value FROM dedup_settings'))
+        if not stored:
+            self.db.executemany('INSERT INTO dedup_settings VALUES (?, ?)', settings.items())
+            self.db.commit()
+        elif stored != settings:
+            raise ValueError(f'{self.path} holds signatures built with {stored}, not {settings}')
+
+    def signature(self, question):
+        """MinHash signature of a parsed question, or None if it has too little text."""
+        text = question_fingerprint_text(question)
+        if len(text) - text.count('|') < MIN_NORMALIZED_CHARS:
+            return None
+        return minhash_signature(shingles(text, self.shingle_size), self.num_perm)
+
+    def add_tutorial(self, tutorial_id, questions, version=None):
+        """Index one tutorial's questions, replacing an earlier copy of it.
+
+        Each question is compared only with the questions sharing one of its
+        band buckets (including earlier questions of the same tutorial).
+        Returns the new duplicate pairs as (question key, question key,
+        similarity), keys being (tutorialId, questionId). Nothing changes if
+        a question cannot be indexed.
+        """
+        with savepoint(self.db, 'add_tutorial'):
+            signatures, pairs = self._add_tutorial(tutorial_id, questions, version)
+        self.pending_writes += len(signatures) + 1
+        if self.pending_writes >= self.batch_questions:
+            self.flush()
+        keys = self._keys({question for pair in pairs for question in pair[:2]})
+        return [(keys[a], keys[b], similarity) for a, b, similarity in pairs]
+
+    def _add_tutorial(self, tutorial_id, questions, version):
+        self.remove_tutorial(tutorial_id, commit=False)
+        next_id = self.db.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM dedup_questions').fetchone()[0]
+        signatures = {}
+        pairs = []
+        for question in questions:
+            signature = self.signature(question)
+            if signature is None:
+                continue
+            row_id = next_id
+            next_id += 1
+            buckets = band_buckets(signature, self.bands)
+
+            candidates = set()
+            for band, bucket in enumerate(buckets):
+                candidates.update(row[0] for row in self.db.execute(
+                    'SELECT question FROM dedup_buckets WHERE band = ? AND bucket = ?', (band, bucket)
+                ))
+            for candidate in sorted(candidates):
+                other = signatures.get(candidate)
+                if other is None:
+                    other = array('I', self.db.execute(
+                        'SELECT signature FROM dedup_questions WHERE id = ?', (candidate,)
+                    ).fetchone()[0])
+                similarity = estimated_similarity(signature, other)
+                if similarity >= self.threshold:
+                    pairs.append((candidate, row_id, similarity))
+
+            signatures[row_id] = signature
+            self.db.execute('INSERT INTO dedup_questions VALUES (?, ?, ?, ?)',
+                            (row_id, tutorial_id, question['questionId'], signature.tobytes()))
+            self.db.executemany('INSERT INTO dedup_buckets VALUES (?, ?, ?)',
+                                [(band, bucket, row_id) for band, bucket in enumerate(buckets)])
+
+        self.db.executemany('INSERT INTO dedup_pairs VALUES (?, ?, ?)', pairs)
+        self.db.execute('INSERT OR REPLACE INTO dedup_tutorials VALUES (?, ?)', (tutorial_id, version))
+        return signatures, pairs
+
+    def remove_tutorial(self, tutorial_id, commit=True):
+        ids = 'SELECT id FROM dedup_questions WHERE tutorial_id = ?'
+        self.db.execute(f'DELETE FROM dedup_pairs WHERE a IN ({ids}) OR b IN ({ids})', (tutorial_id, tutorial_id))
+        self.db.execute(f'DELETE FROM dedup_buckets WHERE question IN ({ids})', (tutorial_id,))
+        self.db.execute('DELETE FROM dedup_questions WHERE tutorial_id = ?', (tutorial_id,))
+        self.db.execute('DELETE FROM dedup_tutorials WHERE tutorial_id = ?', (tutorial_id,))
+        if commit:
+            self.flush()
+
+    def sync_bank(self, bank):
+        """Bring the index in line with a QuestionBank: index new and re-ingested
+        tutorials, drop removed ones. Yields (tutorialId, new pairs or None if removed).
+        """
+        current = {
+            tutorial_id: f'{content_hash}:{ingested_at}'
+            for tutorial_id, content_hash, ingested_at in bank.db.execute(
+                'SELECT tutorial_id, content_hash, ingested_at FROM tutorials'
+            )
+        }
+        indexed = dict(self.db.execute('SELECT tutorial_id, version FROM dedup_tutorials'))
+        for tutorial_id in sorted(set(indexed) - set(current)):
+            self.remove_tutorial(tutorial_id, commit=False)
+            yield tutorial_id, None
+        for tutorial_id, version in sorted(current.items()):
+            if indexed.get(tutorial_id) == version:
+                continue
+            questions = [
+                json.loads(row[0]) for row in bank.db.execute(
+                    'SELECT question FROM questions WHERE tutorial_id = ? ORDER BY question_index', (tutorial_id,)
+                )
+            ]
+            yield tutorial_id, self.add_tutorial(tutorial_id, questions, version)
+        self.flush()
+
+    def _keys(self, ids):
+        keys = {}
+        for row_id in ids:
+            keys[row_id] = self.db.execute(
+                'SELECT tutorial_id, question_id FROM dedup_questions WHERE id = ?', (row_id,)
+            ).fetchone()
+        return keys
+
+    def clusters(self, min_similarity=None):
+        """Connected groups of duplicate pairs, largest first.
+
+        Each cluster lists its questions as {tutorialId, questionId} and the
+        pairs (with similarity) that link them.
+        """
+        min_similarity = self.threshold if min_similarity is None else min_similarity
+        pairs = self.db.execute(
+            'SELECT a, b, similarity FROM dedup_pairs WHERE similarity >= ? ORDER BY a, b', (min_similarity,)
+        ).fetchall()
+
+        parent = {}
+
+        def find(node):
+            root = node
+            while parent.setdefault(root, root) != root:
+                root = parent[root]
+            while parent[node] != root:
+                parent[node], node = root, parent[node]
+            return root
+
+        for a, b, _ in pairs:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = {}
+        for a, b, similarity in pairs:
+            groups.setdefault(find(a), []).append((a, b, similarity))
+        keys = self._keys(parent)
+
+        def key(row_id):
+            tutorial_id, question_id = keys[row_id]
+            return {'tutorialId': tutorial_id, 'questionId': question_id}
+
+        clusters = []
+        for edges in groups.values():
+            members = sorted({row_id for edge in edges for row_id in edge[:2]})
+            similarities = [similarity for _, _, similarity in edges]
+            clusters.append({
+                'size': len(members),
+                'maxSimilarity': max(similarities),
+                'minSimilarity': min(similarities),
+                'questions': [key(row_id) for row_id in members],
+                'pairs': [{'a': key(a), 'b': key(b), 'similarity': similarity} for a, b, similarity in edges]
+            })
+        clusters.sort(key=lambda cluster: (-cluster['size'], -cluster['maxSimilarity']))
+        return clusters
+
+    def stats(self):
+        return {
+            'tutorials': self.db.execute('SELECT COUNT(*) FROM dedup_tutorials').fetchone()[0],
+            'questions': self.db.execute('SELECT COUNT(*) FROM dedup_questions').fetchone()[0],
+            'pairs': self.db.execute('SELECT COUNT(*) FROM dedup_pairs').fetchone()[0]
+        }
+
+    def flush(self):
+        self.db.commit()
+        self.pending_writes = 0
+
+    def rollback(self):
+        """Discard every write since the last flush."""
+        self.db.rollback()
+        self.pending_writes = 0
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Find near-duplicate questions across papers (MinHash/LSH)')
+    arg_parser.add_argument('--db', default=DEFAULT_DB_PATH, help=f'question bank / index file (default: {DEFAULT_DB_PATH})')
+    arg_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='estimated similarity at which a candidate pair is recorded')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('update', help="index the question bank's new and changed tutorials")
+    add = commands.add_parser('add', help='index tutorial JSON files directly (without the question bank)')
+    add.add_argument('sources', nargs='+', help='tutorial JSON files, directories or glob patterns')
+    clusters = commands.add_parser('clusters', help='print duplicate clusters as JSON')
+    clusters.add_argument('--min-similarity', type=float, help='only use pairs at least this similar')
+    clusters.add_argument('--output', metavar='PATH', help='write clusters JSON to PATH (default: stdout)')
+    args = arg_parser.parse_args(argv)
+
+    index = DuplicateIndex(args.db, threshold=args.threshold)
+    try:
+        if args.command in ('update', 'add'):
+            started = time.perf_counter()
+            tutorials = pairs = 0
+            if args.command == 'update':
+                bank = QuestionBank(args.db)
+                try:
+                    for _, new_pairs in index.sync_bank(bank):
+                        tutorials += 1
+                        pairs += len(new_pairs or ())
+                finally:
+                    bank.close()
+            else:
+                paths = [path for source in args.sources for path in find_source_files(source)
+                         if path.endswith('.json')]
+                if not paths:
+                    arg_parser.error('no tutorial JSON files match the given sources')
+                for path in paths:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        tutorial = json.load(f)
+                    pairs += len(index.add_tutorial(tutorial['tutorialId'], tutorial['questions']))
+                    tutorials += 1
+                index.flush()
+            stats = index.stats()
+            print(f'🔁 {tutorials} papers indexed, {pairs} new duplicate pairs in {time.perf_counter() - started:.2f}s '
+                  f"({stats['questions']} questions, {stats['pairs']} pairs in the index)", file=sys.stderr)
+            return 0
+
+        result = index.clusters(args.min_similarity)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            print(f'💾 {len(result)} duplicate clusters saved to: {args.output}', file=sys.stderr)
+        else:
+            json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+            sys.stdout.write('\n')
+        return 0
+    except BaseException:
+        # close() commits; a failed run must not leave a partial update behind
+        index.rollback()
+        raise
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
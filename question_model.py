@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Compact slotted question model for holding large numbers of parsed questions
+
+parse_question produces nested dicts (question -> details list -> option
+dicts); these classes keep the same data in ``__slots__`` objects with
+interned subjects, answers and letters, and rebuild the exact dict with
+``to_dict()`` at the JSON boundary. The parser still builds each question
+as dicts first: SophisticatedMarkdownParser.extract_question_models
+converts every question right after it is parsed, so a paper's questions
+are never all held as dicts at once.
+"""
+
+import sys
+from dataclasses import dataclass
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class ImageRef:
+    src: str
+    alt: str
+    type: str
+
+    @classmethod
+    def from_dict(cls, image):
+        return cls(image['src'], _intern(image['alt']), _intern(image['type']))
+
+    def to_dict(self):
+        return {'src': self.src, 'alt': self.alt, 'type': self.type}
+
+
+@dataclass(slots=True)
+class Option:
+    letter: str
+    text: str
+    image: object = None
+
+    def to_dict(self):
+        return {'text': self.text, 'image': self.image}
+
+
+@dataclass(slots=True)
+class QuestionDetail:
+    text: str
+    images: tuple
+    options: tuple
+    correct_answer: str
+    correct_answer_text: str
+
+    @classmethod
+    def from_dict(cls, detail):
+        options = tuple(
+            Option(_intern(letter), option['text'], option['image'])
+            for letter, option in detail['possibleAnswers'].items()
+        )
+        correct_answer = _intern(detail['correctAnswer'])
+        correct_answer_text = detail['correctAnswerText']
+        # Share the option's string instead of holding a second copy
+        for option in options:
+            if option.letter == correct_answer and option.text == correct_answer_text:
+                correct_answer_text = option.text
+        return cls(
+            detail['text'],
+            tuple(ImageRef.from_dict(image) for image in detail['textImages']),
+            options,
+            correct_answer,
+            correct_answer_text
+        )
+
+    def to_dict(self):
+        return {
+            'text': self.text,
+            'textImages': [image.to_dict() for image in self.images],
+            'possibleAnswers': {option.letter: option.to_dict() for option in self.options},
+            'correctAnswer': self.correct_answer,
+            'correctAnswerText': self.correct_answer_text
+        }
+
+
+@dataclass(slots=True)
+class Question:
+    """One parsed question; questionIndex/questionId are derived from ``index``."""
+
+    index: int
+    details: tuple
+    subject: str
+    solution: str
+    marks: str
+    flags: tuple = ()
+
+    @classmethod
+    def from_dict(cls, question):
+        return cls(
+            int(question['questionIndex']),
+            tuple(QuestionDetail.from_dict(detail) for detail in question['questionDetails']),
+            _intern(question['subject']),
+            question['solution'],
+            _intern(question['marks']),
+            tuple(_intern(flag) for flag in question.get('flags', ()))
+        )
+
+    def to_dict(self):
+        question = {
+            'questionIndex': str(self.index),
+            'questionId': f'Q{self.index}',
+            'questionDetails': [detail.to_dict() for detail in self.details],
+            'subject': self.subject,
+            'solution': self.solution,
+            'marks': self.marks
+        }
+        if self.flags:
+            question['flags'] = list(self.flags)
+        return question
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Batch mode: many papers across a process pool, failures recorded per paper
+"""
+
+import os
+import json
+
+from test_md_parser import batch_output_paths, find_markdown_files, main, run_batch
+from benchmarks.synthetic import generate_paper
+
+
+def test_run_batch_records_failures_without_stopping(tmp_path, synthetic_paper):
+    source = tmp_path / 'in'
+    (source / 's1').mkdir(parents=True)
+    (source / 's2').mkdir()
+    (source / 'good.md').write_text(synthetic_paper, encoding='utf-8')
+    (source / 'broken.md').write_bytes(b'1. \xff\xfe not UTF-8 (1) a Ans. (1)\n')
+    # Same file name in two folders: each keeps its own output
+    (source / 's1' / 'paper.md').write_text(generate_paper(5, seed=3), encoding='utf-8')
+    (source / 's2' / 'paper.md').write_text(generate_paper(8, seed=4), encoding='utf-8')
+    paths = find_markdown_files(str(source))
+    rows = run_batch(paths, output_dir=str(tmp_path / 'out'), workers=2)
+    by_name = {os.path.relpath(row['file'], source): row for row in rows}
+    assert [row['file'] for row in rows] == paths
+
+    assert by_name['broken.md']['error'].startswith('UnicodeDecodeError')
+    assert not os.path.exists(by_name['broken.md']['output'])
+    expected = {'good.md': ('good.json', 60), os.path.join('s1', 'paper.md'): (os.path.join('s1', 'paper.json'), 5),
+                os.path.join('s2', 'paper.md'): (os.path.join('s2', 'paper.json'), 8)}
+    for name, (output, questions) in expected.items():
+        row = by_name[name]
+        assert row['error'] is None
+        assert row['output'] == str(tmp_path / 'out' / output)
+        assert row['questions'] == questions
+        with open(row['output'], 'r', encoding='utf-8') as f:
+            assert json.load(f)['totalQuestions'] == questions
+    assert not list((tmp_path / 'out').rglob('*.tmp'))
+
+
+def test_batch_output_paths(tmp_path):
+    papers = [str(tmp_path / 'a' / 'x.md'), str(tmp_path / 'a' / 'b' / 'x.md')]
+    assert batch_output_paths(papers) == [str(tmp_path / 'a' / 'x.json'), str(tmp_path / 'a' / 'b' / 'x.json')]
+    assert batch_output_paths(papers, 'out') == [os.path.join('out', 'x.json'), os.path.join('out', 'b', 'x.json')]
+    # Papers from one folder land directly in the output folder
+    assert batch_output_paths([str(tmp_path / 'a' / 'b' / 'x.md')], 'out') == [os.path.join('out', 'x.json')]
+
+
+def test_serial_batch_matches_the_pool(tmp_path):
+    for seed in range(3):
+        (tmp_path / f'paper{seed}.md').write_text(generate_paper(6, seed=seed), encoding='utf-8')
+    paths = find_markdown_files(str(tmp_path / '*.md'))
+    serial = run_batch(paths, output_dir=str(tmp_path / 'serial'), workers=1)
+    pooled = run_batch(paths, output_dir=str(tmp_path / 'pooled'), workers=2)
+    assert [row['questions'] for row in serial] == [row['questions'] for row in pooled] == [6, 6, 6]
+
+
+def test_batch_cli_exit_status(tmp_path, capsys):
+    (tmp_path / 'good.md').write_text(generate_paper(4, seed=1), encoding='utf-8')
+    assert main(['--batch', str(tmp_path), '--output-dir', str(tmp_path / 'out'), '--workers', '1']) == 0
+    assert '1 papers, 4 questions' in capsys.readouterr().out
+    (tmp_path / 'bad.md').write_bytes(b'\xff')
+    assert main(['--batch', str(tmp_path), '--output-dir', str(tmp_path / 'out'), '--workers', '1']) == 1
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+clean_markdown: fractions and whitespace cleaned outside math spans in one
+tokenizing pass, and short strings memoized per parser
+"""
+
+import re
+import pickle
+import random
+
+import pytest
+
+from test_md_parser import CLEAN_CACHE_MAX_CHARS, SophisticatedMarkdownParser
+
+MATH_SPAN = re.compile(r'(\$\$[\s\S]*?\$\$|\$[^$]+\$)')
+FRACTION = re.compile(r'\\frac\{([^}]+)\}\{([^}]+)\}')
+
+
+def reference_clean(parser, text):
+    """clean_markdown spelled out with the plain regexes: fractions and
+    whitespace outside math spans, symbols everywhere."""
+    parts = MATH_SPAN.split(text)
+    parts[::2] = [re.sub(r'\s+', ' ', FRACTION.sub(r'(\1)/(\2)', part)) for part in parts[::2]]
+    return parser.convert_latex_symbols(''.join(parts)).strip()
+
+
+def random_texts(tokens, count, seed=0, max_tokens=12):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(tokens) for _ in range(rng.randint(0, max_tokens))) for _ in range(count)]
+
+
+CLEAN_TOKENS = ['\\frac{', '}', '{', '}{', 'a', 'x+1', ' ', '  ', '\n', '$', '$$', '\\alpha', '\\in', '\\int', 'text']
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return SophisticatedMarkdownParser()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Find the $\\frac{1}{2}$ of \\frac{a}{b}  and   $$x  \\alpha$$ then \\alpha',
+     'Find the $\\frac{1}{2}$ of (a)/(b) and $$x  α$$ then α'),
+    ('$\\mathrm{d} x$ over   \\frac{x+1}{2}', '$\\mathrm{d} x$ over (x+1)/(2)'),
+    (' a\n\n b ', 'a b'),
+    ('price $5 and \\frac{1}{2}', 'price $5 and (1)/(2)'),
+    ('\\frac{a}{} \\frac{}{b} \\frac{a}{b', '\\frac{a}{} \\frac{}{b} \\frac{a}{b'),
+])
+def test_clean_markdown_examples(parser, text, expected):
+    assert parser.clean_markdown(text) == expected
+
+
+def test_clean_markdown_matches_the_regex_reference(parser):
+    for text in random_texts(CLEAN_TOKENS, 3000, seed=1):
+        assert parser.clean_markdown(text) == reference_clean(parser, text), text
+
+
+def test_unclosed_fractions_stay_linear(parser):
+    text = 'x ' + '\\frac{' * 20000
+    assert parser.clean_markdown(text) == text.strip()
+
+
+def test_clean_markdown_memoizes_short_strings_only():
+    parser = SophisticatedMarkdownParser()
+    short = '(2) \\alpha  rays'
+    long = 'a ' * CLEAN_CACHE_MAX_CHARS
+    for _ in range(3):
+        parser.clean_markdown(short)
+        parser.clean_markdown(long)
+    info = parser._cached_clean.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+
+
+def test_clean_cache_is_per_parser():
+    plain = SophisticatedMarkdownParser()
+    extended = SophisticatedMarkdownParser(extra_symbols={'\\alpha': 'a'})
+    assert plain.clean_markdown('(1) \\alpha') == '(1) α'
+    assert extended.clean_markdown('(1) \\alpha') == '(1) a'
+
+
+def test_parser_with_clean_cache_pickles(parser):
+    parser.clean_markdown('(1) \\pi')
+    copy = pickle.loads(pickle.dumps(parser))
+    assert copy.clean_markdown('(1) \\pi') == '(1) π'
+    assert copy._cached_clean.cache_info().currsize == 1
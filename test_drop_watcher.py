@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Drop-folder watcher: settled papers are parsed once per content hash, the
+hashes survive a restart, and a dead worker never takes the watcher down
+"""
+
+import os
+import json
+import time
+import signal
+
+import pytest
+
+import drop_watcher
+from drop_watcher import STATE_FILE_NAME, DropWatcher, PollingWatcher, is_paper
+from test_md_parser import parse_paper_file
+from benchmarks.synthetic import generate_paper
+
+
+def crash_once(path, json_path, compact, parser_options):
+    """parse_paper_file, except that the first call kills its worker process."""
+    marker = os.path.join(os.path.dirname(json_path), 'crashed')
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return parse_paper_file(path, json_path, compact, parser_options)
+
+
+def make_watcher(tmp_path, **options):
+    return DropWatcher(str(tmp_path / 'drop'), str(tmp_path / 'out'), workers=1, debounce=0, poll=True,
+                       poll_interval=0.01, **options)
+
+
+def drain(watcher, timeout=60):
+    """Submit and collect until nothing is pending or running, as run() would."""
+    os.makedirs(watcher.output_dir, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while watcher.pending or watcher.running:
+        assert time.monotonic() < deadline
+        watcher._submit_settled()
+        watcher._collect_finished()
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def drop(tmp_path):
+    (tmp_path / 'drop').mkdir()
+    (tmp_path / 'drop' / 'a.md').write_text(generate_paper(5, seed=1), encoding='utf-8')
+    (tmp_path / 'drop' / 'b.md').write_text(generate_paper(3, seed=2), encoding='utf-8')
+    (tmp_path / 'drop' / '.a.md.swp').write_text('not a paper')
+    return tmp_path
+
+
+def test_run_once_parses_every_paper_and_restores_signal_handlers(drop):
+    handler = signal.getsignal(signal.SIGINT)
+    log = drop / 'watch.ndjson'
+    watcher = make_watcher(drop, log=str(log))
+    watcher.run(once=True)
+    assert signal.getsignal(signal.SIGINT) is handler
+    assert watcher.counts == {'parsed': 2, 'unchanged': 0, 'failed': 0}
+    document = json.loads((drop / 'out' / 'a.json').read_text(encoding='utf-8'))
+    assert document['totalQuestions'] == 5
+    rows = [json.loads(line) for line in log.read_text().splitlines()]
+    assert sorted(row['questions'] for row in rows) == [3, 5]
+    assert all(row['dropToOutputSeconds'] >= row['seconds'] for row in rows)
+
+
+def test_unchanged_papers_are_skipped_across_restarts(drop):
+    make_watcher(drop).run(once=True)
+    state = json.loads((drop / 'out' / STATE_FILE_NAME).read_text())
+    assert set(state) == {'a.md', 'b.md'}
+
+    (drop / 'drop' / 'b.md').write_text(generate_paper(4, seed=3), encoding='utf-8')
+    watcher = make_watcher(drop)
+    watcher.run(once=True)
+    assert watcher.counts == {'parsed': 1, 'unchanged': 1, 'failed': 0}
+    assert json.loads((drop / 'out' / 'b.json').read_text())['totalQuestions'] == 4
+
+
+def test_failed_parse_is_reported_and_tried_again_later(drop):
+    (drop / 'drop' / 'broken.md').write_bytes(b'1. \xff not UTF-8 (1) a Ans. (1)\n')
+    watcher = make_watcher(drop)
+    watcher.run(once=True)
+    assert watcher.counts['failed'] == 1
+    assert 'broken.md' not in json.loads((drop / 'out' / STATE_FILE_NAME).read_text())
+
+
+def test_paper_changed_while_parsing_is_parsed_again(drop):
+    watcher = make_watcher(drop)
+    os.makedirs(watcher.output_dir)
+    watcher._note({'a.md'})
+    watcher._submit_settled()
+    watcher._note({'a.md'})
+    assert 'a.md' in watcher.rerun
+    (drop / 'drop' / 'a.md').write_text(generate_paper(7, seed=4), encoding='utf-8')
+    drain(watcher)
+    watcher.pool.shutdown()
+    assert watcher.counts['parsed'] == 2
+    assert json.loads((drop / 'out' / 'a.json').read_text())['totalQuestions'] == 7
+
+
+def test_killed_idle_worker_is_replaced_for_the_next_drop(drop):
+    watcher = make_watcher(drop)
+    watcher._note({'a.md'})
+    drain(watcher)
+    pool = watcher.pool
+    for pid in list(pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    deadline = time.monotonic() + 30
+    while not pool._broken:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    watcher._note({'b.md'})
+    drain(watcher)
+    assert watcher.pool is not pool
+    watcher.pool.shutdown()
+    assert watcher.counts == {'parsed': 2, 'unchanged': 0, 'failed': 0}
+    assert (drop / 'out' / 'b.json').exists()
+
+
+def test_paper_whose_worker_dies_is_parsed_again_on_a_new_pool(drop, monkeypatch):
+    monkeypatch.setattr(drop_watcher, 'parse_paper_file', crash_once)
+    watcher = make_watcher(drop)
+    watcher.run(once=True)
+    assert watcher.counts == {'parsed': 2, 'unchanged': 0, 'failed': 0}
+    assert (drop / 'out' / 'a.json').exists() and (drop / 'out' / 'b.json').exists()
+
+
+def test_polling_watcher_and_paper_names(tmp_path):
+    watcher = PollingWatcher(str(tmp_path), interval=0)
+    (tmp_path / 'a.md').write_text('x')
+    assert watcher.changes(0) == {'a.md'}
+    assert watcher.changes(0) == set()
+    (tmp_path / 'a.md').unlink()
+    assert watcher.changes(0) == {'a.md'}
+    assert is_paper('paper.md') and not any(map(is_paper, ['.paper.md', '~paper.md', '#paper.md#', 'a.txt']))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Format profiles: per-paper auto-detection, per-question switching and the
+generic fallback
+"""
+
+import pytest
+
+from test_md_parser import FORMAT_PROFILES, SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+NUMBERED = '1. Speed of light\n(1) a\n(2) b\n(3) c\n(4) d\nAns. (2)\n'
+NEET = '1. Speed of light\n(1) a\n(2) b\n(3) c\n(4) d\nAnswer: 2\n'
+LETTERED = '1. Speed of light\nA) a\nB) b\nC) c\nD) d\nAns. B\n'
+
+
+@pytest.mark.parametrize('contents, expected', [
+    ([NUMBERED] * 3, 'jee_main'),
+    ([NEET] * 3, 'neet'),
+    ([LETTERED] * 3, 'lettered'),
+    ([NUMBERED, LETTERED, LETTERED], 'lettered'),
+    (['1. Stem with no options at all'], 'generic'),
+    ([], 'generic'),
+])
+def test_detect_format_profile(contents, expected):
+    assert SophisticatedMarkdownParser().detect_format_profile(contents) == expected
+
+
+@pytest.mark.parametrize('option_style, expected', [('numbered', 'jee_main'), ('lettered', 'lettered')])
+def test_auto_detection_parses_like_the_detected_profile(option_style, expected):
+    paper = generate_paper(30, option_style=option_style, seed=5)
+    result = SophisticatedMarkdownParser().parse_markdown_content(paper)
+    assert result['examInfo']['formatProfile'] == expected
+    forced = SophisticatedMarkdownParser(format_profile=expected).parse_markdown_content(paper)
+    assert result['questions'] == forced['questions']
+
+
+def test_auto_detection_runs_again_for_every_paper():
+    parser = SophisticatedMarkdownParser()
+    assert parser.parse_markdown_content(generate_paper(12, option_style='lettered', seed=1))[
+        'examInfo']['formatProfile'] == 'lettered'
+    assert parser.parse_markdown_content(NEET * 3)['examInfo']['formatProfile'] == 'neet'
+    assert parser.parse_markdown_content('No questions here.')['examInfo']['formatProfile'] == 'generic'
+
+
+def test_forced_profile_is_reported_and_unknown_profiles_are_rejected():
+    result = SophisticatedMarkdownParser(format_profile='neet').parse_markdown_content(NUMBERED)
+    assert result['examInfo']['formatProfile'] == 'neet'
+    with pytest.raises(ValueError):
+        SophisticatedMarkdownParser(format_profile='cbse')
+    assert set(FORMAT_PROFILES) == {'jee_main', 'neet', 'lettered', 'generic'}
+
+
+def test_question_profile_switches_for_questions_in_another_grammar():
+    parser = SophisticatedMarkdownParser(format_profile='jee_main')
+    assert parser.question_profile(NUMBERED) == 'jee_main'
+    assert parser.question_profile(LETTERED) == 'lettered'
+    assert parser.question_profile('1. x is 1. five 2. six 3. seven 4. eight Ans. (3)') == 'generic'
+    # A numeric answer has no options to disagree with
+    assert parser.question_profile('3. Moles in 36 g water Ans. (2)') == 'jee_main'
+    assert parser.question_profile(LETTERED, profile='generic') == 'generic'
+
+
+def test_mixed_paper_parses_each_question_in_its_own_grammar():
+    content = NUMBERED + '\n' + LETTERED.replace('1.', '2.', 1)
+    first, second = SophisticatedMarkdownParser(format_profile='jee_main').parse_markdown_content(content)['questions']
+    for question in (first, second):
+        details = question['questionDetails'][0]
+        assert list(details['possibleAnswers']) == ['A', 'B', 'C', 'D']
+        assert (details['correctAnswer'], details['correctAnswerText']) == ('B', 'b')
+
+
+def test_dotted_options_in_a_numbered_paper_fall_back_to_generic():
+    content = ('# JEE Main 2024\n\n1. Speed?\n(1) a\n(2) b\n(3) c\n(4) d\nAns. (2)\n\n'
+               '2. The value of x is 1. five 2. six 3. seven 4. eight\n\nAns. (3)\n\n'
+               '3. Moles in 36 g water\n\nAns. (2)\n')
+    parser = SophisticatedMarkdownParser(format_profile='jee_main')
+    first, dotted, numeric = parser.parse_markdown_content(content)['questions']
+    assert first['questionDetails'][0]['correctAnswerText'] == 'b'
+    assert dotted['questionDetails'][0]['text'] == 'The value of x is'
+    assert dotted['questionDetails'][0]['correctAnswerText'] == 'seven'
+    assert numeric['questionDetails'][0]['possibleAnswers'] == {}
+    assert numeric['questionDetails'][0]['correctAnswer'] == 'B'
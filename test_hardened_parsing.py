@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Hardened mode: the adversarial corpus parses fully, and the hand-written
+image scanners find exactly what the image regexes find
+"""
+
+import random
+
+import pytest
+
+from test_md_parser import SophisticatedMarkdownParser
+from benchmarks.adversarial import ADVERSARIAL_CASES, generate_case, parse_problems
+
+IMAGE_TOKENS = [
+    '![', ']', '(', ')', '![](', 'alt', 'a.png', 'http://x/y.jpg?h=1', '<img', '<IMG', ' src="', ' SRC="',
+    ' alt="', '"', '>', 'p.png', '\\includegraphics', '\\INCLUDEGRAPHICS', '[w=1]', '{', '}', 'f.png', ' ', '\n',
+]
+
+
+@pytest.fixture(scope='module')
+def hardened_parser():
+    return SophisticatedMarkdownParser(hardened=True)
+
+
+@pytest.mark.parametrize('name', sorted(ADVERSARIAL_CASES))
+def test_adversarial_case_parses_fully_when_hardened(hardened_parser, name):
+    result = hardened_parser.parse_markdown_content(generate_case(name, repeat=2000))
+    assert parse_problems(result) == []
+
+
+def test_hardened_image_scan_matches_the_regexes(hardened_parser):
+    default_parser = SophisticatedMarkdownParser()
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = ''.join(rng.choice(IMAGE_TOKENS) for _ in range(rng.randint(0, 16)))
+        assert hardened_parser.extract_images(text) == default_parser.extract_images(text), text
+
+
+def test_hardened_image_scan_examples(hardened_parser):
+    text = ('![plot](fig.png) <img src="a.png" alt="atom"> <img alt="x" src="b.png"> '
+            '\\includegraphics[width=2cm]{c.png} \\includegraphics{d.png}')
+    assert hardened_parser.extract_images(text) == [
+        {'src': 'fig.png', 'alt': 'plot', 'type': 'markdown'},
+        {'src': 'a.png', 'alt': 'atom', 'type': 'html'},
+        {'src': 'c.png', 'alt': 'Question image', 'type': 'latex'},
+        {'src': 'd.png', 'alt': 'Question image', 'type': 'latex'},
+    ]
+
+
+def test_over_budget_question_is_flagged_not_dropped(monkeypatch):
+    parser = SophisticatedMarkdownParser(hardened=True, question_budget=0.05)
+
+    def spin(*args):
+        while True:
+            pass
+
+    monkeypatch.setattr(parser, 'build_span_table', spin)
+    content = '1. A stuck question about force\n(1) a\n(2) b\nAns. (1)\n'
+    questions = parser.extract_questions(content)
+    assert len(questions) == 1
+    assert questions[0]['flags'] == ['timeBudgetExceeded']
+    assert questions[0]['questionDetails'][0]['text'].startswith('A stuck question about force')
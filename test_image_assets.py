@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Image pipeline: resolving references against directories and archives,
+content-addressed uploads across papers, and the references left alone
+(missing, ambiguous, failed)
+"""
+
+import json
+import hashlib
+import tarfile
+import zipfile
+
+import pytest
+
+from image_assets import (
+    ImagePipeline, ImageSource, image_extension, main, open_image_source, src_candidates
+)
+from object_store import FilesystemStore
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'plot' * 10
+JPG = b'\xff\xd8\xff' + b'photo' * 10
+CDN = 'https://cdn.mathpix.com/cropped/'
+
+
+def make_tutorial(tutorial_id, *srcs, subject='Physics', year='2025'):
+    return {
+        'tutorialId': tutorial_id,
+        'subject': subject,
+        'year': year,
+        'questions': [
+            {'questionId': f'Q{number}',
+             'questionDetails': [{'textImages': [{'src': src, 'alt': '', 'type': 'markdown'}]}]}
+            for number, src in enumerate(srcs, 1)
+        ]
+    }
+
+
+def srcs(tutorial):
+    return [question['questionDetails'][0]['textImages'][0]['src'] for question in tutorial['questions']]
+
+
+def write_images(root, images):
+    for name, data in images.items():
+        path = root.joinpath(*name.split('/'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+class CountingSource(ImageSource):
+    def __init__(self, images):
+        self.images = images
+        self.reads = []
+        super().__init__(images)
+
+    def read(self, name):
+        self.reads.append(name)
+        return self.images[name]
+
+
+def test_identical_images_are_stored_once_across_papers(tmp_path):
+    write_images(tmp_path / 'images', {'fig.png': PNG, 'copy-of-fig.png': PNG, 'photo': JPG})
+    tutorials = [
+        make_tutorial('a', 'fig.png', './fig.png', CDN + 'photo?height=10'),
+        make_tutorial('b', 'copy-of-fig.png', subject='Chemistry', year='2024'),
+    ]
+    store = FilesystemStore(str(tmp_path / 'store'), base_url='https://assets.example/')
+    pipeline = ImagePipeline(open_image_source(str(tmp_path / 'images')), store, workers=2)
+    report = pipeline.process(tutorials)
+
+    png_key = f'images/{hashlib.sha256(PNG).hexdigest()}.png'
+    jpg_key = f'images/{hashlib.sha256(JPG).hexdigest()}.jpg'
+    assert (report['references'], report['uniqueImages'], report['uploaded']) == (4, 2, 2)
+    assert report['uploadedBytes'] == len(PNG) + len(JPG)
+    assert srcs(tutorials[0]) == ['https://assets.example/' + key for key in (png_key, png_key, jpg_key)]
+    assert srcs(tutorials[1]) == ['https://assets.example/' + png_key]
+    assert (tmp_path / 'store' / 'images').joinpath(png_key.split('/')[1]).read_bytes() == PNG
+
+    again = pipeline.process([make_tutorial('c', 'fig.png')])
+    assert (again['uploaded'], again['alreadyStored']) == (0, 1)
+
+
+def test_missing_and_ambiguous_references_keep_their_src(tmp_path):
+    write_images(tmp_path, {'s1/fig.png': PNG, 's2/fig.png': JPG, 'crop.jpg': JPG})
+    original = ['fig.png', 's1/fig.png', CDN + 'crop.jpg?top_left_y=1', CDN + 'crop.jpg?top_left_y=2', 'gone.png']
+    tutorial = make_tutorial('a', *original)
+    report = ImagePipeline(open_image_source(str(tmp_path)), FilesystemStore(str(tmp_path / 'store'))).process(
+        [tutorial]
+    )
+
+    assert [missing['src'] for missing in report['missing']] == ['gone.png']
+    ambiguous = {item['src']: item for item in report['ambiguous']}
+    assert ambiguous['fig.png']['matches'] == ['s1/fig.png', 's2/fig.png']
+    assert ambiguous['fig.png']['reason'] == 'several files have this name'
+    assert {item['reason'] for src, item in ambiguous.items() if 'crop' in src} == {'different crops of this file'}
+    assert len(ambiguous) == 3
+    rewritten = srcs(tutorial)
+    assert rewritten[1] == f'images/{hashlib.sha256(PNG).hexdigest()}.png'
+    assert [rewritten[0], *rewritten[2:]] == [original[0], *original[2:]]
+
+
+def test_collect_keeps_digests_and_uploads_read_the_bytes_again():
+    source = CountingSource({'a.png': PNG, 'b.png': PNG, 'c.jpg': JPG})
+    pipeline = ImagePipeline(source, None)
+    report = {'references': 0, 'uniqueImages': 0, 'missing': [], 'ambiguous': []}
+    uploads, rewrites = pipeline.collect([make_tutorial('a', 'a.png', 'b.png', 'c.jpg', 'a.png')], report)
+    assert sorted(uploads.values()) == [('a.png', hashlib.sha256(PNG).hexdigest()),
+                                        ('c.jpg', hashlib.sha256(JPG).hexdigest())]
+    assert len(rewrites) == 4
+    # Each file is read once to hash it
+    assert sorted(source.reads) == ['a.png', 'b.png', 'c.jpg']
+
+
+def test_images_already_stored_are_not_read_again(tmp_path):
+    source = CountingSource({'a.png': PNG})
+    store = FilesystemStore(str(tmp_path))
+    ImagePipeline(source, store).process([make_tutorial('a', 'a.png')])
+    assert source.reads == ['a.png', 'a.png']
+    source.reads.clear()
+    report = ImagePipeline(source, store).process([make_tutorial('b', 'a.png')])
+    assert report['alreadyStored'] == 1 and source.reads == ['a.png']
+
+
+def test_failed_uploads_are_reported_and_keep_their_src(tmp_path):
+    class FailingStore(FilesystemStore):
+        def put(self, key, data, content_type=None):
+            raise OSError('store is down')
+
+    tutorial = make_tutorial('a', 'a.png')
+    report = ImagePipeline(CountingSource({'a.png': PNG}), FailingStore(str(tmp_path)), retries=1,
+                           backoff=0).process([tutorial])
+    assert report['uploaded'] == 0
+    assert report['failed'][0]['error'] == 'OSError: store is down'
+    assert srcs(tutorial) == ['a.png']
+
+
+def test_key_template_fields(tmp_path):
+    tutorial = make_tutorial('a', 'dir/fig.png', subject='Physics', year='2023')
+    pipeline = ImagePipeline(CountingSource({'dir/fig.png': PNG}), FilesystemStore(str(tmp_path)),
+                             key_template='questions/{folder}/{year}/{name}-{digest}{ext}')
+    pipeline.process([tutorial])
+    assert srcs(tutorial) == [f'questions/physics/2023/fig.png-{hashlib.sha256(PNG).hexdigest()}.png']
+
+
+@pytest.mark.parametrize('archive', ['zip', 'tar'])
+def test_archive_sources_resolve_like_a_directory(tmp_path, archive):
+    images = {'images/fig.png': PNG, 'images/photo.jpeg': JPG}
+    path = tmp_path / f'export.{archive}'
+    if archive == 'zip':
+        with zipfile.ZipFile(path, 'w') as f:
+            for name, data in images.items():
+                f.writestr(name, data)
+    else:
+        write_images(tmp_path / 'tree', images)
+        with tarfile.open(path, 'w:gz') as f:
+            f.add(tmp_path / 'tree' / 'images', arcname='./images')
+    source = open_image_source(str(path))
+    try:
+        assert source.resolve('images/fig.png') == 'images/fig.png'
+        assert source.resolve(CDN + 'photo.jpeg?height=3') == 'images/photo.jpeg'
+        assert source.read('images/photo.jpeg') == JPG
+        tutorial = make_tutorial('a', 'fig.png', 'photo.jpeg')
+        report = ImagePipeline(source, FilesystemStore(str(tmp_path / 'store'))).process([tutorial])
+    finally:
+        source.close()
+    assert report['uploaded'] == 2
+    assert srcs(tutorial)[1] == f'images/{hashlib.sha256(JPG).hexdigest()}.jpg'
+
+
+def test_open_image_source_rejects_other_files(tmp_path):
+    (tmp_path / 'notes.txt').write_text('not an archive')
+    with pytest.raises(ValueError):
+        open_image_source(str(tmp_path / 'notes.txt'))
+    with pytest.raises(TypeError):
+        ImageSource([])
+
+
+def test_src_candidates_and_extensions():
+    assert src_candidates(CDN + '2025_09_17_x-07.jpg?height=379') == ['2025_09_17_x-07.jpg']
+    assert src_candidates('./figs\\plot%201.png?w=2') == ['figs/plot 1.png', 'plot 1.png']
+    assert src_candidates('/fig.png') == ['fig.png']
+    assert image_extension('a.JPEG', b'') == '.jpg'
+    assert image_extension('blob', PNG) == '.png'
+    assert image_extension('blob', b'data') == ''
+
+
+def test_cli_writes_rewritten_tutorials(tmp_path, capsys):
+    write_images(tmp_path / 'images', {'fig.png': PNG})
+    (tmp_path / 'paper.json').write_text(json.dumps(make_tutorial('a', 'fig.png', 'gone.png')))
+    status = main([str(tmp_path / 'paper.json'), '--images', str(tmp_path / 'images'),
+                   '--store', str(tmp_path / 'store'), '--output-dir', str(tmp_path / 'out')])
+    assert status == 0
+    tutorial = json.loads((tmp_path / 'out' / 'paper.json').read_text())
+    assert srcs(tutorial) == [f'images/{hashlib.sha256(PNG).hexdigest()}.png', 'gone.png']
+    assert 'image not found: gone.png' in capsys.readouterr().err
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON writer, and the CLI feeding it one parsed question at a time
+"""
+
+import io
+import json
+
+import pytest
+
+from test_md_parser import SophisticatedMarkdownParser, main
+from benchmarks.synthetic import generate_paper
+
+
+def without_id(tutorial):
+    # tutorialId carries the current time in seconds
+    return {key: value for key, value in tutorial.items() if key != 'tutorialId'}
+
+
+@pytest.fixture(scope='module')
+def parsed():
+    parser = SophisticatedMarkdownParser()
+    return parser, parser.parse_markdown_content(generate_paper(45, image_rate=0.2, seed=11))
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_write_json_matches_json_dump(parsed, compact):
+    parser, result = parsed
+    out = io.StringIO()
+    assert parser.write_json(out, result['examInfo'], result['questions'], compact=compact, backend='json') == 45
+    expected = parser.generate_json(result['examInfo'], result['questions'])
+    expected['tutorialId'] = json.loads(out.getvalue())['tutorialId']
+    if compact:
+        assert out.getvalue() == json.dumps(expected, ensure_ascii=False, separators=(',', ':'))
+    else:
+        assert out.getvalue() == json.dumps(expected, indent=2, ensure_ascii=False)
+
+
+def test_write_json_orjson_backend_writes_the_same_document(parsed):
+    pytest.importorskip('orjson')
+    parser, result = parsed
+    outputs = []
+    for backend in ('json', 'orjson'):
+        out = io.StringIO()
+        parser.write_json(out, result['examInfo'], result['questions'], compact=True, backend=backend)
+        outputs.append(without_id(json.loads(out.getvalue())))
+    assert outputs[0] == outputs[1]
+    with pytest.raises(ValueError):
+        parser.write_json(io.StringIO(), result['examInfo'], [], backend='orjson')
+
+
+def test_write_json_from_a_generator_counts_at_the_end(parsed):
+    parser, result = parsed
+    out = io.StringIO()
+    parser.write_json(out, result['examInfo'], iter(result['questions']))
+    document = json.loads(out.getvalue())
+    assert document['totalQuestions'] == 45
+    assert document['questions'] == result['questions']
+    empty = io.StringIO()
+    assert parser.write_json(empty, result['examInfo'], iter([])) == 0
+    assert json.loads(empty.getvalue())['questions'] == []
+
+
+def test_open_markdown_file_parses_each_question_as_it_is_read(tmp_path, synthetic_paper):
+    path = tmp_path / 'paper.md'
+    path.write_text(synthetic_paper, encoding='utf-8')
+    expected = SophisticatedMarkdownParser().parse_markdown_file(str(path))
+
+    parser = SophisticatedMarkdownParser(profile=True)
+    with parser.open_markdown_file(str(path)) as (exam_info, questions):
+        assert exam_info == expected['examInfo']
+        assert 'parse_question' not in parser.stats.stages
+        first = next(questions)
+        assert parser.stats.stages['parse_question'][1] == 1
+        assert [first, *questions] == expected['questions']
+
+    (tmp_path / 'empty.md').write_bytes(b'')
+    with parser.open_markdown_file(str(tmp_path / 'empty.md')) as (exam_info, questions):
+        assert list(questions) == []
+
+
+@pytest.mark.parametrize('extra_args', [[], ['--workers', '2', '--chunk-size', '5']])
+def test_cli_streamed_and_pooled_output_match(tmp_path, synthetic_paper, capsys, extra_args):
+    path = tmp_path / 'paper.md'
+    path.write_text(synthetic_paper, encoding='utf-8')
+    main([str(path), *extra_args])
+    document = json.loads(capsys.readouterr().out)
+    parser = SophisticatedMarkdownParser()
+    result = parser.parse_markdown_file(str(path))
+    assert without_id(document) == without_id(parser.generate_json(result['examInfo'], result['questions']))
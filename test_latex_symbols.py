@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Longest-match LaTeX symbol transliteration
+"""
+
+import pytest
+
+from test_md_parser import LATEX_SYMBOLS, LatexTransliterator, SophisticatedMarkdownParser
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('\\in \\int \\infty \\inf \\alphax', '∈ ∫ ∞ \\inf \\alphax'),
+    ('\\leftarrow \\leftrightarrow \\le', '← ↔ \\le'),
+    ('\\alpha\\beta_1 + \\pi^2', 'αβ_1 + π^2'),
+    ('no commands here', 'no commands here'),
+])
+def test_longest_match_and_word_boundaries(text, expected):
+    assert SophisticatedMarkdownParser().convert_latex_symbols(text) == expected
+
+
+def test_every_symbol_converts_on_its_own():
+    transliterator = LatexTransliterator(LATEX_SYMBOLS)
+    for command, symbol in LATEX_SYMBOLS.items():
+        assert transliterator.convert(f'a {command} b') == f'a {symbol} b'
+
+
+def test_the_order_of_the_symbol_map_does_not_matter():
+    forwards = LatexTransliterator(LATEX_SYMBOLS)
+    backwards = LatexTransliterator(dict(reversed(LATEX_SYMBOLS.items())))
+    text = ' '.join(LATEX_SYMBOLS) + ' \\inf \\lefta'
+    assert forwards.convert(text) == backwards.convert(text)
+
+
+def test_extra_symbols_extend_one_parser_only():
+    extended = SophisticatedMarkdownParser(extra_symbols={'\\degree': '°', '\\alpha': 'a'})
+    assert extended.convert_latex_symbols('90\\degree \\alpha') == '90° a'
+    assert SophisticatedMarkdownParser().convert_latex_symbols('90\\degree \\alpha') == '90\\degree α'
+    assert LatexTransliterator({}).convert('\\alpha') == '\\alpha'
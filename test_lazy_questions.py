@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Lazy question records: fields are extracted on first access, serialize
+exactly like eager parsing, and keep the profile of their own paper
+"""
+
+import pytest
+
+from test_md_parser import DeferredSpanTable, LazyQuestion, SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+
+def test_lazy_questions_serialize_like_eager_parsing(comprehensive_paper, synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    for content in (comprehensive_paper, synthetic_paper):
+        eager = parser.extract_questions(content)
+        lazy = parser.extract_questions(content, lazy=True)
+        assert all(isinstance(question, LazyQuestion) for question in lazy)
+        assert [question for question in (q.to_dict() for q in lazy) if question] == eager
+
+
+def test_lazy_question_defers_unread_fields(synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    eager = parser.extract_questions(synthetic_paper)
+    lazy = parser.extract_questions(synthetic_paper, lazy=True)
+    for question, expected in zip(lazy, eager):
+        details = expected['questionDetails'][0]
+        assert (question.text, question.correct_answer) == (details['text'], details['correctAnswer'])
+        assert 'solution' not in question.__dict__ and 'subject' not in question.__dict__
+        assert 'solution_span' not in question.table and 'images' not in question.table
+        assert question.question_id == expected['questionId']
+
+
+def test_lazy_fields_are_memoized(synthetic_paper, monkeypatch):
+    parser = SophisticatedMarkdownParser()
+    question = parser.extract_questions(synthetic_paper, lazy=True)[0]
+    solution = question.solution
+    monkeypatch.setattr(parser, 'extract_solution', lambda *args: pytest.fail('solution extracted twice'))
+    assert question.solution is solution
+    assert question.table is question.table
+
+
+def test_lazy_questions_keep_their_papers_profile():
+    parser = SophisticatedMarkdownParser()
+    lettered = generate_paper(12, option_style='lettered', seed=4)
+    lazy = parser.extract_questions(lettered, lazy=True)
+    # Parsing another paper moves the parser to another profile
+    parser.extract_questions(generate_paper(12, option_style='numbered', seed=5))
+    assert parser.active_profile == 'jee_main'
+    assert all(question.profile == 'lettered' for question in lazy)
+    assert [question.to_dict() for question in lazy] == SophisticatedMarkdownParser().extract_questions(lettered)
+
+
+def test_deferred_span_table_fills_in_on_lookup():
+    parser = SophisticatedMarkdownParser()
+    content = '1. Force ![f](f.png)\n(1) a\n(2) b\nAns. (2)\nSol. Because [4 marks]\n'
+    table = parser.build_span_table(content, lazy=True)
+    assert isinstance(table, DeferredSpanTable)
+    assert set(table) == {'profile', 'markers', 'answer_match', 'stem_end'}
+    eager = parser.build_span_table(content)
+    for key in ('solution_span', 'marks', 'images', 'options'):
+        assert table[key] == eager[key]
+    assert set(table) == set(eager)
+    with pytest.raises(KeyError):
+        table['unknown']
@@ -3,12 +3,709 @@
 Test script for the sophisticated markdown parser
 """
 
+import io
+import os
 import re
+import sys
+import glob
 import json
+import codecs
+import mmap
+import time
+import sqlite3
+import hashlib
+import heapq
+import signal
+import argparse
+import functools
+import contextlib
+import itertools
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
+from question_model import Question
+
+try:
+    import orjson
+except ImportError:  # optional fast serializer for compact output
+    orjson = None
+
+# A question's location inside the source document. ``start``/``end`` are
+# offsets of the stripped section body; the flags record which of the
+# option/answer/solution markers were seen inside it.
+QuestionSpan = namedtuple('QuestionSpan', ['number', 'start', 'end', 'has_options', 'has_answer', 'has_solution'])
+
+LATEX_SYMBOLS = {
+    '\\alpha': 'α', '\\beta': 'β', '\\gamma': 'γ', '\\delta': 'δ',
+    '\\epsilon': 'ε', '\\theta': 'θ', '\\lambda': 'λ', '\\mu': 'μ',
+    '\\pi': 'π', '\\sigma': 'σ', '\\tau': 'τ', '\\phi': 'φ', '\\omega': 'ω',
+    '\\infty': '∞', '\\sum': 'Σ', '\\int': '∫', '\\sqrt': '√',
+    '\\leq': '≤', '\\geq': '≥', '\\neq': '≠', '\\approx': '≈',
+    '\\pm': '±', '\\times': '×', '\\div': '÷', '\\rightarrow': '→',
+    '\\leftarrow': '←', '\\Rightarrow': '⇒', '\\Leftarrow': '⇐',
+    '\\in': '∈', '\\notin': '∉', '\\subset': '⊂', '\\supset': '⊃',
+    '\\cup': '∪', '\\cap': '∩', '\\emptyset': '∅', '\\forall': '∀',
+    '\\exists': '∃', '\\leftrightarrow': '↔'
+}
+
+
+class LatexTransliterator:
+    """Single-pass LaTeX command to Unicode symbol converter.
+    
+    All commands are compiled into one alternation, longest first, and a
+    command ending in a letter only matches when the next character is not
+    a letter. So ``\\in`` never touches ``\\int``, ``\\infty`` or ``\\inf``,
+    whatever order the symbol map is in.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = dict(symbols)
+        alternatives = []
+        for command in sorted(self.symbols, key=len, reverse=True):
+            alternative = re.escape(command)
+            if command[-1:].isalpha():
+                alternative += r'(?![a-zA-Z])'
+            alternatives.append(alternative)
+        self.pattern = re.compile('|'.join(alternatives)) if alternatives else None
+
+    def extended(self, extra_symbols):
+        return LatexTransliterator({**self.symbols, **extra_symbols})
+
+    def convert(self, text):
+        if self.pattern is None or '\\' not in text:
+            return text
+        return self.pattern.sub(self._replace, text)
+
+    def _replace(self, match):
+        return self.symbols[match.group(0)]
+
+
+# Built once per process and shared by every parser without extra symbols
+DEFAULT_LATEX_TRANSLITERATOR = LatexTransliterator(LATEX_SYMBOLS)
+
+SUBJECT_KEYWORDS = {
+    'Mathematics': dict.fromkeys([
+        'mathematics', 'math', 'algebra', 'calculus', 'geometry', 'trigonometry',
+        'function', 'derivative', 'integral', 'limit', 'matrix', 'vector',
+        'equation', 'polynomial', 'quadratic', 'logarithm', 'exponential',
+        'triangle', 'circle', 'parabola', 'hyperbola', 'ellipse', 'coordinate',
+        'probability', 'statistics', 'permutation', 'combination', 'binomial'
+    ], 1.0),
+    'Physics': dict.fromkeys([
+        'physics', 'force', 'energy', 'wave', 'electric', 'magnetic', 'optics',
+        'mechanics', 'thermodynamics', 'quantum', 'atom', 'electron', 'proton',
+        'neutron', 'nucleus', 'radioactive', 'circuit', 'current', 'voltage',
+        'resistance', 'capacitor', 'inductor', 'momentum', 'acceleration',
+        'velocity', 'displacement', 'frequency', 'wavelength', 'amplitude',
+        'reflection', 'refraction', 'lens', 'mirror', 'prism', 'interference'
+    ], 1.0),
+    'Chemistry': dict.fromkeys([
+        'chemistry', 'molecule', 'atom', 'reaction', 'compound', 'element',
+        'acid', 'base', 'salt', 'bond', 'organic', 'inorganic', 'carbon',
+        'hydrogen', 'oxygen', 'nitrogen', 'sulfur', 'chlorine', 'bromine',
+        'iodine', 'alkali', 'metal', 'non-metal', 'catalyst', 'equilibrium',
+        'oxidation', 'reduction', 'electrolysis', 'polymer', 'isomer',
+        'functional group', 'alcohol', 'ketone', 'aldehyde', 'ester'
+    ], 1.0)
+}
+# "atom" is as much Physics as Chemistry, so it is split and never breaks a tie
+SUBJECT_KEYWORDS['Physics']['atom'] = SUBJECT_KEYWORDS['Chemistry']['atom'] = 0.5
+
+# Keywords count anywhere in a word ("electromagnetic", "wave" in "wavelength"),
+# except inside these: LaTeX commands like \mathrm and \limits, and "database"
+SUBJECT_KEYWORD_FALSE_HITS = ('\\math', '\\limits', 'database')
+
+# Paper-level subject: the first of these named anywhere in the paper wins
+PAPER_SUBJECT_KEYWORDS = {
+    'Mathematics': {'mathematics': 1.0},
+    'Physics': {'physics': 1.0},
+    'Chemistry': {'chemistry': 1.0}
+}
+
+
+# Unicode class escapes the bytes twins rewrite, and the str test each one uses
+UNICODE_CLASS_TESTS = {'d': str.isdecimal, 's': str.isspace}
+
+
+@functools.lru_cache(maxsize=None)
+def utf8_class_pattern(escape):
+    """Bytes regex source matching one UTF-8 encoded character of a str class escape ('d' or 's').
+    
+    The encodings are grouped by their leading bytes into character classes;
+    a lookahead on the possible first bytes lets a failed position be
+    rejected with one test. Built once per process (it walks every code point).
+    """
+    test = UNICODE_CLASS_TESTS[escape]
+    tails = {}
+    for char in map(chr, range(sys.maxunicode + 1)):
+        if test(char):
+            encoded = char.encode('utf-8')
+            tails.setdefault(encoded[:-1], []).append(encoded[-1])
+    
+    def byte_class(values):
+        values = sorted(set(values))
+        ranges = []
+        for value in values:
+            if ranges and ranges[-1][1] == value - 1:
+                ranges[-1][1] = value
+            else:
+                ranges.append([value, value])
+        return b'[' + b''.join(b'\\x%02x-\\x%02x' % (low, high) for low, high in ranges) + b']'
+    
+    alternatives = [
+        b''.join(b'\\x%02x' % value for value in prefix) + byte_class(last_bytes)
+        for prefix, last_bytes in tails.items()
+    ]
+    first_bytes = byte_class(value for prefix, last_bytes in tails.items() for value in (prefix[:1] or last_bytes))
+    return b'(?:(?=' + first_bytes + b')(?:' + b'|'.join(alternatives) + b'))'
+
+
+def buffer_twin(pattern):
+    r"""Compile ``pattern`` for UTF-8 bytes buffers (bytes, mmap) with the same matches.
+    
+    \d and \s are rewritten to match the UTF-8 encodings of the same Unicode
+    characters, so offsets are byte offsets and decoded groups equal the str
+    groups. Only those escapes (outside character classes) are rewritten;
+    case-insensitive matching of the bytes twin is ASCII-only.
+    """
+    source = pattern.pattern
+    parts = []
+    in_class = False
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            escape = source[i + 1]
+            if escape in UNICODE_CLASS_TESTS and not in_class:
+                parts.append(utf8_class_pattern(escape))
+            else:
+                parts.append(source[i:i + 2].encode('utf-8'))
+            i += 2
+            continue
+        if char == '[' and not in_class:
+            in_class = True
+        elif char == ']' and in_class:
+            in_class = False
+        parts.append(char.encode('utf-8'))
+        i += 1
+    return re.compile(b''.join(parts), pattern.flags & ~re.UNICODE)
+
+
+def check_utf8(buffer, window=1 << 20):
+    """Raise UnicodeDecodeError unless the whole buffer is UTF-8, like reading it as text would.
+    
+    Decodes one window at a time and discards the text, so a mapped file is
+    validated without ever being held as a str.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for start in range(0, len(buffer), window):
+        decoder.decode(buffer[start:start + window])
+    decoder.decode(b'', final=True)
+
+
+class SubjectClassifier:
+    """Weighted keyword classifier built once from a {subject: {keyword: weight}} table.
+    
+    The keywords are compiled into a single trie-shaped regex inside a
+    lookahead, so a text is scanned once no matter how many keywords there
+    are and every occurrence counts, inside longer words too: the trie finds
+    the longest keyword at each offset and the shorter keywords it starts
+    with are counted along with it. An occurrence that lies inside one of
+    ``false_hits`` (e.g. "math" in "\\mathrm") does not count. Each distinct
+    keyword found adds its weight to every subject listing it.
+    """
+
+    def __init__(self, keyword_table, false_hits=SUBJECT_KEYWORD_FALSE_HITS):
+        self.subjects = list(keyword_table)
+        self.weights = {}
+        for subject, keywords in keyword_table.items():
+            for keyword, weight in keywords.items():
+                self.weights.setdefault(keyword.lower(), []).append((subject, weight))
+        # Matched against lowercased text; case-sensitive scanning is much
+        # faster than re.IGNORECASE here
+        self.pattern = re.compile('(?=(' + self._trie_pattern(self.weights) + '))')
+        self.prefixes = {
+            keyword: [other for other in self.weights if keyword.startswith(other)]
+            for keyword in self.weights
+        }
+        # keyword -> [(false hit, offset of the keyword inside it)]
+        self.false_hits = {}
+        for hit in map(str.lower, false_hits):
+            for keyword in self.weights:
+                offset = hit.find(keyword)
+                while offset >= 0:
+                    self.false_hits.setdefault(keyword, []).append((hit, offset))
+                    offset = hit.find(keyword, offset + 1)
+        # Context an occurrence needs on either side of its start to be judged
+        self.lookbehind = max((offset for hits in self.false_hits.values() for _, offset in hits), default=0)
+        self.lookahead = max([len(keyword) for keyword in self.weights]
+                             + [len(hit) - offset for hits in self.false_hits.values() for hit, offset in hits]
+                             or [0])
+
+    @staticmethod
+    def _trie_pattern(words):
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        def emit(node):
+            branches = [re.escape(char) + emit(node[char]) for char in sorted(node) if char]
+            if not branches:
+                return ''
+            if len(branches) == 1 and '' not in node:
+                return branches[0]
+            group = '(?:' + '|'.join(branches) + ')'
+            # Optional tail when a keyword ends here, so the longest keyword wins
+            return group + '?' if '' in node else group
+        
+        return emit(trie) or '(?!)'
+
+    def _occurrences(self, text, pos=0):
+        """(offset, keyword) for every counted keyword starting at or after ``pos`` in lowercased ``text``."""
+        false_hits = self.false_hits
+        for match in self.pattern.finditer(text, pos):
+            start = match.start()
+            for keyword in self.prefixes[match.group(1)]:
+                if keyword in false_hits and any(
+                    start >= offset and text.startswith(hit, start - offset) for hit, offset in false_hits[keyword]
+                ):
+                    continue
+                yield start, keyword
+
+    def score(self, text):
+        return self._scores({keyword for _, keyword in self._occurrences(text.lower())})
+
+    def score_buffer(self, buffer, window=1 << 20):
+        """score() for a UTF-8 buffer such as an mmap, decoding one window at a time.
+        
+        An occurrence is only judged where the text seen so far is long
+        enough to hold the longest keyword (and any false hit around it);
+        scanning resumes there once the next window is decoded, so the
+        keywords found are exactly those of one full scan.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        keywords = set()
+        text = ''
+        resume = 0
+        for start in range(0, len(buffer), window):
+            final = start + window >= len(buffer)
+            text += decoder.decode(buffer[start:start + window], final).lower()
+            limit = len(text) if final else len(text) - self.lookahead
+            for offset, keyword in self._occurrences(text, resume):
+                if offset >= limit:
+                    break
+                keywords.add(keyword)
+            resume = max(resume, limit)
+            # Keep the characters before the resume point a false hit may start with
+            keep = max(resume - self.lookbehind, 0)
+            text = text[keep:]
+            resume -= keep
+        return self._scores(keywords)
+
+    def score_many(self, texts):
+        # One scan over all texts joined by newlines (no keyword or false hit
+        # contains one); matches are mapped back to their text by offset
+        texts = list(texts)
+        found = [set() for _ in texts]
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        for start, keyword in self._occurrences('\n'.join(texts).lower()):
+            found[bisect_right(starts, start) - 1].add(keyword)
+        return [self._scores(keywords) for keywords in found]
+
+    def _scores(self, keywords):
+        scores = dict.fromkeys(self.subjects, 0.0)
+        for keyword in keywords:
+            for subject, weight in self.weights[keyword]:
+                scores[subject] += weight
+        return scores
+
+    @staticmethod
+    def label(scores, default='Mixed'):
+        # The subject must beat every other subject outright
+        best = max(scores, key=scores.get, default=None)
+        if best is None or not scores[best]:
+            return default
+        if any(value >= scores[best] for subject, value in scores.items() if subject != best):
+            return default
+        return best
+
+    def classify(self, text):
+        scores = self.score(text)
+        return {'subject': self.label(scores), 'scores': scores}
+
+    def classify_many(self, texts):
+        return [{'subject': self.label(scores), 'scores': scores} for scores in self.score_many(texts)]
+
+
+DEFAULT_SUBJECT_CLASSIFIER = SubjectClassifier(SUBJECT_KEYWORDS)
+PAPER_SUBJECT_CLASSIFIER = SubjectClassifier(PAPER_SUBJECT_KEYWORDS)
+
+# Below this many questions a process pool costs more than it saves
+PARALLEL_MIN_QUESTIONS = 1000
+
+
+# Paper formats: which option grammars (extract_options and the stem cleanup)
+# and which answer patterns, in order, a paper of that kind needs. 'generic'
+# runs everything and is used when detection finds no better fit
+FORMAT_PROFILES = {
+    'jee_main': {'options': ['numbered'], 'answers': ['answer', 'answer_colon', 'correct_answer']},
+    'neet': {'options': ['numbered'], 'answers': ['answer_colon', 'correct_answer', 'answer']},
+    'lettered': {'options': ['lettered'], 'answers': ['answer', 'answer_colon', 'correct_answer']},
+    'generic': {'options': ['numbered', 'lettered', 'dotted'], 'answers': ['answer', 'answer_colon', 'correct_answer']}
+}
+
+# Questions sampled from the start of a paper to pick its profile
+PROFILE_SAMPLE_SIZE = 10
+
+# Bytes of a paper that summarize() reads for its title, year, subject, time and marks
+SUMMARY_HEADER_BYTES = 16 * 1024
+
+
+def number_to_letter(number):
+    return chr(64 + int(number))
+
+
+# Bump whenever parse_question output can change for the same section text;
+# it is part of every question cache key
+PARSER_VERSION = '5'
+
+# clean_markdown memoizes strings up to CLEAN_CACHE_MAX_CHARS long (option
+# texts like "(2) 22" recur across papers) in an LRU of CLEAN_CACHE_SIZE entries
+CLEAN_CACHE_SIZE = 4096
+CLEAN_CACHE_MAX_CHARS = 64
+
+
+# Methods timed when a parser is built with profile=True
+PROFILED_STAGES = [
+    'extract_exam_info', 'find_question_spans', 'parse_question', 'build_span_table',
+    'extract_question_text', 'extract_options', 'extract_correct_answer', 'extract_solution',
+    'extract_images', 'extract_marks', 'determine_subject', 'clean_markdown', 'convert_latex_symbols'
+]
+
+
+# CPU seconds one question may take in hardened mode before it is flagged
+DEFAULT_QUESTION_BUDGET = 0.5
+
+
+class QuestionBudgetExceeded(BaseException):
+    """Raised inside a question's parse when its CPU budget runs out.
+    
+    Derives from BaseException so the per-question ``except Exception``
+    handler in _parse_question cannot swallow it.
+    """
+
+
+def _raise_budget_exceeded(signum, frame):
+    raise QuestionBudgetExceeded()
+
+
+def run_with_cpu_budget(seconds, func, *args):
+    """Call ``func(*args)`` with at most ``seconds`` of CPU time; returns (result, over_budget).
+    
+    On POSIX main threads a SIGPROF timer interrupts the call (the re module
+    checks for signals while matching), and the result is None. Elsewhere
+    the call runs to completion and is only reported as over budget.
+    """
+    if not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        started = time.process_time()
+        result = func(*args)
+        return result, time.process_time() - started > seconds
+    
+    previous = signal.signal(signal.SIGPROF, _raise_budget_exceeded)
+    try:
+        signal.setitimer(signal.ITIMER_PROF, seconds)
+        try:
+            return func(*args), False
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+    except QuestionBudgetExceeded:
+        return None, True
+    finally:
+        signal.signal(signal.SIGPROF, previous)
+
+
+class ParseStats:
+    """Per-stage wall-clock/call counts, regex match counters and the slowest questions.
+    
+    Stage times are inclusive, so clean_markdown time also shows up inside
+    the extract_* stages that call it. ``callback(stage, seconds)`` is invoked
+    for every timed call when given.
+    """
+
+    def __init__(self, slowest=10, callback=None):
+        self.slowest = slowest
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.regex_matches = {}
+        self.questions = []
+        self.started = time.perf_counter()
+
+    def record(self, stage, seconds):
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+        if self.callback:
+            self.callback(stage, seconds)
+
+    def count(self, name, matches):
+        if matches:
+            self.regex_matches[name] = self.regex_matches.get(name, 0) + matches
+
+    def record_question(self, question_index, chars, seconds):
+        entry = (seconds, question_index, chars)
+        if len(self.questions) < self.slowest:
+            heapq.heappush(self.questions, entry)
+        elif self.slowest:
+            heapq.heappushpop(self.questions, entry)
+
+    def observe_span_table(self, table):
+        for kind, positions in table['markers'].items():
+            self.count(kind, len(positions))
+        # A deferred table whose options were never looked up has none to count
+        if 'options' in table:
+            self.count('option_letters', len(table['options']))
+
+    def to_dict(self):
+        return {
+            'wallSeconds': time.perf_counter() - self.started,
+            'stages': {
+                stage: {'seconds': seconds, 'calls': calls}
+                for stage, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0])
+            },
+            'regexMatches': dict(sorted(self.regex_matches.items())),
+            'slowestQuestions': [
+                {'questionIndex': str(question_index), 'chars': chars, 'seconds': seconds}
+                for seconds, question_index, chars in sorted(self.questions, reverse=True)
+            ]
+        }
+
+
+class QuestionCache:
+    """Content-addressed store of parsed questions.
+    
+    Entries are keyed by a hash of the raw section text plus the parser's
+    version/config namespace and hold the question without its
+    questionIndex/questionId, so a renumbered question is still a hit. An
+    in-memory LRU capped at ``max_entries`` sits in front of an optional
+    SQLite file that survives between runs.
+    """
+
+    def __init__(self, max_entries=10000, sqlite_path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        self.pending_writes = 0
+        if sqlite_path:
+            self.db = sqlite3.connect(sqlite_path)
+            self.db.execute('CREATE TABLE IF NOT EXISTS question_cache (key TEXT PRIMARY KEY, question TEXT NOT NULL)')
+
+    def get(self, key):
+        body = self.entries.get(key)
+        if body is not None:
+            self.entries.move_to_end(key)
+        elif self.db is not None:
+            row = self.db.execute('SELECT question FROM question_cache WHERE key = ?', (key,)).fetchone()
+            if row:
+                body = row[0]
+                self._remember(key, body)
+        if body is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(body)
+
+    def put(self, key, question):
+        body = json.dumps(question, ensure_ascii=False, separators=(',', ':'))
+        self._remember(key, body)
+        if self.db is not None:
+            self.db.execute('INSERT OR REPLACE INTO question_cache (key, question) VALUES (?, ?)', (key, body))
+            self.pending_writes += 1
+            if self.pending_writes >= 500:
+                self.flush()
+
+    def _remember(self, key, body):
+        self.entries[key] = body
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def flush(self):
+        if self.db is not None:
+            self.db.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries)
+        }
+
+
+class DeferredSpanTable(dict):
+    """A build_span_table(lazy=True) table: the solution span, marks, images
+    and raw options are found the first time they are looked up."""
+
+    def __init__(self, parser, content, **found):
+        super().__init__(found)
+        self.parser = parser
+        self.content = content
+
+    def __missing__(self, key):
+        parser, content = self.parser, self.content
+        if key == 'solution_span':
+            value = parser._find_solution_span(content, self['markers'])
+        elif key == 'marks':
+            value = parser._find_marks(content)
+        elif key == 'images':
+            value = parser._find_images(content, self['markers'])
+        elif key == 'options':
+            value = parser._find_raw_options(content, FORMAT_PROFILES[self['profile']]['options'])
+        else:
+            raise KeyError(key)
+        self[key] = value
+        return value
+
+
+class LazyQuestion:
+    """One question section whose fields are extracted on first access and memoized.
+    
+    Holding only the section text, a listing that reads ``text`` and
+    ``correct_answer`` never pays for the solution, options, images or
+    subject. ``to_dict()`` returns exactly what parse_question would (None,
+    after the same error line, when the section fails to parse). The
+    question cache and the hardened question budget only apply to eager
+    parsing.
+    """
+
+    def __init__(self, parser, content, index, profile):
+        self.parser = parser
+        self.content = content
+        self.index = index
+        # The paper's profile when it was segmented; the parser may move on to other papers
+        self.profile = profile
+
+    @property
+    def question_id(self):
+        return f'Q{self.index}'
+
+    @functools.cached_property
+    def table(self):
+        return self.parser.build_span_table(self.content, self.profile, lazy=True)
+
+    @functools.cached_property
+    def text(self):
+        return self.parser.extract_question_text(self.content, self.table)
+
+    @functools.cached_property
+    def options(self):
+        return self.parser.extract_options(self.content, self.table)
+
+    @functools.cached_property
+    def correct_answer(self):
+        return self.parser.extract_correct_answer(self.content, self.table)
+
+    @property
+    def correct_answer_text(self):
+        return self.options.get(self.correct_answer, {}).get('text', '')
+
+    @functools.cached_property
+    def solution(self):
+        return self.parser.extract_solution(self.content, self.table)
+
+    @functools.cached_property
+    def images(self):
+        return self.parser.extract_images(self.content, self.table)
+
+    @functools.cached_property
+    def subject(self):
+        return self.parser.determine_subject(self.text)
+
+    @functools.cached_property
+    def marks(self):
+        return self.parser.extract_marks(self.content, self.table)
+
+    def to_dict(self):
+        try:
+            return {
+                'questionIndex': str(self.index),
+                'questionId': self.question_id,
+                'questionDetails': [{
+                    'text': self.text,
+                    'textImages': self.images,
+                    'possibleAnswers': self.options,
+                    'correctAnswer': self.correct_answer,
+                    'correctAnswerText': self.correct_answer_text
+                }],
+                'subject': self.subject,
+                'solution': self.solution,
+                'marks': self.marks
+            }
+        except Exception as error:
+            print(f"Error parsing question {self.index}: {error}")
+            return None
+
+
 class SophisticatedMarkdownParser:
-    def __init__(self):
+    def __init__(self, extra_symbols=None, subject_keywords=None, cache=None,
+                 profile=False, profile_callback=None, slowest_questions=10, format_profile='auto',
+                 hardened=False, question_budget=None):
+        # extra_symbols: optional {latex_command: symbol} map merged over LATEX_SYMBOLS
+        self.latex_transliterator = DEFAULT_LATEX_TRANSLITERATOR
+        if extra_symbols:
+            self.latex_transliterator = DEFAULT_LATEX_TRANSLITERATOR.extended(extra_symbols)
+        # subject_keywords: optional {subject: {keyword: weight}} table replacing SUBJECT_KEYWORDS
+        self.subject_classifier = DEFAULT_SUBJECT_CLASSIFIER
+        if subject_keywords:
+            self.subject_classifier = SubjectClassifier(subject_keywords)
+        # format_profile: a FORMAT_PROFILES name, or 'auto' to detect it per paper.
+        # active_profile is what parse_question uses; it stays 'generic' until
+        # a paper has been sampled
+        if format_profile != 'auto' and format_profile not in FORMAT_PROFILES:
+            raise ValueError(f'unknown format profile: {format_profile}')
+        self.format_profile = format_profile
+        self.active_profile = 'generic' if format_profile == 'auto' else format_profile
+        # hardened: scan markdown images by hand instead of with a backtracking
+        # regex, and give every question a CPU budget (question_budget seconds,
+        # DEFAULT_QUESTION_BUDGET unless set); questions over budget are
+        # emitted with flags=['timeBudgetExceeded'] instead of stalling the paper
+        self.hardened = hardened
+        if hardened and question_budget is None:
+            question_budget = DEFAULT_QUESTION_BUDGET
+        self.question_budget = question_budget
+        # cache: optional QuestionCache; keys are namespaced by version and config
+        self.cache = cache
+        self.cache_namespace = hashlib.blake2b(json.dumps(
+            [PARSER_VERSION, self.latex_transliterator.symbols, self.subject_classifier.weights],
+            sort_keys=True
+        ).encode('utf-8'), digest_size=16).hexdigest()
+        
         self.math_patterns = {
             'display_math': re.compile(r'\$\$([\s\S]*?)\$\$'),
             'inline_math': re.compile(r'\$([^$]+)\$'),
@@ -19,6 +716,10 @@ class SophisticatedMarkdownParser:
             'greek': re.compile(r'\\[a-zA-Z]+'),
             'matrix': re.compile(r'\\begin\{[^}]+\}[\s\S]*?\\end\{[^}]+\}')
         }
+        # clean_markdown splits text on these spans (display first, as the JS parser does)
+        self.math_span_pattern = re.compile(r'(\$\$[\s\S]*?\$\$|\$[^$]+\$)')
+        self.whitespace_pattern = re.compile(r'\s+')
+        self._cached_clean = functools.lru_cache(maxsize=CLEAN_CACHE_SIZE)(self._clean_markdown)
         
         self.question_patterns = {
             'numbered': re.compile(r'^(\d+)\.\s*(.+?)(?=\n\d+\.|$)', re.MULTILINE | re.DOTALL),
@@ -26,10 +727,22 @@ class SophisticatedMarkdownParser:
             'parenthesized': re.compile(r'^\((\d+)\)\s*(.+?)(?=\n\(\d+\)|$)', re.MULTILINE | re.DOTALL)
         }
         
+        # Option grammars as extract_options applies them, in order; later
+        # grammars overwrite letters found by earlier ones
         self.option_patterns = {
-            'numbered': re.compile(r'\((\d+)\)\s*([^\(]*?)(?=\(\d+\)|Ans\.|$)', re.MULTILINE),
-            'lettered': re.compile(r'([A-D])\)\s*([^A-D\)]*?)(?=[A-D]\)|Ans\.|$)', re.MULTILINE),
-            'dotted': re.compile(r'(\d+)\.\s*([^0-9]*?)(?=\d+\.|Ans\.|$)', re.MULTILINE)
+            'numbered': re.compile(r'\((\d+)\)\s*([^\(]*?)(?=\(\d+\)|Ans\.|Sol\.|$)', re.MULTILINE),
+            'lettered': re.compile(r'([A-D])\)\s*([^A-D\)]*?)(?=[A-D]\)|Ans\.|Sol\.|$)', re.MULTILINE),
+            'dotted': re.compile(r'(?<!\d)(\d+)\.\s*([^0-9]*?)(?=\d+\.|Ans\.|Sol\.|$)', re.MULTILINE)
+        }
+        # Two option markers of a grammar are enough to say a question uses it
+        self.option_signatures = {
+            'numbered': re.compile(r'\([1-4]\)[\s\S]*?\([1-4]\)'),
+            'lettered': re.compile(r'(?<![A-Za-z0-9(])[A-D]\)[\s\S]*?(?<![A-Za-z0-9(])[A-D]\)')
+        }
+        self.option_letter_maps = {
+            'numbered': number_to_letter,
+            'lettered': str,
+            'dotted': number_to_letter
         }
         
         self.answer_patterns = {
@@ -38,113 +751,588 @@ class SophisticatedMarkdownParser:
             'correct_answer': re.compile(r'Correct\s+answer\s+is\s+([A-D1-4])', re.IGNORECASE)
         }
         
+        # Segmenter patterns: question starts, plus the markers that make a
+        # section count as a real question (searched in place, never sliced)
+        self.question_start_pattern = re.compile(r'^(\d+)\.\s*', re.MULTILINE)
+        self.marker_patterns = {
+            'options': re.compile(r'\([1-4]\)'),
+            'answer': re.compile(r'Ans\.'),
+            'solution': re.compile(r'Sol\.')
+        }
+        self.leading_number_pattern = re.compile(r'\d+\.')
+        
+        # Paper-level patterns, searched over the whole document
+        self.exam_info_patterns = {
+            'title': re.compile(r'^#+\s*(.+?)(?:\n|$)', re.MULTILINE),
+            'year': re.compile(r'(\d{4})'),
+            'time': re.compile(r'Time:\s*([^\n]+)', re.IGNORECASE),
+            'marks': re.compile(r'M\.M\s*:\s*(\d+)', re.IGNORECASE)
+        }
+        # The three line-start marker styles count_questions compares. They
+        # start with different characters, so one alternation finds the same
+        # matches as three scans; anchoring on a literal newline (plus the
+        # first line on its own) lets the scan skip from line to line
+        count_markers = r'(?:(?P<numbered>\d+\.(?=\s))|(?P<parenthesized>\(\d+\)(?=\s))|(?P<lettered>[A-Z]\.(?=\s)))'
+        self.count_patterns = {
+            'first_line': re.compile(count_markers),
+            'line': re.compile(r'\n' + count_markers)
+        }
+        
+        # Bytes twins for memory-mapped input; see buffer_patterns
+        self._buffer_patterns = None
+        
         self.solution_patterns = {
             'solution': re.compile(r'(?:Sol\.|Solution:|Explanation:)\s*([\s\S]*?)(?=\n\d+\.|$)', re.IGNORECASE),
             'detailed_solution': re.compile(r'(?:Detailed\s+)?Solution:?\s*([\s\S]*?)(?=\n\d+\.|$)', re.IGNORECASE)
         }
+        
+        # Span table scanner: one case-insensitive pass over a question finds
+        # every answer, solution and image marker; the anchored patterns below
+        # are then only tried at those offsets. The leading lookahead lists
+        # every marker's first character so the regex engine can skip ahead
+        self.span_marker_pattern = re.compile(
+            r'(?=[acse!<\\])'
+            r'(?:(?P<answer>ans\.)|(?P<answer_colon>answer:)|(?P<correct_answer>correct\s+answer\s+is)'
+            r'|(?P<sol>sol\.)|(?P<solution>solution)|(?P<explanation>explanation:)'
+            r'|(?P<markdown_image>!\[)|(?P<html_image><img)|(?P<latex_image>\\includegraphics))',
+            re.IGNORECASE
+        )
+        self.answer_colon_cut_pattern = re.compile(r'Answer:\s*[A-D1-4]', re.IGNORECASE)
+        self.solution_colon_pattern = re.compile(r'Solution:', re.IGNORECASE)
+        self.solution_end_pattern = re.compile(r'\n\d+\.')
+        self.stem_option_patterns = {
+            'numbered': re.compile(r'\([1-4]\)[\s\S]*?(?=Ans\.|$)'),
+            'lettered': re.compile(r'[A-D]\)[\s\S]*?(?=Ans\.|$)'),
+            'dotted': re.compile(r'(?<!\d)\d+\.\s*[^0-9][\s\S]*?(?=Ans\.|$)')
+        }
+        self.marks_patterns = [
+            re.compile(r'(?<!\d)(\d+)\s*\/\s*-?\d+'),
+            re.compile(r'\+(\d+)'),
+            re.compile(r'(?<!\d)(\d+)\s*marks?', re.IGNORECASE)
+        ]
+        self.image_patterns = {
+            'markdown_image': re.compile(r'!\[([^\]]*)\]\(([^)]+)\)'),
+            'html_image': re.compile(r'<img[^>]+src="([^"]+)"[^>]*alt="([^"]*)"[^>]*>', re.IGNORECASE),
+            'latex_image': re.compile(r'\\includegraphics(?:\[[^\]]*\])?\{([^}]+)\}')
+        }
+        # Offsets the hardened <img> scanner looks up instead of backtracking
+        self.html_image_scan_patterns = {
+            'src': re.compile(r'src="', re.IGNORECASE),
+            'alt': re.compile(r'alt="', re.IGNORECASE),
+            'quote': re.compile(r'"'),
+            'close': re.compile(r'>')
+        }
+        
+        # profile: time every PROFILED_STAGES method and report it as parseStats.
+        # Disabled parsers are never wrapped, so they pay nothing for it
+        self.stats = None
+        if profile:
+            self.stats = ParseStats(slowest_questions, profile_callback)
+            for stage in PROFILED_STAGES:
+                setattr(self, stage, self._profiled(stage, getattr(self, stage)))
 
-    def parse_markdown_content(self, content):
+    def _profiled(self, stage, method):
+        stats = self.stats
+        clock = time.perf_counter
+        
+        if stage == 'parse_question':
+            def timed(match, question_index):
+                started = clock()
+                try:
+                    return method(match, question_index)
+                finally:
+                    seconds = clock() - started
+                    stats.record(stage, seconds)
+                    stats.record_question(question_index, len(match['content']), seconds)
+        elif stage == 'build_span_table':
+            def timed(content, profile=None, lazy=False):
+                started = clock()
+                table = method(content, profile, lazy)
+                stats.record(stage, clock() - started)
+                stats.observe_span_table(table)
+                return table
+        elif stage == 'find_question_spans':
+            def timed(content):
+                started = clock()
+                spans = method(content)
+                stats.record(stage, clock() - started)
+                stats.count('question_starts', len(spans))
+                return spans
+        else:
+            def timed(*args, **kwargs):
+                started = clock()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    stats.record(stage, clock() - started)
+        return timed
+
+    def parse_markdown_content(self, content, workers=None, chunk_size=250,
+                               parallel_threshold=PARALLEL_MIN_QUESTIONS):
+        if self.stats:
+            self.stats.reset()
         exam_info = self.extract_exam_info(content)
-        questions = self.extract_questions(content)
+        questions = self.extract_questions(content, workers, chunk_size, parallel_threshold)
         
-        return {
+        result = {
             'examInfo': exam_info,
             'questions': questions,
             'totalQuestions': len(questions)
         }
+        exam_info['formatProfile'] = self.active_profile
+        if self.stats:
+            result['parseStats'] = self.stats.to_dict()
+        return result
+
+    def parse_markdown_file(self, path, workers=None, chunk_size=250,
+                            parallel_threshold=PARALLEL_MIN_QUESTIONS):
+        """parse_markdown_content for a file on disk, read through a read-only mmap.
+        
+        Exam info and segmentation run on the mapped bytes, questions are
+        kept as byte offsets, and each question's text is decoded only when
+        it is parsed, so the document is never held as one str.
+        """
+        with open(path, 'rb') as f:
+            # mmap cannot map an empty file
+            if not os.fstat(f.fileno()).st_size:
+                return self.parse_markdown_content('', workers, chunk_size, parallel_threshold)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                check_utf8(buffer)
+                return self.parse_markdown_content(buffer, workers, chunk_size, parallel_threshold)
+
+    @contextlib.contextmanager
+    def open_markdown_file(self, path):
+        """parse_markdown_file one question at a time: yields (examInfo, questions iterator).
+        
+        The file stays mapped for the ``with`` block. Exam info and the
+        question spans are found up front; each question is decoded and
+        parsed only when the iterator reaches it, so nothing but the spans
+        and the current question is held. The question count is only known
+        at the end, so write_json writes totalQuestions after the questions.
+        """
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                yield self._stream_content('')
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                check_utf8(buffer)
+                yield self._stream_content(buffer)
+
+    def _stream_content(self, content):
+        if self.stats:
+            self.stats.reset()
+        exam_info = self.extract_exam_info(content)
+        spans = self._question_spans(content)
+        exam_info['formatProfile'] = self.active_profile
+        return exam_info, self._parse_spans(content, spans)
 
     def extract_exam_info(self, content):
-        title_match = re.search(r'^#+\s*(.+?)(?:\n|$)', content, re.MULTILINE)
-        year_match = re.search(r'(\d{4})', content)
-        subject_match = re.search(r'(?:MATHEMATICS|PHYSICS|CHEMISTRY|Mathematics|Physics|Chemistry)', content, re.IGNORECASE)
-        time_match = re.search(r'Time:\s*([^\n]+)', content, re.IGNORECASE)
-        marks_match = re.search(r'M\.M\s*:\s*(\d+)', content, re.IGNORECASE)
-        
-        subject = 'Mixed'
-        if 'MATHEMATICS' in content.upper() or 'Mathematics' in content:
-            subject = 'Mathematics'
-        elif 'PHYSICS' in content.upper() or 'Physics' in content:
-            subject = 'Physics'
-        elif 'CHEMISTRY' in content.upper() or 'Chemistry' in content:
-            subject = 'Chemistry'
+        exam_info = self.extract_paper_details(content)
+        exam_info['totalQuestions'] = self.count_questions(content)
+        return exam_info
+
+    def extract_paper_details(self, content):
+        """Title, year, subject, time and marks: everything in examInfo but the question count."""
+        if isinstance(content, str):
+            patterns = self.exam_info_patterns
+            paper_scores = PAPER_SUBJECT_CLASSIFIER.score(content)
+            text = str
+        else:
+            patterns = self.buffer_patterns['exam_info']
+            paper_scores = PAPER_SUBJECT_CLASSIFIER.score_buffer(content)
+            text = lambda value: value.decode('utf-8')
+        title_match = patterns['title'].search(content)
+        year_match = patterns['year'].search(content)
+        time_match = patterns['time'].search(content)
+        marks_match = patterns['marks'].search(content)
+        
+        # Mathematics, then Physics, then Chemistry: the first one named in the paper
+        subject = next((name for name, value in paper_scores.items() if value), 'Mixed')
         
         return {
-            'title': title_match.group(1).strip() if title_match else 'Exam Paper',
-            'year': year_match.group(1) if year_match else str(datetime.now().year),
+            'title': text(title_match.group(1)).strip() if title_match else 'Exam Paper',
+            'year': text(year_match.group(1)) if year_match else str(datetime.now().year),
             'subject': subject,
-            'time': time_match.group(1).strip() if time_match else '3 hours',
-            'maxMarks': marks_match.group(1) if marks_match else '300',
-            'totalQuestions': self.count_questions(content)
+            'time': text(time_match.group(1)).strip() if time_match else '3 hours',
+            'maxMarks': text(marks_match.group(1)) if marks_match else '300'
         }
 
     def count_questions(self, content):
-        patterns = [
-            re.compile(r'^\d+\.\s', re.MULTILINE),
-            re.compile(r'^\((\d+)\)\s', re.MULTILINE),
-            re.compile(r'^[A-Z]\.\s', re.MULTILINE)
+        """Line starts in the most common marker style (``1.``, ``(1)`` or ``A.``), in one pass."""
+        patterns = self.count_patterns if isinstance(content, str) else self.buffer_patterns['count']
+        counts = dict.fromkeys(patterns['line'].groupindex, 0)
+        first = patterns['first_line'].match(content)
+        if first:
+            counts[first.lastgroup] += 1
+        for match in patterns['line'].finditer(content):
+            counts[match.lastgroup] += 1
+        return max(counts.values())
+
+    def summarize(self, path, header_bytes=SUMMARY_HEADER_BYTES):
+        """examInfo for a listing, without parsing any questions.
+        
+        Title, year, subject, time and marks come from the whole lines in the
+        first ``header_bytes`` of the file, so a paper that first names one
+        of them further in gets the same default as an unnamed one.
+        totalQuestions is counted over the whole file in one pass over an mmap.
+        """
+        with open(path, 'rb') as f:
+            header = f.read(header_bytes)
+            if len(header) == header_bytes:
+                header = header[:header.rfind(b'\n') + 1]
+            summary = self.extract_paper_details(header.decode('utf-8'))
+            summary['totalQuestions'] = 0
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    summary['totalQuestions'] = self.count_questions(buffer)
+        return summary
+
+    def extract_questions(self, content, workers=None, chunk_size=250,
+                          parallel_threshold=PARALLEL_MIN_QUESTIONS, lazy=False):
+        """Parse every question in the paper.
+        
+        With ``workers`` > 1 and at least ``parallel_threshold`` questions,
+        the segmented questions are sent to a process pool in chunks of
+        ``chunk_size``. Numbering is assigned before dispatch and chunks come
+        back in order, so the result is identical to the serial path.
+        With ``lazy`` nothing is parsed yet: a LazyQuestion is returned per
+        section and ``workers`` is ignored.
+        """
+        spans = self._question_spans(content)
+        
+        if lazy:
+            return [
+                LazyQuestion(self, self._span_match(content, span)['content'], index, self.active_profile)
+                for index, span in enumerate(spans, 1)
+            ]
+        
+        if not workers or workers <= 1 or len(spans) < max(parallel_threshold, 2):
+            return list(self._parse_spans(content, spans))
+        
+        indexed = [(self._span_match(content, span), index) for index, span in enumerate(spans, 1)]
+        # Cache lookups and stores happen here; workers only see misses
+        results = [None] * len(indexed)
+        pending = []
+        for position, (match, index) in enumerate(indexed):
+            cached = self._cached_question(match['content'], index) if self.cache is not None else None
+            if cached:
+                results[position] = cached
+            else:
+                pending.append((position, match, index))
+        chunks = [
+            [(match, index) for _, match, index in pending[i:i + chunk_size]]
+            for i in range(0, len(pending), chunk_size)
         ]
+        if chunks:
+            parsed = []
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                     initializer=_init_chunk_worker, initargs=(self,)) as executor:
+                for chunk_results in executor.map(_parse_question_chunk, chunks):
+                    parsed.extend(chunk_results)
+            for (position, match, _), question in zip(pending, parsed):
+                results[position] = question
+                if question and self.cache is not None:
+                    self._store_question(match['content'], question)
         
-        max_count = 0
-        for pattern in patterns:
-            matches = pattern.findall(content)
-            if len(matches) > max_count:
-                max_count = len(matches)
+        return [question for question in results if question]
+
+    def _question_spans(self, content):
+        """find_question_spans, after picking the paper's profile from its first sections."""
+        spans = self.find_question_spans(content)
+        if self.format_profile == 'auto':
+            self.active_profile = self.detect_format_profile(
+                [self._span_match(content, span)['content'] for span in spans[:PROFILE_SAMPLE_SIZE]]
+            )
+        return spans
+
+    def _parse_spans(self, content, spans):
+        """Parse the sections one at a time, yielding those that parse."""
+        # Each section is sliced (or decoded) just before it is parsed
+        for index, span in enumerate(spans, 1):
+            question = self.parse_question(self._span_match(content, span), index)
+            if question:
+                yield question
+
+    def extract_question_models(self, content, workers=None, chunk_size=250,
+                                parallel_threshold=PARALLEL_MIN_QUESTIONS):
+        """extract_questions, returned as compact question_model.Question objects.
         
-        return max_count
+        parse_question still builds each question as dicts (the cache, the
+        pool workers and the JSON writers all work on dicts); serially, each
+        one is converted as soon as it is parsed, so only one question's
+        dicts are alive at a time. The pool path converts its results once
+        they are back.
+        """
+        if workers and workers > 1:
+            questions = self.extract_questions(content, workers, chunk_size, parallel_threshold)
+            return [Question.from_dict(question) for question in questions]
+        spans = self._question_spans(content)
+        return [Question.from_dict(question) for question in self._parse_spans(content, spans)]
 
-    def extract_questions(self, content):
-        questions = []
-        question_matches = self.find_question_matches(content)
+    def iter_questions(self, fileobj, chunk_size=65536):
+        """Parse questions from a text file handle, yielding each one as soon as it is complete.
         
-        for index, match in enumerate(question_matches):
-            question = self.parse_question(match, index + 1)
+        The markdown is read in chunks; everything from the last question
+        start onwards is carried into the next chunk, so memory is bounded by
+        the largest question rather than the file. Questions come out in
+        document order (parse_markdown_content sorts by question number).
+        With format_profile='auto' the first PROFILE_SAMPLE_SIZE sections are
+        held back until the paper's profile is known.
+        """
+        matches = self._iter_question_matches(fileobj, chunk_size)
+        sample = []
+        if self.format_profile == 'auto':
+            for match in matches:
+                sample.append(match)
+                if len(sample) == PROFILE_SAMPLE_SIZE:
+                    break
+            self.active_profile = self.detect_format_profile([match['content'] for match in sample])
+        
+        question_index = 0
+        for match in itertools.chain(sample, matches):
+            question_index += 1
+            question = self.parse_question(match, question_index)
             if question:
-                questions.append(question)
+                yield question
+
+    def _iter_question_matches(self, fileobj, chunk_size):
+        buffer = ''
+        # No complete question start can begin before this offset
+        scan_from = 0
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+            
+            cut = 0
+            for match in self.question_start_pattern.finditer(buffer, scan_from):
+                if match.start():
+                    cut = match.start()
+            # A question start split across chunks can only be on the last line
+            newline = buffer.rfind('\n', scan_from)
+            if newline >= 0:
+                scan_from = newline + 1
+            if not cut:
+                continue
+            
+            section = buffer[:cut]
+            for span in self.segment_questions(section):
+                yield self._span_match(section, span)
+            buffer = buffer[cut:]
+            scan_from -= cut
         
-        return questions
+        for span in self.segment_questions(buffer):
+            yield self._span_match(buffer, span)
+
+    def detect_format_profile(self, contents):
+        """Pick the FORMAT_PROFILES entry that fits most of the sampled question contents.
+        
+        A question fits a profile when it has two option markers of the
+        profile's grammar and an answer in the profile's preferred form.
+        Papers where nothing fits fall back to 'generic'.
+        """
+        best, best_fits = 'generic', 0
+        for name, profile in FORMAT_PROFILES.items():
+            if name == 'generic':
+                continue
+            signature = self.option_signatures[profile['options'][0]]
+            answer_pattern = self.answer_patterns[profile['answers'][0]]
+            fits = sum(1 for content in contents if signature.search(content) and answer_pattern.search(content))
+            if fits > best_fits:
+                best, best_fits = name, fits
+        return best
+
+    def question_profile(self, content, profile=None):
+        """The profile one question is parsed with: the paper's, unless the
+        question plainly uses another profile's options, or options that
+        only 'generic' parses."""
+        profile = profile or self.active_profile
+        if profile == 'generic':
+            return profile
+        if self.option_signatures[FORMAT_PROFILES[profile]['options'][0]].search(content):
+            return profile
+        for name, other in FORMAT_PROFILES.items():
+            if name == 'generic' or other['options'] == FORMAT_PROFILES[profile]['options']:
+                continue
+            if self.option_signatures[other['options'][0]].search(content):
+                return name
+        # Options no profile's signature recognizes (e.g. dotted "1." options)
+        # are only found by the generic grammars
+        if self._find_raw_options(content, FORMAT_PROFILES['generic']['options']):
+            return 'generic'
+        # No options at all (e.g. a numeric answer): nothing to disagree with
+        return profile
 
     def find_question_matches(self, content):
-        matches = []
-        
-        # Split content by question numbers and process each section
-        # Look for patterns like "1. question text" followed by options and answer
-        question_sections = re.split(r'^(\d+)\.\s*', content, flags=re.MULTILINE)
-        
-        # Process pairs of (number, content)
-        for i in range(1, len(question_sections), 2):
-            if i + 1 < len(question_sections):
-                question_number = question_sections[i]
-                question_content = question_sections[i + 1]
-                
-                # Find the end of this question (next question number or end of content)
-                next_question_match = re.search(r'^(\d+)\.\s*', question_content, re.MULTILINE)
-                if next_question_match:
-                    # Cut off at the next question
-                    question_content = question_content[:next_question_match.start()]
-                
-                question_content = question_content.strip()
-                
-                # Only include if it looks like a real question (has options or answer)
-                if re.search(r'\([1-4]\)|Ans\.|Sol\.', question_content):
-                    matches.append({
-                        'number': question_number,
-                        'content': question_content,
-                        'type': 'numbered'
-                    })
+        return [self._span_match(content, span) for span in self.find_question_spans(content)]
+
+    def find_question_spans(self, content):
+        spans = list(self.segment_questions(content))
         
         # Sort by question number
-        matches.sort(key=lambda x: int(x['number']))
-        return matches
+        spans.sort(key=lambda span: int(span.number))
+        return spans
+
+    def _span_match(self, content, span):
+        section = content[span.start:span.end]
+        if not isinstance(section, str):
+            # Byte offsets into a buffer; the bytes twins only trim ASCII whitespace
+            section = section.decode('utf-8').strip()
+        return {
+            'number': span.number,
+            'content': section,
+            'type': 'numbered'
+        }
+
+    def segment_questions(self, content):
+        """Yield a QuestionSpan for every section that looks like a real question.
+        
+        A single finditer over the ``N.`` line starts gives the section
+        boundaries; the marker probes then run in place on each section via
+        pos/endpos, so sections are never copied or rescanned as substrings.
+        Spans come out in document order. ``content`` may also be a UTF-8
+        buffer (bytes, mmap); span offsets are then byte offsets.
+        """
+        if isinstance(content, str):
+            start_pattern = self.question_start_pattern
+        else:
+            start_pattern = self.buffer_patterns['question_start']
+        number = None
+        start = 0
+        for match in start_pattern.finditer(content):
+            if number is not None:
+                span = self._close_span(content, number, start, match.start())
+                if span:
+                    yield span
+            number = match.group(1)
+            start = match.end()
+        if number is not None:
+            span = self._close_span(content, number, start, len(content))
+            if span:
+                yield span
+
+    def _close_span(self, content, number, start, end):
+        # A section that itself begins with "N." is cut off there, which
+        # leaves it empty (the old re.split + re.search behaviour)
+        if isinstance(content, str):
+            leading_number_pattern = self.leading_number_pattern
+            marker_patterns = self.marker_patterns.values()
+        else:
+            leading_number_pattern = self.buffer_patterns['leading_number']
+            marker_patterns = self.buffer_patterns['markers']
+            number = number.decode('utf-8')
+        if leading_number_pattern.match(content, start, end):
+            return None
+        flags = [pattern.search(content, start, end) is not None for pattern in marker_patterns]
+        if not any(flags):
+            return None
+        while start < end and content[start:start + 1].isspace():
+            start += 1
+        while end > start and content[end - 1:end].isspace():
+            end -= 1
+        return QuestionSpan(number, start, end, *flags)
+
+    @property
+    def buffer_patterns(self):
+        """Bytes twins of the segmenter and paper-level patterns, for parsing a
+        memory-mapped file without decoding it as a whole. Built on first use."""
+        if self._buffer_patterns is None:
+            self._buffer_patterns = {
+                'question_start': buffer_twin(self.question_start_pattern),
+                'leading_number': buffer_twin(self.leading_number_pattern),
+                'markers': [buffer_twin(pattern) for pattern in self.marker_patterns.values()],
+                'exam_info': {name: buffer_twin(pattern) for name, pattern in self.exam_info_patterns.items()},
+                'count': {name: buffer_twin(pattern) for name, pattern in self.count_patterns.items()}
+            }
+        return self._buffer_patterns
+
+    def __getstate__(self):
+        # The cache (and its SQLite handle) and the profiling wrappers stay
+        # with the parent process; workers parse uncached and unprofiled
+        state = self.__dict__.copy()
+        state['cache'] = None
+        state['stats'] = None
+        # Workers only ever see decoded sections
+        state['_buffer_patterns'] = None
+        # lru_cache wrappers do not pickle; each process starts its own
+        state.pop('_cached_clean', None)
+        for stage in PROFILED_STAGES:
+            state.pop(stage, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cached_clean = functools.lru_cache(maxsize=CLEAN_CACHE_SIZE)(self._clean_markdown)
+
+    def question_cache_key(self, content):
+        digest = hashlib.blake2b(content.encode('utf-8'), digest_size=20)
+        digest.update(self.cache_namespace.encode('ascii'))
+        digest.update(self.active_profile.encode('ascii'))
+        return digest.hexdigest()
+
+    def _cached_question(self, content, question_index):
+        cached = self.cache.get(self.question_cache_key(content))
+        if cached is None:
+            return None
+        return {'questionIndex': str(question_index), 'questionId': f'Q{question_index}', **cached}
+
+    def _store_question(self, content, question):
+        body = {key: value for key, value in question.items() if key not in ('questionIndex', 'questionId')}
+        self.cache.put(self.question_cache_key(content), body)
 
     def parse_question(self, match, question_index):
+        if self.cache is not None:
+            cached = self._cached_question(match['content'], question_index)
+            if cached:
+                return cached
+        if self.question_budget:
+            question, over_budget = run_with_cpu_budget(
+                self.question_budget, self._parse_question, match, question_index
+            )
+            if over_budget:
+                print(f"⏱️  Question {question_index} exceeded its {self.question_budget}s parse budget")
+                return self._flagged_question(match['content'], question_index, question)
+        else:
+            question = self._parse_question(match, question_index)
+        if question and self.cache is not None:
+            self._store_question(match['content'], question)
+        return question
+
+    def _flagged_question(self, content, question_index, question=None):
+        """Mark an over-budget question; when its parse was cut short, fall back
+        to the raw section text, which only needs linear-time work."""
+        if question is None:
+            leading_number = self.leading_number_pattern.match(content)
+            text = ' '.join(content[leading_number.end() if leading_number else 0:].split())
+            question = {
+                'questionIndex': str(question_index),
+                'questionId': f'Q{question_index}',
+                'questionDetails': [{
+                    'text': text,
+                    'textImages': [],
+                    'possibleAnswers': {},
+                    'correctAnswer': '',
+                    'correctAnswerText': ''
+                }],
+                'subject': self.determine_subject(text),
+                'solution': '',
+                'marks': '4'
+            }
+        question['flags'] = ['timeBudgetExceeded']
+        return question
+
+    def _parse_question(self, match, question_index):
         try:
-            question_text = self.extract_question_text(match['content'])
-            options = self.extract_options(match['content'])
-            correct_answer = self.extract_correct_answer(match['content'])
-            solution = self.extract_solution(match['content'])
-            images = self.extract_images(match['content'])
+            content = match['content']
+            table = self.build_span_table(content)
+            question_text = self.extract_question_text(content, table)
+            options = self.extract_options(content, table)
+            correct_answer = self.extract_correct_answer(content, table)
+            solution = self.extract_solution(content, table)
+            images = self.extract_images(content, table)
             subject = self.determine_subject(question_text)
-            marks = self.extract_marks(match['content'])
+            marks = self.extract_marks(content, table)
             
             return {
                 'questionIndex': str(question_index),
@@ -164,114 +1352,344 @@ class SophisticatedMarkdownParser:
             print(f"Error parsing question {question_index}: {error}")
             return None
 
-    def extract_question_text(self, content):
-        question_text = content
+    def build_span_table(self, content, profile=None, lazy=False):
+        """Scan a question once and record where each of its parts lives.
+        
+        The table holds the answer match, the end of the stem, the solution
+        span, the image matches and the raw option texts, so every extract_*
+        method reads offsets from it instead of re-running its own regex
+        passes over the whole question. With ``lazy`` only the markers, the
+        answer match and the stem end are found up front; the rest of the
+        table (a DeferredSpanTable) is filled in as it is looked up.
+        """
+        profile = self.question_profile(content, profile)
+        markers = {name: [] for name in self.span_marker_pattern.groupindex}
+        for marker in self.span_marker_pattern.finditer(content):
+            markers[marker.lastgroup].append(marker.start())
+        
+        # First "Ans. (N)" style answer; it also ends the stem
+        answer_match = None
+        for pos in markers['answer']:
+            answer_match = self.answer_patterns['answer'].match(content, pos)
+            if answer_match:
+                break
+        
+        # Stem end, applying the Ans./Answer:/Sol./Solution: cuts in order
+        stem_end = answer_match.start() if answer_match else len(content)
+        for pos in markers['answer_colon']:
+            if pos >= stem_end:
+                break
+            if self.answer_colon_cut_pattern.match(content, pos, stem_end):
+                stem_end = pos
+                break
+        if markers['sol'] and markers['sol'][0] + 4 <= stem_end:
+            stem_end = markers['sol'][0]
+        for pos in markers['solution']:
+            if pos + 9 > stem_end:
+                break
+            if self.solution_colon_pattern.match(content, pos, stem_end):
+                stem_end = pos
+                break
+        
+        if lazy:
+            return DeferredSpanTable(self, content, profile=profile, markers=markers,
+                                     answer_match=answer_match, stem_end=stem_end)
+        return {
+            'profile': profile,
+            'markers': markers,
+            'answer_match': answer_match,
+            'stem_end': stem_end,
+            'solution_span': self._find_solution_span(content, markers),
+            'marks': self._find_marks(content),
+            'images': self._find_images(content, markers),
+            'options': self._find_raw_options(content, FORMAT_PROFILES[profile]['options'])
+        }
+
+    def _find_solution_span(self, content, markers):
+        headed = [
+            pos for pos in markers['solution']
+            if self.solution_colon_pattern.match(content, pos)
+        ]
+        candidates = []
+        if markers['sol']:
+            candidates.append((markers['sol'][0], 4))
+        if headed:
+            candidates.append((headed[0], 9))
+        if markers['explanation']:
+            candidates.append((markers['explanation'][0], 12))
+        if candidates:
+            pos, length = min(candidates)
+            body_start = pos + length
+        elif markers['solution']:
+            # Fall back to a bare "Solution" heading with an optional colon
+            body_start = markers['solution'][0] + 8
+            if content.startswith(':', body_start):
+                body_start += 1
+        else:
+            return None
+        
+        while body_start < len(content) and content[body_start].isspace():
+            body_start += 1
+        end_match = self.solution_end_pattern.search(content, body_start)
+        return body_start, end_match.start() if end_match else len(content)
+
+    def _find_marks(self, content):
+        for pattern in self.marks_patterns:
+            match = pattern.search(content)
+            if match:
+                return match.group(1)
+        return None
+
+    def _find_images(self, content, markers):
+        if self.hardened:
+            # Hand scanners with the regexes' matches, linear in the section
+            return {
+                'markdown_image': self._scan_markdown_images(content, markers['markdown_image']),
+                'html_image': self._scan_html_images(content, markers['html_image']),
+                'latex_image': self._scan_latex_images(content, markers['latex_image'])
+            }
+        images = {}
+        for kind, pattern in self.image_patterns.items():
+            found = []
+            last_end = 0
+            for pos in markers[kind]:
+                if pos < last_end:
+                    continue
+                match = pattern.match(content, pos)
+                if match:
+                    found.append(match.groups())
+                    last_end = match.end()
+            images[kind] = found
+        return images
+
+    def _scan_markdown_images(self, content, positions):
+        # Same matches as image_patterns['markdown_image'], but the next ']'
+        # and ')' are remembered across markers, so a run of unclosed '![' is
+        # linear instead of one scan to the end of the section per marker
+        found = []
+        last_end = 0
+        close_bracket = close_paren = -1
+        for pos in positions:
+            if pos < last_end:
+                continue
+            if close_bracket < pos + 2:
+                close_bracket = content.find(']', pos + 2)
+                if close_bracket < 0:
+                    break
+            if not content.startswith('(', close_bracket + 1):
+                continue
+            if close_paren < close_bracket + 2:
+                close_paren = content.find(')', close_bracket + 2)
+                if close_paren < 0:
+                    break
+            if close_paren == close_bracket + 2:
+                continue
+            found.append((content[pos + 2:close_bracket], content[close_bracket + 2:close_paren]))
+            last_end = close_paren + 1
+        return found
+
+    def _scan_html_images(self, content, positions):
+        # Same matches as image_patterns['html_image']. The regex takes the
+        # last src=" before the tag's first '>' whose value closes and is
+        # followed by an alt=" (the last one before the next '>') and some
+        # '>'; here every candidate offset comes from sorted position lists,
+        # and a tag end where one marker failed fails for the later ones too
+        if not positions:
+            return []
+        offsets = {
+            name: [match.start() for match in pattern.finditer(content, positions[0])]
+            for name, pattern in self.html_image_scan_patterns.items()
+        }
+        srcs, alts, quotes, closes = offsets['src'], offsets['alt'], offsets['quote'], offsets['close']
+        
+        def first_from(values, low):
+            index = bisect_left(values, low)
+            return values[index] if index < len(values) else -1
+        
+        def last_within(values, low, high):
+            index = bisect_right(values, high) - 1
+            return values[index] if index >= 0 and values[index] >= low else -1
+        
+        def alt_after(src_end):
+            tag_end = first_from(closes, src_end + 1)
+            if tag_end < 0:
+                return None
+            alt = last_within(alts, src_end + 1, tag_end - 5)
+            while alt >= 0:
+                alt_end = first_from(quotes, alt + 5)
+                close = first_from(closes, alt_end + 1) if alt_end >= 0 else -1
+                if close >= 0:
+                    return alt, alt_end, close
+                alt = last_within(alts, src_end + 1, alt - 1)
+            return None
+        
+        found = []
+        last_end = 0
+        failed_tag_end = -1
+        for pos in positions:
+            if pos < last_end:
+                continue
+            tag_end = first_from(closes, pos + 4)
+            if tag_end < 0:
+                break
+            if tag_end == failed_tag_end:
+                continue
+            src = last_within(srcs, pos + 5, tag_end - 5)
+            while src >= 0:
+                src_end = first_from(quotes, src + 5)
+                if src_end > src + 5:
+                    alt = alt_after(src_end)
+                    if alt:
+                        alt, alt_end, close = alt
+                        found.append((content[src + 5:src_end], content[alt + 5:alt_end]))
+                        last_end = close + 1
+                        break
+                src = last_within(srcs, pos + 5, src - 1)
+            else:
+                failed_tag_end = tag_end
+        return found
+
+    def _scan_latex_images(self, content, positions):
+        # Same matches as image_patterns['latex_image'], remembering the next
+        # ']' and '}' across markers like _scan_markdown_images
+        found = []
+        last_end = 0
+        length = len(content)
+        close_bracket = close_brace = -1
+        for pos in positions:
+            # Markers are found case-insensitively; the pattern is not
+            if pos < last_end or not content.startswith('\\includegraphics', pos):
+                continue
+            brace = pos + 16
+            if content.startswith('[', brace):
+                if close_bracket < brace + 1:
+                    close_bracket = content.find(']', brace + 1)
+                    if close_bracket < 0:
+                        close_bracket = length
+                if close_bracket == length:
+                    continue
+                brace = close_bracket + 1
+            if not content.startswith('{', brace):
+                continue
+            if close_brace < brace + 1:
+                close_brace = content.find('}', brace + 1)
+                if close_brace < 0:
+                    close_brace = length
+            if close_brace == length:
+                break
+            if close_brace == brace + 1:
+                continue
+            found.append((content[brace + 1:close_brace],))
+            last_end = close_brace + 1
+        return found
+
+    def _find_raw_options(self, content, grammars):
+        # Raw stripped texts per letter; only the surviving text of each
+        # letter is cleaned later, so overwritten matches are never cleaned
+        options = {}
+        for name in grammars:
+            pattern = self.option_patterns[name]
+            letter_map = self.option_letter_maps[name]
+            for match in pattern.finditer(content):
+                option_text = match.group(2).strip()
+                if option_text:
+                    options[letter_map(match.group(1))] = option_text
+        return options
+
+    def extract_question_text(self, content, table=None):
+        if table is None:
+            table = self.build_span_table(content)
         
-        # Remove answer and solution sections (but keep options for now)
-        question_text = re.sub(r'Ans\.\s*[\(]?[A-D1-4][\)]?[\s\S]*$', '', question_text, flags=re.IGNORECASE)
-        question_text = re.sub(r'Answer:\s*[A-D1-4][\s\S]*$', '', question_text, flags=re.IGNORECASE)
-        question_text = re.sub(r'Sol\.[\s\S]*$', '', question_text, flags=re.IGNORECASE)
-        question_text = re.sub(r'Solution:[\s\S]*$', '', question_text, flags=re.IGNORECASE)
+        # Drop answer and solution sections (but keep options for now)
+        question_text = content[:table['stem_end']]
         
         # Now remove the options to get just the question text
-        question_text = re.sub(r'\([1-4]\)[\s\S]*?(?=Ans\.|$)', '', question_text)
-        question_text = re.sub(r'[A-D]\)[\s\S]*?(?=Ans\.|$)', '', question_text)
-        question_text = re.sub(r'\d+\.\s*[^0-9][\s\S]*?(?=Ans\.|$)', '', question_text)
+        for name in FORMAT_PROFILES[table['profile']]['options']:
+            question_text = self.stem_option_patterns[name].sub('', question_text)
         
         # Clean up markdown formatting
         question_text = self.clean_markdown(question_text)
         
         return question_text.strip()
 
-    def extract_options(self, content):
-        options = {}
+    def extract_options(self, content, table=None):
+        if table is None:
+            table = self.build_span_table(content)
         
-        # Try different option patterns
-        patterns = [
-            # Pattern 1: (1) option text (2) option text (3) option text (4) option text
-            {'regex': re.compile(r'\((\d+)\)\s*([^\(]*?)(?=\(\d+\)|Ans\.|Sol\.|$)', re.MULTILINE), 'letter_map': lambda n: chr(64 + int(n))},
-            # Pattern 2: A) option text B) option text C) option text D) option text
-            {'regex': re.compile(r'([A-D])\)\s*([^A-D\)]*?)(?=[A-D]\)|Ans\.|Sol\.|$)', re.MULTILINE), 'letter_map': lambda n: n},
-            # Pattern 3: 1. option text 2. option text 3. option text 4. option text
-            {'regex': re.compile(r'(\d+)\.\s*([^0-9]*?)(?=\d+\.|Ans\.|Sol\.|$)', re.MULTILINE), 'letter_map': lambda n: chr(64 + int(n))}
-        ]
-        
-        for pattern in patterns:
-            for match in pattern['regex'].finditer(content):
-                option_number = match.group(1)
-                option_text = match.group(2).strip()
-                
-                # Clean up markdown in option text
-                option_text = self.clean_markdown(option_text)
-                
-                if option_text and len(option_text) > 0:
-                    option_letter = pattern['letter_map'](option_number)
-                    options[option_letter] = {
-                        'text': option_text,
-                        'image': None
-                    }
+        options = {}
+        for option_letter, option_text in table['options'].items():
+            options[option_letter] = {
+                'text': self.clean_markdown(option_text),
+                'image': None
+            }
         
         return options
 
-    def extract_correct_answer(self, content):
-        for pattern in self.answer_patterns.values():
-            match = pattern.search(content)
+    def extract_correct_answer(self, content, table=None):
+        if table is None:
+            table = self.build_span_table(content)
+        
+        match = None
+        # The paper profile decides which answer notation wins when several appear
+        for name in FORMAT_PROFILES[table['profile']]['answers']:
+            if name == 'answer':
+                match = table['answer_match']
+            else:
+                for pos in table['markers'][name]:
+                    match = self.answer_patterns[name].match(content, pos)
+                    if match:
+                        break
             if match:
-                answer = match.group(1).upper()
-                # Convert number to letter if needed
-                if answer >= '1' and answer <= '4':
-                    answer = chr(64 + int(answer))
-                return answer
+                break
+        if match:
+            answer = match.group(1).upper()
+            # Convert number to letter if needed
+            if answer >= '1' and answer <= '4':
+                answer = chr(64 + int(answer))
+            return answer
         return 'A'
 
-    def extract_solution(self, content):
-        for pattern in self.solution_patterns.values():
-            match = pattern.search(content)
-            if match:
-                solution = match.group(1).strip()
-                solution = self.clean_markdown(solution)
-                return solution
-        return ''
-
-    def extract_marks(self, content):
-        marks_patterns = [
-            re.compile(r'(\d+)\s*\/\s*-?\d+'),
-            re.compile(r'\+(\d+)'),
-            re.compile(r'(\d+)\s*marks?', re.IGNORECASE)
-        ]
+    def extract_solution(self, content, table=None):
+        if table is None:
+            table = self.build_span_table(content)
         
-        for pattern in marks_patterns:
-            match = pattern.search(content)
-            if match:
-                return match.group(1)
-        return '4'
+        if table['solution_span'] is None:
+            return ''
+        start, end = table['solution_span']
+        solution = content[start:end].strip()
+        return self.clean_markdown(solution)
 
-    def extract_images(self, content):
+    def extract_marks(self, content, table=None):
+        if table is None:
+            table = self.build_span_table(content)
+        return table['marks'] or '4'
+
+    def extract_images(self, content, table=None):
+        if table is None:
+            table = self.build_span_table(content)
+        
         images = []
         
         # Markdown image syntax: ![alt](src)
-        markdown_images = re.findall(r'!\[([^\]]*)\]\(([^)]+)\)', content)
-        for match in markdown_images:
+        for alt, src in table['images']['markdown_image']:
             images.append({
-                'src': match[1],
-                'alt': match[0] or 'Question image',
+                'src': src,
+                'alt': alt or 'Question image',
                 'type': 'markdown'
             })
         
         # HTML img tags: <img src="..." alt="...">
-        html_images = re.findall(r'<img[^>]+src="([^"]+)"[^>]*alt="([^"]*)"[^>]*>', content, re.IGNORECASE)
-        for match in html_images:
+        for src, alt in table['images']['html_image']:
             images.append({
-                'src': match[0],
-                'alt': match[1] or 'Question image',
+                'src': src,
+                'alt': alt or 'Question image',
                 'type': 'html'
             })
         
         # LaTeX includegraphics: \includegraphics{...}
-        latex_images = re.findall(r'\\includegraphics(?:\[[^\]]*\])?\{([^}]+)\}', content)
-        for match in latex_images:
+        for (src,) in table['images']['latex_image']:
             images.append({
-                'src': match,
+                'src': src,
                 'alt': 'Question image',
                 'type': 'latex'
             })
@@ -279,92 +1697,81 @@ class SophisticatedMarkdownParser:
         return images
 
     def determine_subject(self, question_text):
-        lower_text = question_text.lower()
-        
-        # Mathematics keywords
-        math_keywords = [
-            'mathematics', 'math', 'algebra', 'calculus', 'geometry', 'trigonometry',
-            'function', 'derivative', 'integral', 'limit', 'matrix', 'vector',
-            'equation', 'polynomial', 'quadratic', 'logarithm', 'exponential',
-            'triangle', 'circle', 'parabola', 'hyperbola', 'ellipse', 'coordinate',
-            'probability', 'statistics', 'permutation', 'combination', 'binomial'
-        ]
-        
-        # Physics keywords
-        physics_keywords = [
-            'physics', 'force', 'energy', 'wave', 'electric', 'magnetic', 'optics',
-            'mechanics', 'thermodynamics', 'quantum', 'atom', 'electron', 'proton',
-            'neutron', 'nucleus', 'radioactive', 'circuit', 'current', 'voltage',
-            'resistance', 'capacitor', 'inductor', 'momentum', 'acceleration',
-            'velocity', 'displacement', 'frequency', 'wavelength', 'amplitude',
-            'reflection', 'refraction', 'lens', 'mirror', 'prism', 'interference'
-        ]
-        
-        # Chemistry keywords
-        chemistry_keywords = [
-            'chemistry', 'molecule', 'atom', 'reaction', 'compound', 'element',
-            'acid', 'base', 'salt', 'bond', 'organic', 'inorganic', 'carbon',
-            'hydrogen', 'oxygen', 'nitrogen', 'sulfur', 'chlorine', 'bromine',
-            'iodine', 'alkali', 'metal', 'non-metal', 'catalyst', 'equilibrium',
-            'oxidation', 'reduction', 'electrolysis', 'polymer', 'isomer',
-            'functional group', 'alcohol', 'ketone', 'aldehyde', 'ester'
-        ]
-        
-        math_count = sum(1 for keyword in math_keywords if keyword in lower_text)
-        physics_count = sum(1 for keyword in physics_keywords if keyword in lower_text)
-        chemistry_count = sum(1 for keyword in chemistry_keywords if keyword in lower_text)
-        
-        if math_count > physics_count and math_count > chemistry_count:
-            return 'Mathematics'
-        if physics_count > math_count and physics_count > chemistry_count:
-            return 'Physics'
-        if chemistry_count > math_count and chemistry_count > physics_count:
-            return 'Chemistry'
-        
-        return 'Mixed'
+        return self.subject_classifier.classify(question_text)['subject']
+
+    def determine_subjects(self, question_texts):
+        """Classify a batch of stems in one scan; returns {'subject', 'scores'} per text."""
+        return self.subject_classifier.classify_many(question_texts)
 
     def clean_markdown(self, text):
-        # Convert math delimiters to MathJax format
-        text = re.sub(r'\$\$([\s\S]*?)\$\$', r'$$\1$$', text)
-        text = re.sub(r'\$([^$]+)\$', r'$\1$', text)
-        
-        # Convert LaTeX fractions to readable format
-        text = re.sub(r'\\frac\{([^}]+)\}\{([^}]+)\}', r'(\1)/(\2)', text)
-        
-        # Convert superscripts and subscripts
-        text = re.sub(r'\^([^{}\s]+)', r'^\1', text)
-        text = re.sub(r'_([^{}\s]+)', r'_\1', text)
+        """Readable text with $...$ / $$...$$ math left for MathJax.
         
-        # Convert LaTeX symbols
-        text = self.convert_latex_symbols(text)
-        
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        The string is split once into text and math spans. Text spans get
+        simple ``\\frac{a}{b}`` rewritten as ``(a)/(b)``, LaTeX symbols
+        transliterated and whitespace collapsed; math spans are kept as
+        written apart from the symbol transliteration.
+        """
+        if len(text) <= CLEAN_CACHE_MAX_CHARS:
+            return self._cached_clean(text)
+        return self._clean_markdown(text)
+
+    def _clean_markdown(self, text):
+        if '$' in text:
+            # Text and math spans alternate, text first
+            parts = self.math_span_pattern.split(text)
+            parts[::2] = [self._clean_text(part) for part in parts[::2]]
+            text = ''.join(parts)
+        else:
+            text = self._clean_text(text)
+        # Symbols are transliterated in math spans too; no command spans a '$'
+        return self.convert_latex_symbols(text).strip()
+
+    def _clean_text(self, text):
+        if '\\frac{' in text:
+            text = self._rewrite_fractions(text)
+        return self.whitespace_pattern.sub(' ', text)
+
+    def _rewrite_fractions(self, text):
+        # math_patterns['fractions'].sub(r'(\1)/(\2)', text), but the next '}'
+        # is remembered across candidates, so a run of unclosed '\frac{' is
+        # linear instead of one scan to the end of the string per candidate
+        parts = []
+        last = 0
+        close = -1
+        pos = text.find('\\frac{')
+        while pos >= 0:
+            numerator = pos + 6
+            if close < numerator:
+                close = text.find('}', numerator)
+                if close < 0:
+                    break
+            if close > numerator and text.startswith('{', close + 1):
+                end = text.find('}', close + 2)
+                if end < 0:
+                    break
+                if end > close + 2:
+                    parts.extend((text[last:pos], '(', text[numerator:close], ')/(', text[close + 2:end], ')'))
+                    last = end + 1
+                    pos = text.find('\\frac{', last)
+                    continue
+            pos = text.find('\\frac{', pos + 1)
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return ''.join(parts)
 
     def convert_latex_symbols(self, text):
-        conversions = {
-            '\\alpha': 'α', '\\beta': 'β', '\\gamma': 'γ', '\\delta': 'δ',
-            '\\epsilon': 'ε', '\\theta': 'θ', '\\lambda': 'λ', '\\mu': 'μ',
-            '\\pi': 'π', '\\sigma': 'σ', '\\tau': 'τ', '\\phi': 'φ', '\\omega': 'ω',
-            '\\infty': '∞', '\\sum': 'Σ', '\\int': '∫', '\\sqrt': '√',
-            '\\leq': '≤', '\\geq': '≥', '\\neq': '≠', '\\approx': '≈',
-            '\\pm': '±', '\\times': '×', '\\div': '÷', '\\rightarrow': '→',
-            '\\leftarrow': '←', '\\Rightarrow': '⇒', '\\Leftarrow': '⇐',
-            '\\in': '∈', '\\notin': '∉', '\\subset': '⊂', '\\supset': '⊃',
-            '\\cup': '∪', '\\cap': '∩', '\\emptyset': '∅', '\\forall': '∀',
-            '\\exists': '∃', '\\leftrightarrow': '↔'
-        }
-        
-        result = text
-        for latex, symbol in conversions.items():
-            result = result.replace(latex, symbol)
-        
-        return result
+        return self.latex_transliterator.convert(text)
 
     def generate_json(self, exam_info, questions):
         return {
+            **self.tutorial_header(exam_info, len(questions)),
+            'questions': questions
+        }
+
+    def tutorial_header(self, exam_info, total_questions=None):
+        """Every generate_json field except ``questions``; ``totalQuestions`` is left out when None."""
+        header = {
             'tutorialId': f"{exam_info['subject']}_{exam_info['year']}_{int(datetime.now().timestamp())}",
             'tutorialTitle': exam_info['title'],
             'tutorialDescription': f"{exam_info['subject']} {exam_info['year']} Question Paper with Solutions",
@@ -374,26 +1781,267 @@ class SophisticatedMarkdownParser:
             'conductedBy': "Custom Authority",
             'year': exam_info['year'],
             'subject': exam_info['subject'],
-            'totalQuestions': len(questions),
+            'totalQuestions': total_questions,
             'time': exam_info['time'],
-            'maxMarks': exam_info['maxMarks'],
-            'questions': questions
+            'maxMarks': exam_info['maxMarks']
         }
+        if total_questions is None:
+            del header['totalQuestions']
+        return header
+
+    def write_json(self, out, exam_info, questions, compact=False, backend='auto', total_questions=None):
+        """Stream the generate_json document to a text file handle.
+        
+        The header goes out first and each question is encoded and written
+        as it is produced, so ``questions`` can be a generator such as
+        iter_questions() and memory stays flat. With a sized ``questions``
+        (or ``total_questions``) the bytes are identical to
+        ``json.dump(generate_json(...), indent=2, ensure_ascii=False)``, or
+        to the compact separators when ``compact`` is set. For an unsized
+        iterable ``totalQuestions`` is written after the question list.
+        Returns the number of questions written.
+        """
+        if total_questions is None and hasattr(questions, '__len__'):
+            total_questions = len(questions)
+        header = self.tutorial_header(exam_info, total_questions)
+        return write_tutorial_json(out, header, questions, compact, backend)
+
+    def write_shards(self, out_dir, exam_info, questions, shard_by='subject', compact=False):
+        """Write the tutorial as shards plus manifest.json under ``out_dir`` (see write_tutorial_shards)."""
+        return write_tutorial_shards(out_dir, self.tutorial_header(exam_info), questions, shard_by, compact, exam_info)
+
+def _json_encoder(compact, backend):
+    if backend == 'auto':
+        backend = 'orjson' if orjson is not None and compact else 'json'
+    if backend == 'orjson':
+        if orjson is None:
+            raise ValueError('orjson backend requested but orjson is not installed')
+        if not compact:
+            raise ValueError('the orjson backend only writes compact output')
+        return lambda value: orjson.dumps(value).decode('utf-8')
+    if compact:
+        return lambda value: json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    # Indented one level deeper, as the question sits inside "questions": [...]
+    return lambda value: json.dumps(value, ensure_ascii=False, indent=2).replace('\n', '\n    ')
+
+def write_tutorial_json(out, header, questions, compact=False, backend='auto'):
+    """Write ``{**header, "questions": [...]}`` to ``out`` one question at a time."""
+    encode_question = _json_encoder(compact, backend)
+    if compact:
+        key_prefix, key_separator, item_prefix, list_end, object_end = '', ':', '', ']', '}'
+    else:
+        key_prefix, key_separator, item_prefix, list_end, object_end = '\n  ', ': ', '\n    ', '\n  ]', '\n}'
+    
+    def field(key, value):
+        return key_prefix + json.dumps(key) + key_separator + json.dumps(value, ensure_ascii=False)
+    
+    out.write('{')
+    out.write(','.join(field(key, value) for key, value in header.items()))
+    if header:
+        out.write(',')
+    out.write(key_prefix + '"questions"' + key_separator + '[')
+    count = 0
+    for question in questions:
+        out.write((',' if count else '') + item_prefix + encode_question(question))
+        count += 1
+    out.write(list_end if count else ']')
+    if 'totalQuestions' not in header:
+        out.write(',' + field('totalQuestions', count))
+    out.write(object_end)
+    return count
+
+SHARD_MANIFEST_NAME = 'manifest.json'
+SHARD_MANIFEST_VERSION = 1
+
+def _shard_file_name(name, taken):
+    """File name for a shard, numbered (physics-2.json) if another shard already has it."""
+    stem = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'shard'
+    path = stem + '.json'
+    number = 2
+    while path in taken:
+        path = f'{stem}-{number}.json'
+        number += 1
+    taken.add(path)
+    return path
+
+def _question_ranges(indices):
+    """Sorted questionIndex values as [[first, last], ...] runs."""
+    ranges = []
+    for index in sorted(indices):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return ranges
+
+def write_tutorial_shards(out_dir, header, questions, shard_by='subject', compact=False, exam_info=None):
+    """Write a tutorial as shard files plus a small manifest.json; returns the manifest.
+    
+    ``shard_by`` is 'subject' (one shard per question subject) or a number
+    of questions per shard, in which case ``questions`` may be a generator
+    and is written one shard at a time. Each shard is a
+    ``{"tutorialId", "shard", "questions": [...]}`` document; the manifest
+    records examInfo, the tutorial header and, per shard, its path,
+    subjects, questionIndex ranges, question count, byte size and SHA-256.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if shard_by == 'subject':
+        groups = {}
+        for question in questions:
+            groups.setdefault(question['subject'], []).append(question)
+        batches = groups.items()
+    else:
+        size = int(shard_by)
+        if size < 1:
+            raise ValueError('shard_by must be "subject" or a positive number of questions')
+        iterator = iter(questions)
+        batches = ((f'part-{number:04d}', batch) for number, batch in enumerate(
+            iter(lambda: list(itertools.islice(iterator, size)), []), 1
+        ))
+    
+    shards = []
+    total = 0
+    taken = {SHARD_MANIFEST_NAME}
+    for name, batch in batches:
+        buffer = io.StringIO()
+        write_tutorial_json(buffer, {'tutorialId': header.get('tutorialId'), 'shard': name}, batch, compact)
+        data = buffer.getvalue().encode('utf-8')
+        path = _shard_file_name(name, taken)
+        temp_path = os.path.join(out_dir, path + '.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, os.path.join(out_dir, path))
+        shards.append({
+            'name': name,
+            'path': path,
+            'subjects': sorted({question['subject'] for question in batch}),
+            'questionRanges': _question_ranges(int(question['questionIndex']) for question in batch),
+            'questionCount': len(batch),
+            'bytes': len(data),
+            'sha256': hashlib.sha256(data).hexdigest()
+        })
+        total += len(batch)
+    
+    manifest = {
+        'manifestVersion': SHARD_MANIFEST_VERSION,
+        'shardBy': shard_by if shard_by == 'subject' else int(shard_by),
+        'examInfo': exam_info,
+        'tutorial': {**header, 'totalQuestions': total},
+        'shards': shards
+    }
+    temp_path = os.path.join(out_dir, SHARD_MANIFEST_NAME + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=None if compact else 2, ensure_ascii=False)
+    # The manifest goes last, so a reader never sees shards it does not list
+    os.replace(temp_path, os.path.join(out_dir, SHARD_MANIFEST_NAME))
+    return manifest
+
+class ShardedTutorial:
+    """Lazy reader for write_tutorial_shards output.
+    
+    Only the manifest is read up front; a lookup opens just the shards it
+    needs, checks their size and SHA-256, and keeps the last
+    ``max_open_shards`` in memory. ``opener(path)`` returns a shard's bytes
+    (default: read it next to the manifest), so shards can come from a
+    remote store instead.
+    """
+    
+    def __init__(self, manifest_path, opener=None, max_open_shards=4, verify=True):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('manifestVersion') != SHARD_MANIFEST_VERSION:
+            raise ValueError(f"unsupported shard manifest version: {self.manifest.get('manifestVersion')}")
+        base_dir = os.path.dirname(os.path.abspath(manifest_path))
+        
+        def read_shard(path):
+            with open(os.path.join(base_dir, path), 'rb') as f:
+                return f.read()
+        
+        self.opener = opener or read_shard
+        self.max_open_shards = max_open_shards
+        self.verify = verify
+        self.open_shards = OrderedDict()
+        self.shards_loaded = 0
+        self.shards = {shard['name']: shard for shard in self.manifest['shards']}
+        # (first questionIndex, last questionIndex, shard name), sorted for bisect
+        self.ranges = sorted(
+            (first, last, shard['name']) for shard in self.manifest['shards'] for first, last in shard['questionRanges']
+        )
+        self.range_starts = [first for first, _, _ in self.ranges]
+    
+    @property
+    def exam_info(self):
+        return self.manifest['examInfo']
+    
+    @property
+    def header(self):
+        return self.manifest['tutorial']
+    
+    def __len__(self):
+        return self.header['totalQuestions']
+    
+    def load_shard(self, name):
+        """Questions of one shard, by shard name."""
+        questions = self.open_shards.get(name)
+        if questions is not None:
+            self.open_shards.move_to_end(name)
+            return questions
+        shard = self.shards[name]
+        data = self.opener(shard['path'])
+        if self.verify and (len(data) != shard['bytes'] or hashlib.sha256(data).hexdigest() != shard['sha256']):
+            raise ValueError(f"shard {shard['path']} does not match its manifest checksum")
+        questions = json.loads(data)['questions']
+        self.shards_loaded += 1
+        self.open_shards[name] = questions
+        if len(self.open_shards) > self.max_open_shards:
+            self.open_shards.popitem(last=False)
+        return questions
+    
+    def question(self, question_id):
+        """One question by questionId ('Q12') or questionIndex (12); KeyError if absent."""
+        index = int(str(question_id).lstrip('Q'))
+        position = bisect_right(self.range_starts, index) - 1
+        if position < 0 or index > self.ranges[position][1]:
+            raise KeyError(question_id)
+        for question in self.load_shard(self.ranges[position][2]):
+            if int(question['questionIndex']) == index:
+                return question
+        raise KeyError(question_id)
+    
+    def questions(self, subject=None):
+        """Iterate questions in shard order, optionally only one subject's (opening only its shards)."""
+        for shard in self.manifest['shards']:
+            if subject is not None and subject not in shard['subjects']:
+                continue
+            for question in self.load_shard(shard['name']):
+                if subject is None or question['subject'] == subject:
+                    yield question
+    
+    def to_tutorial(self):
+        """The full generate_json document, questions in questionIndex order."""
+        questions = sorted(self.questions(), key=lambda question: int(question['questionIndex']))
+        return {**self.header, 'questions': questions}
+
+_chunk_parser = None
+
+def _init_chunk_worker(parser):
+    global _chunk_parser
+    _chunk_parser = parser
+
+def _parse_question_chunk(chunk):
+    return [_chunk_parser.parse_question(match, index) for match, index in chunk]
 
 def test_parser():
     try:
         parser = SophisticatedMarkdownParser()
         
-        # Read the markdown file
         markdown_path = '/Users/chethanhulivanaboranna/Downloads/eadfb6e8-b01b-46c3-b613-9599221ed8de.md'
-        with open(markdown_path, 'r', encoding='utf-8') as f:
-            content = f.read()
         
         print('📄 Testing markdown parser...')
-        print(f'📏 File size: {len(content) / 1024:.2f} KB')
+        print(f'📏 File size: {os.path.getsize(markdown_path) / 1024:.2f} KB')
         
-        # Parse the content
-        result = parser.parse_markdown_content(content)
+        # Parse the file through an mmap
+        result = parser.parse_markdown_file(markdown_path)
         
         print('\n📊 Parsing Results:')
         print(f'📚 Title: {result["examInfo"]["title"]}')
@@ -412,13 +2060,10 @@ def test_parser():
             print(f'   Correct: {question["questionDetails"][0]["correctAnswer"]}')
             print(f'   Images: {len(question["questionDetails"][0]["textImages"])}')
         
-        # Generate JSON
-        json_output = parser.generate_json(result["examInfo"], result["questions"])
-        
-        # Save JSON to file
+        # Save JSON to file, streaming one question at a time
         json_path = '/Volumes/Data/PrepBharatWeb/test_output.json'
         with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(json_output, f, indent=2, ensure_ascii=False)
+            parser.write_json(f, result["examInfo"], result["questions"])
         print(f'\n💾 JSON saved to: {json_path}')
         
         print('\n✅ Test completed successfully!')
@@ -428,5 +2073,220 @@ def test_parser():
         import traceback
         traceback.print_exc()
 
+def write_ndjson(markdown_path, out, parser=None):
+    """Stream a paper's questions to ``out`` as NDJSON, one question per line."""
+    parser = parser or SophisticatedMarkdownParser()
+    count = 0
+    with open(markdown_path, 'r', encoding='utf-8') as f:
+        for question in parser.iter_questions(f):
+            out.write(json.dumps(question, ensure_ascii=False))
+            out.write('\n')
+            out.flush()
+            count += 1
+    return count
+
+_worker_parser = None
+_worker_parser_options = None
+
+def parse_paper_file(markdown_path, json_path, compact=False, parser_options=None):
+    """Parse one markdown paper into ``json_path`` (written atomically); returns a summary row instead of raising."""
+    global _worker_parser, _worker_parser_options
+    started = time.perf_counter()
+    row = {'file': markdown_path, 'output': json_path, 'questions': 0, 'flagged': 0, 'seconds': 0.0, 'error': None}
+    try:
+        if _worker_parser is None or _worker_parser_options != parser_options:
+            _worker_parser = SophisticatedMarkdownParser(**(parser_options or {}))
+            _worker_parser_options = parser_options
+        result = _worker_parser.parse_markdown_file(markdown_path)
+        # Readers of json_path see the old output or the new one, never half of it
+        temp_path = f'{json_path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                _worker_parser.write_json(f, result['examInfo'], result['questions'], compact=compact)
+            os.replace(temp_path, json_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        row['questions'] = len(result['questions'])
+        row['flagged'] = sum(1 for question in result['questions'] if question.get('flags'))
+    except Exception as error:
+        row['error'] = f'{type(error).__name__}: {error}'
+    row['seconds'] = time.perf_counter() - started
+    return row
+
+def summarize_paper_file(markdown_path):
+    """summarize() one paper into a row; the error is recorded instead of raised."""
+    global _worker_parser
+    try:
+        if _worker_parser is None:
+            _worker_parser = SophisticatedMarkdownParser()
+        return {'file': markdown_path, **_worker_parser.summarize(markdown_path), 'error': None}
+    except Exception as error:
+        return {'file': markdown_path, 'error': f'{type(error).__name__}: {error}'}
+
+def run_summaries(markdown_paths, workers=None):
+    """Yield a summarize() row per paper, in order, spread across a process pool."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(markdown_paths) <= 1:
+        yield from map(summarize_paper_file, markdown_paths)
+        return
+    # Summaries are cheap; hand each worker many papers per task
+    chunksize = max(1, min(64, len(markdown_paths) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(summarize_paper_file, markdown_paths, chunksize=chunksize)
+
+def find_markdown_files(source):
+    """Expand a directory (every *.md inside it, recursively) or a glob pattern."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '**', '*.md'), recursive=True)
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+def batch_output_paths(markdown_paths, output_dir=None):
+    """Where run_batch writes each paper's JSON: next to it, or at the same
+    path relative to the papers' common folder under ``output_dir``, so
+    s1/paper.md and s2/paper.md never share an output."""
+    if not output_dir:
+        return [os.path.splitext(path)[0] + '.json' for path in markdown_paths]
+    if not markdown_paths:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in markdown_paths])
+    return [
+        os.path.join(output_dir, os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0] + '.json')
+        for path in markdown_paths
+    ]
+
+def run_batch(markdown_paths, output_dir=None, workers=None, compact=False, parser_options=None):
+    """Parse many papers across a process pool; one paper failing never stops the rest."""
+    jobs = []
+    for markdown_path, json_path in zip(markdown_paths, batch_output_paths(markdown_paths, output_dir)):
+        jobs.append((markdown_path, json_path, compact, parser_options))
+    if output_dir:
+        for json_dir in {os.path.dirname(json_path) for _, json_path, _, _ in jobs}:
+            os.makedirs(json_dir, exist_ok=True)
+    
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        return [parse_paper_file(*job) for job in jobs]
+    
+    rows = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = {executor.submit(parse_paper_file, *job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                rows[i] = future.result()
+            except Exception as error:
+                # The worker process itself died (e.g. killed); record and carry on
+                rows[i] = {'file': jobs[i][0], 'output': jobs[i][1], 'questions': 0, 'flagged': 0, 'seconds': 0.0,
+                           'error': f'{type(error).__name__}: {error}'}
+    return rows
+
+def print_batch_summary(rows, elapsed):
+    width = max([len('File')] + [len(row['file']) for row in rows])
+    print(f"{'File':<{width}}  {'Questions':>9}  {'Time (s)':>8}  Error")
+    print(f"{'-' * width}  {'-' * 9}  {'-' * 8}  {'-' * 5}")
+    for row in rows:
+        print(f"{row['file']:<{width}}  {row['questions']:>9}  {row['seconds']:>8.2f}  {row['error'] or ''}")
+    failed = sum(1 for row in rows if row['error'])
+    total_questions = sum(row['questions'] for row in rows)
+    flagged = sum(row['flagged'] for row in rows)
+    flagged_note = f', {flagged} flagged over budget' if flagged else ''
+    print(f'\n📚 {len(rows)} papers, {total_questions} questions{flagged_note}, {failed} failed in {elapsed:.2f}s')
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Parse exam-paper markdown into tutorial JSON')
+    arg_parser.add_argument('markdown', nargs='?', help='markdown file to parse (runs the sample test when omitted)')
+    arg_parser.add_argument('--ndjson', metavar='PATH', help="stream questions as NDJSON to PATH ('-' for stdout)")
+    arg_parser.add_argument('--batch', metavar='DIR_OR_GLOB', help='parse every matching markdown file across a process pool')
+    arg_parser.add_argument('--summarize', metavar='DIR_OR_GLOB',
+                            help='print examInfo and question count per paper as NDJSON, without parsing questions')
+    arg_parser.add_argument('--output-dir', help='where --batch writes <name>.json, keeping the input subfolders '
+                                                 '(default: next to each input)')
+    arg_parser.add_argument('--workers', type=int, default=None,
+                            help='worker processes: papers for --batch/--summarize (default: CPU count); '
+                                 'for a single paper, more than 1 parses its questions on a pool instead of streaming')
+    arg_parser.add_argument('--chunk-size', type=int, default=250, help='questions per worker task for a single paper')
+    arg_parser.add_argument('--cache-db', metavar='PATH', help='SQLite question cache so unchanged questions are not re-parsed')
+    arg_parser.add_argument('--profile', action='store_true', help='print per-stage parseStats to stderr')
+    arg_parser.add_argument('--compact', action='store_true', help='write JSON without indentation')
+    arg_parser.add_argument('--shards', metavar='DIR', help='write the paper as shard files plus manifest.json in DIR')
+    arg_parser.add_argument('--shard-by', default='subject', metavar='subject|N',
+                            help="with --shards: one shard per subject, or N questions per shard (default: subject)")
+    arg_parser.add_argument('--format-profile', choices=['auto', *FORMAT_PROFILES], default='auto',
+                            help='paper format whose option/answer patterns to use (default: detect from the first questions)')
+    arg_parser.add_argument('--hardened', action='store_true',
+                            help='linear-time image scanning and a per-question CPU budget for malformed OCR output')
+    arg_parser.add_argument('--question-budget', type=float, metavar='SECONDS',
+                            help=f'CPU seconds per question before it is flagged (default with --hardened: {DEFAULT_QUESTION_BUDGET})')
+    args = arg_parser.parse_args(argv)
+    if args.shard_by != 'subject' and not (args.shard_by.isdigit() and int(args.shard_by) > 0):
+        arg_parser.error('--shard-by must be "subject" or a positive number of questions')
+    parser_options = {
+        'format_profile': args.format_profile,
+        'hardened': args.hardened,
+        'question_budget': args.question_budget
+    }
+    
+    if args.summarize:
+        markdown_paths = find_markdown_files(args.summarize)
+        if not markdown_paths:
+            arg_parser.error(f'no markdown files match {args.summarize}')
+        started = time.perf_counter()
+        failed = 0
+        for row in run_summaries(markdown_paths, args.workers):
+            failed += bool(row['error'])
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + '\n')
+        print(f'📇 {len(markdown_paths)} papers summarized, {failed} failed in {time.perf_counter() - started:.2f}s',
+              file=sys.stderr)
+        return 1 if failed else 0
+    
+    if args.batch:
+        markdown_paths = find_markdown_files(args.batch)
+        if not markdown_paths:
+            arg_parser.error(f'no markdown files match {args.batch}')
+        started = time.perf_counter()
+        rows = run_batch(markdown_paths, args.output_dir, args.workers, args.compact, parser_options)
+        print_batch_summary(rows, time.perf_counter() - started)
+        return 1 if any(row['error'] for row in rows) else 0
+    
+    if not args.markdown:
+        test_parser()
+        return
+    
+    if args.ndjson and args.ndjson != '-':
+        with open(args.ndjson, 'w', encoding='utf-8') as out:
+            count = write_ndjson(args.markdown, out, SophisticatedMarkdownParser(**parser_options))
+        print(f'💾 {count} questions streamed to: {args.ndjson}', file=sys.stderr)
+    elif args.ndjson:
+        write_ndjson(args.markdown, sys.stdout, SophisticatedMarkdownParser(**parser_options))
+    else:
+        cache = QuestionCache(sqlite_path=args.cache_db) if args.cache_db else None
+        parser = SophisticatedMarkdownParser(cache=cache, profile=args.profile, **parser_options)
+        with contextlib.ExitStack() as stack:
+            if args.workers and args.workers > 1:
+                # The process pool needs every section up front
+                result = parser.parse_markdown_file(args.markdown, workers=args.workers, chunk_size=args.chunk_size)
+                exam_info, questions = result['examInfo'], result['questions']
+            else:
+                # Each question is parsed just before it is written
+                exam_info, questions = stack.enter_context(parser.open_markdown_file(args.markdown))
+            if args.shards:
+                manifest = parser.write_shards(args.shards, exam_info, questions, args.shard_by, compact=args.compact)
+                print(f"💾 {len(manifest['shards'])} shards and {SHARD_MANIFEST_NAME} saved to: {args.shards}",
+                      file=sys.stderr)
+            else:
+                parser.write_json(sys.stdout, exam_info, questions, compact=args.compact)
+                sys.stdout.write('\n')
+        if args.profile:
+            json.dump(parser.stats.to_dict(), sys.stderr, indent=2)
+            sys.stderr.write('\n')
+        if cache:
+            cache.close()
+            stats = cache.stats()
+            print(f"🗄️  Question cache: {stats['hits']} hits, {stats['misses']} misses", file=sys.stderr)
+
 if __name__ == '__main__':
-    test_parser()
+    sys.exit(main())
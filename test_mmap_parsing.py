@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Parsing through an mmap: byte-offset segmentation of UTF-8 buffers gives
+the same papers as parsing the decoded text
+"""
+
+import random
+import re
+
+import pytest
+
+from test_md_parser import SophisticatedMarkdownParser, buffer_twin, check_utf8
+
+UNICODE_TEXT = '1. Ω = 2π × १२ rad (1) α  (2) β Ans. (2)\n٣. Sol. ½ ✓\n'
+
+
+def test_parse_markdown_file_equals_parsing_the_text(tmp_path, comprehensive_paper, synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    for content in (comprehensive_paper, synthetic_paper, UNICODE_TEXT * 3):
+        path = tmp_path / 'paper.md'
+        path.write_text(content, encoding='utf-8')
+        assert parser.parse_markdown_file(str(path)) == parser.parse_markdown_content(content)
+
+
+def test_parse_markdown_file_pooled_equals_serial(tmp_path, synthetic_paper):
+    path = tmp_path / 'paper.md'
+    path.write_text(synthetic_paper, encoding='utf-8')
+    parser = SophisticatedMarkdownParser()
+    pooled = parser.parse_markdown_file(str(path), workers=2, chunk_size=11, parallel_threshold=1)
+    assert pooled == parser.parse_markdown_file(str(path))
+
+
+def test_empty_and_non_utf8_files(tmp_path):
+    parser = SophisticatedMarkdownParser()
+    (tmp_path / 'empty.md').write_bytes(b'')
+    result = parser.parse_markdown_file(str(tmp_path / 'empty.md'))
+    assert result['questions'] == [] and result['totalQuestions'] == 0
+    (tmp_path / 'broken.md').write_bytes(b'1. Force (1) a Ans. (1)\n\xff\xfe\n')
+    with pytest.raises(UnicodeDecodeError):
+        parser.parse_markdown_file(str(tmp_path / 'broken.md'))
+
+
+def test_buffer_segmentation_gives_the_same_sections(comprehensive_paper, synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    for content in (comprehensive_paper, synthetic_paper, UNICODE_TEXT):
+        buffer = content.encode('utf-8')
+        assert parser.find_question_matches(buffer) == parser.find_question_matches(content)
+        assert parser.extract_exam_info(buffer) == parser.extract_exam_info(content)
+
+
+def test_buffer_twins_match_the_same_unicode_text():
+    rng = random.Random(3)
+    alphabet = ['1', '٣', '१', ' ', ' ', ' ', '\n', '\t', 'a', 'Ω', '.', '(', ')']
+    patterns = [re.compile(r'^(\d+)\.\s*', re.MULTILINE), re.compile(r'\(\d\)\s+a'), re.compile(r'\d+\s')]
+    for pattern in patterns:
+        twin = buffer_twin(pattern)
+        for _ in range(500):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            data = text.encode('utf-8')
+            expected = [match.group() for match in pattern.finditer(text)]
+            assert [match.group().decode('utf-8') for match in twin.finditer(data)] == expected, text
+
+
+def test_check_utf8_across_window_boundaries():
+    data = ('Ω' * 10).encode('utf-8')
+    for window in (1, 3, 7, 64):
+        check_utf8(data, window)
+        with pytest.raises(UnicodeDecodeError):
+            check_utf8(data[:-1], window)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Intra-document parallelism: one paper's questions parsed across a process
+pool come back exactly as the serial parse
+"""
+
+import pickle
+
+from test_md_parser import QuestionCache, SophisticatedMarkdownParser
+
+
+def test_process_pool_parse_matches_serial(synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    serial = parser.extract_questions(synthetic_paper)
+    parallel = parser.extract_questions(synthetic_paper, workers=2, chunk_size=7, parallel_threshold=1)
+    assert parallel == serial
+
+
+def test_process_pool_parse_with_a_cache_stores_in_the_parent(synthetic_paper):
+    cache = QuestionCache()
+    parser = SophisticatedMarkdownParser(cache=cache)
+    serial = SophisticatedMarkdownParser().extract_questions(synthetic_paper)
+    assert parser.extract_questions(synthetic_paper, workers=2, chunk_size=7, parallel_threshold=1) == serial
+    assert cache.misses == len(serial) and len(cache.entries) == len(serial)
+    # Every question is a hit the second time, so no pool is needed
+    assert parser.extract_questions(synthetic_paper, workers=2, chunk_size=7, parallel_threshold=1) == serial
+    assert cache.hits == len(serial)
+
+
+def test_parser_pickles_for_workers_without_cache_or_profiling():
+    parser = SophisticatedMarkdownParser(cache=QuestionCache(), profile=True)
+    copy = pickle.loads(pickle.dumps(parser))
+    assert copy.cache is None and copy.stats is None
+    assert 'parse_question' not in copy.__dict__
+    content = '1. Force (1) a (2) b Ans. (2)\n'
+    assert copy.extract_questions(content) == SophisticatedMarkdownParser().extract_questions(content)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Parsing service: NDJSON responses, request validation, backpressure,
+truncated and stalled uploads, and recovery from a crashed worker
+"""
+
+import os
+import json
+import signal
+import asyncio
+import logging
+
+import pytest
+
+from parse_service import ParseService
+from test_md_parser import SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+MAX_BODY_BYTES = 256 * 1024
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = ParseService(workers=1, queue_depth=0, max_body_bytes=MAX_BODY_BYTES)
+    yield service
+    service.pool.shutdown(cancel_futures=True)
+
+
+def dechunk(body):
+    data = b''
+    while body:
+        size, _, body = body.partition(b'\r\n')
+        size = int(size, 16)
+        if not size:
+            break
+        data += body[:size]
+        body = body[size + 2:]
+    return data
+
+
+def parse_response(response):
+    head, _, body = response.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = {name.lower(): value.strip() for name, value in (line.split(':', 1) for line in header_lines)}
+    if headers.get('transfer-encoding') == 'chunked':
+        body = dechunk(body)
+    return int(status_line.split()[1]), headers, body
+
+
+async def send(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return parse_response(response)
+
+
+def serving(service, client):
+    """Run ``client(port)`` against the service on an ephemeral port; returns its result."""
+
+    async def run():
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        try:
+            return await client(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(run())
+
+
+def exchange(service, *requests):
+    """Send raw HTTP requests (one connection each) to the service; returns (status, headers, body) per request."""
+
+    async def client(port):
+        return [await send(port, raw) for raw in requests]
+
+    return serving(service, client)
+
+
+def post(body, path='/parse', length=None):
+    length = str(len(body)) if length is None else length
+    head = f'POST {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n'
+    if length is not False:
+        head += f'Content-Length: {length}\r\n'
+    return head.encode('latin-1') + b'\r\n' + body
+
+
+def get(path):
+    return f'GET {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n'.encode('latin-1')
+
+
+def test_parse_streams_exam_info_then_questions(service):
+    content = generate_paper(20, seed=5)
+    [(status, headers, body)] = exchange(service, post(content.encode('utf-8')))
+    assert status == 200
+    assert headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in body.splitlines()]
+    expected = SophisticatedMarkdownParser().parse_markdown_content(content)
+    assert lines[0] == {'examInfo': expected['examInfo']}
+    assert lines[1:] == expected['questions']
+    assert headers['x-question-count'] == '20'
+
+
+@pytest.mark.parametrize('raw, status', [
+    (post(b'1. x Ans. (1)', length=False), 411),
+    (post(b'abc', length='abc'), 400),
+    (post(b'', length='-5'), 400),
+    (post(b'', length='1e3'), 400),
+    (post(b'', length=str(MAX_BODY_BYTES + 1)), 413),
+    (post(b'\xff\xfe not UTF-8'), 400),
+    (get('/parse'), 405),
+    (post(b'', path='/stats'), 405),
+    (get('/nowhere'), 404),
+    (b'NONSENSE\r\n\r\n', 400),
+])
+def test_bad_requests_get_error_responses(service, raw, status):
+    [(got, headers, body)] = exchange(service, raw)
+    assert got == status
+    assert headers['content-type'] == 'application/json'
+    assert 'error' in json.loads(body)
+
+
+def test_full_queue_is_refused_with_retry_after(service):
+    service.active = service.capacity
+    try:
+        [(status, headers, body)] = exchange(service, post(b'1. x Ans. (1)'))
+    finally:
+        service.active = 0
+    assert status == 429
+    assert headers['retry-after'] == '1'
+    assert json.loads(body)['error'] == 'overloaded'
+
+
+def test_truncated_upload_is_dropped_without_holding_a_slot(service, caplog):
+    content = b'1. A question about force\n(1) a\n(2) b\nAns. (1)\n'
+
+    async def client(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(post(content, length=str(len(content) + 100)))
+        writer.write_eof()
+        response = await reader.read()
+        writer.close()
+        return response, await send(port, post(content))
+
+    with caplog.at_level(logging.ERROR, logger='asyncio'):
+        truncated, (status, _, _) = serving(service, client)
+    assert truncated == b''
+    assert status == 200
+    assert service.active == 0
+    assert not caplog.records
+
+
+def test_stalled_upload_times_out_and_never_blocks_others(service, monkeypatch):
+    monkeypatch.setattr(service, 'body_timeout', 0.5)
+    content = b'1. A question about force\n(1) a\n(2) b\nAns. (1)\n'
+
+    async def client(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        # Half a body, then nothing more
+        writer.write(post(content, length=str(len(content)))[:-10])
+        await writer.drain()
+        await asyncio.sleep(0.1)
+        # workers=1, queue_depth=0: the stalled upload must not be holding the only slot
+        other = await send(port, post(content))
+        stalled = parse_response(await reader.read())
+        writer.close()
+        return other, stalled
+
+    (other, _, _), (stalled, headers, body) = serving(service, client)
+    assert other == 200
+    assert stalled == 408
+    assert headers['connection'] == 'close'
+    assert 'error' in json.loads(body)
+    assert service.active == 0
+
+
+def test_crashed_worker_is_replaced(service):
+    content = b'1. A question about force\n(1) a\n(2) b\nAns. (1)\n'
+    assert exchange(service, post(content))[0][0] == 200
+    for pid in list(service.pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    statuses = [status for status, _, _ in exchange(service, post(content), post(content), post(content))]
+    assert statuses == [500, 200, 200]
+
+
+def test_health_and_stats(service):
+    (health, _, health_body), (stats, _, stats_body) = exchange(service, get('/health'), get('/stats'))
+    assert (health, json.loads(health_body)) == (200, {'status': 'ok'})
+    assert stats == 200
+    assert {'requests', 'completed', 'rejected', 'failed'} <= set(json.loads(stats_body)['counters'])
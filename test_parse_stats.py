@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Per-stage profiling: ParseStats, parsers built with profile=True and the
+parseStats block in their output
+"""
+
+import json
+
+from test_md_parser import PROFILED_STAGES, ParseStats, SophisticatedMarkdownParser, main
+from benchmarks.synthetic import generate_paper
+
+
+def test_unprofiled_parser_is_not_wrapped_and_reports_nothing(synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    assert parser.stats is None
+    assert not set(PROFILED_STAGES) & set(parser.__dict__)
+    assert 'parseStats' not in parser.parse_markdown_content(synthetic_paper)
+
+
+def test_profiled_parse_gives_the_same_questions_plus_parse_stats(synthetic_paper):
+    plain = SophisticatedMarkdownParser().parse_markdown_content(synthetic_paper)
+    result = SophisticatedMarkdownParser(profile=True).parse_markdown_content(synthetic_paper)
+    stats = result.pop('parseStats')
+    assert result == plain
+
+    assert set(stats) == {'wallSeconds', 'stages', 'regexMatches', 'slowestQuestions'}
+    stages = stats['stages']
+    assert stages['parse_question']['calls'] == stages['build_span_table']['calls'] == 60
+    assert stages['extract_exam_info']['calls'] == stages['find_question_spans']['calls'] == 1
+    # Stages come slowest first
+    seconds = [stage['seconds'] for stage in stages.values()]
+    assert seconds == sorted(seconds, reverse=True)
+    assert stats['regexMatches']['question_starts'] == 60
+    assert stats['regexMatches']['answer'] >= 60
+    assert all(stage['seconds'] <= stats['wallSeconds'] for stage in stages.values())
+
+
+def test_slowest_questions_are_kept_slowest_first(synthetic_paper):
+    stats = SophisticatedMarkdownParser(profile=True, slowest_questions=5).parse_markdown_content(
+        synthetic_paper
+    )['parseStats']
+    slowest = stats['slowestQuestions']
+    assert len(slowest) == 5
+    assert [question['seconds'] for question in slowest] == sorted(
+        (question['seconds'] for question in slowest), reverse=True
+    )
+    assert all(question['chars'] > 0 and 1 <= int(question['questionIndex']) <= 60 for question in slowest)
+
+
+def test_stats_start_over_for_every_paper():
+    parser = SophisticatedMarkdownParser(profile=True)
+    parser.parse_markdown_content(generate_paper(20, seed=1))
+    stats = parser.parse_markdown_content(generate_paper(5, seed=2))['parseStats']
+    assert stats['stages']['parse_question']['calls'] == 5
+    assert stats['regexMatches']['question_starts'] == 5
+
+
+def test_profile_callback_sees_every_timed_call():
+    calls = []
+    parser = SophisticatedMarkdownParser(profile=True, profile_callback=lambda stage, seconds: calls.append(stage))
+    stats = parser.parse_markdown_content(generate_paper(4, seed=3))['parseStats']
+    assert len(calls) == sum(stage['calls'] for stage in stats['stages'].values())
+    assert calls.count('parse_question') == 4
+
+
+def test_parse_stats_records():
+    stats = ParseStats(slowest=2)
+    stats.record('stage', 0.5)
+    stats.record('stage', 0.25)
+    stats.count('answer', 3)
+    stats.count('answer', 0)
+    for index, seconds in enumerate([0.1, 0.4, 0.2, 0.3], 1):
+        stats.record_question(index, index * 10, seconds)
+    report = stats.to_dict()
+    assert report['stages'] == {'stage': {'seconds': 0.75, 'calls': 2}}
+    assert report['regexMatches'] == {'answer': 3}
+    assert report['slowestQuestions'] == [{'questionIndex': '2', 'chars': 20, 'seconds': 0.4},
+                                          {'questionIndex': '4', 'chars': 40, 'seconds': 0.3}]
+    stats.reset()
+    assert stats.to_dict()['stages'] == {} and ParseStats(slowest=0).to_dict()['slowestQuestions'] == []
+
+
+def test_cli_profile_prints_parse_stats_to_stderr(tmp_path, capsys):
+    path = tmp_path / 'paper.md'
+    path.write_text(generate_paper(6, seed=4), encoding='utf-8')
+    main([str(path), '--profile'])
+    captured = capsys.readouterr()
+    assert 'parseStats' not in json.loads(captured.out)
+    stats = json.loads(captured.err)
+    assert stats['stages']['parse_question']['calls'] == 6
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Resumable publisher: manifest skips, resuming after a partial run,
+tutorials held back for their images, and a manifest torn by a crash
+"""
+
+import json
+import hashlib
+
+import pytest
+
+from image_assets import open_image_source
+from object_store import FilesystemStore, ObjectStore
+from publisher import Publisher, PublishManifest, main
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'plot' * 10
+IMAGE_KEY = f'images/{hashlib.sha256(PNG).hexdigest()}.png'
+
+
+def make_tutorial(tutorial_id, src=None):
+    details = {'text': f'Question of {tutorial_id}', 'textImages': []}
+    if src:
+        details['textImages'].append({'src': src, 'alt': '', 'type': 'markdown'})
+    return {'tutorialId': tutorial_id, 'subject': 'Physics', 'year': '2025',
+            'questions': [{'questionId': 'Q1', 'questionDetails': [details]}]}
+
+
+class FlakyStore(FilesystemStore):
+    """FilesystemStore that fails every put whose key contains ``failing``."""
+
+    def __init__(self, root, failing=None):
+        super().__init__(root)
+        self.failing = failing
+        self.puts = []
+
+    def put(self, key, data, content_type=None):
+        if self.failing and self.failing in key:
+            raise OSError('store is down')
+        self.puts.append(key)
+        super().put(key, data, content_type)
+
+
+@pytest.fixture
+def images(tmp_path):
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'images' / 'fig.png').write_bytes(PNG)
+    source = open_image_source(str(tmp_path / 'images'))
+    yield source
+    source.close()
+
+
+def publish(tmp_path, store, tutorials, image_source=None, **options):
+    manifest = PublishManifest(str(tmp_path / 'manifest.ndjson'))
+    try:
+        return Publisher(store, manifest, image_source, retries=0, backoff=0, **options).publish(tutorials)
+    finally:
+        manifest.close()
+
+
+def test_rerun_skips_what_the_manifest_has_at_the_same_hash(tmp_path, images):
+    store = FlakyStore(str(tmp_path / 'store'))
+    tutorials = [make_tutorial('a', 'fig.png'), make_tutorial('b', 'fig.png'), make_tutorial('c')]
+    report = publish(tmp_path, store, tutorials, images)
+    assert (report['image']['published'], report['tutorial']['published']) == (1, 3)
+    assert sorted(store.puts) == [IMAGE_KEY, 'tutorials/physics/2025/a.json',
+                                  'tutorials/physics/2025/b.json', 'tutorials/physics/2025/c.json']
+    published = json.loads((tmp_path / 'store' / 'tutorials' / 'physics' / '2025' / 'a.json').read_text())
+    assert published['questions'][0]['questionDetails'][0]['textImages'][0]['src'] == IMAGE_KEY
+
+    store.puts.clear()
+    tutorials = [make_tutorial('a', 'fig.png'), make_tutorial('b', 'fig.png'), make_tutorial('c')]
+    tutorials[2]['questions'][0]['questionDetails'][0]['text'] = 'Edited'
+    report = publish(tmp_path, store, tutorials, images)
+    assert store.puts == ['tutorials/physics/2025/c.json']
+    assert (report['image']['skipped'], report['tutorial']['skipped'], report['tutorial']['published']) == (1, 2, 1)
+
+
+def test_resume_after_a_partial_run_uploads_only_what_failed(tmp_path):
+    tutorials = [make_tutorial(name) for name in ('a', 'b', 'c')]
+    report = publish(tmp_path, FlakyStore(str(tmp_path / 'store'), failing='/b.json'), tutorials)
+    assert (report['tutorial']['published'], report['tutorial']['failed']) == (2, 1)
+    assert report['failures'] == [{'key': 'tutorials/physics/2025/b.json', 'error': 'OSError: store is down'}]
+
+    store = FlakyStore(str(tmp_path / 'store'))
+    report = publish(tmp_path, store, tutorials)
+    assert store.puts == ['tutorials/physics/2025/b.json']
+    assert (report['tutorial']['published'], report['tutorial']['skipped']) == (1, 2)
+
+
+def test_tutorials_wait_for_their_images(tmp_path, images):
+    tutorials = [make_tutorial('a', 'fig.png'), make_tutorial('b')]
+    store = FlakyStore(str(tmp_path / 'store'), failing='images/')
+    report = publish(tmp_path, store, tutorials, images)
+    assert store.puts == ['tutorials/physics/2025/b.json']
+    assert report['image']['failed'] == 1 and report['tutorial']['failed'] == 1
+    assert {'key': 'tutorials/physics/2025/a.json', 'error': 'images not published'} in report['failures']
+
+    store = FlakyStore(str(tmp_path / 'store'))
+    tutorials = [make_tutorial('a', 'fig.png'), make_tutorial('b')]
+    report = publish(tmp_path, store, tutorials, images)
+    assert store.puts == [IMAGE_KEY, 'tutorials/physics/2025/a.json']
+    assert report['failures'] == []
+
+
+def test_images_already_in_the_store_are_not_uploaded(tmp_path, images):
+    store = FlakyStore(str(tmp_path / 'store'))
+    store.put(IMAGE_KEY, PNG)
+    store.puts.clear()
+    report = publish(tmp_path, store, [make_tutorial('a', 'fig.png')], images)
+    assert store.puts == ['tutorials/physics/2025/a.json']
+    assert report['image'] == {'published': 0, 'skipped': 1, 'failed': 0}
+
+
+def test_verify_republishes_objects_missing_from_the_store(tmp_path):
+    store = FlakyStore(str(tmp_path / 'store'))
+    publish(tmp_path, store, [make_tutorial('a')])
+    (tmp_path / 'store' / 'tutorials' / 'physics' / '2025' / 'a.json').unlink()
+    assert publish(tmp_path, store, [make_tutorial('a')])['tutorial']['skipped'] == 1
+    assert publish(tmp_path, store, [make_tutorial('a')], verify=True)['tutorial']['published'] == 1
+
+
+def test_manifest_ignores_a_torn_last_line(tmp_path):
+    path = str(tmp_path / 'manifest.ndjson')
+    manifest = PublishManifest(path)
+    manifest.record('a', 'h1', 'published')
+    manifest.record('b', 'h2', 'failed', error='boom')
+    manifest.record('b', 'h2', 'published')
+    manifest.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "c", "hash": "h3", "sta')
+
+    manifest = PublishManifest(path)
+    assert manifest.is_published('a', 'h1') and manifest.is_published('b', 'h2')
+    assert not manifest.is_published('a', 'other') and 'c' not in manifest.entries
+    # A record after the torn line is not lost with it
+    manifest.record('c', 'h3', 'published')
+    manifest.close()
+    assert PublishManifest(path).is_published('c', 'h3')
+
+
+def test_manifest_compacts_to_one_line_per_key(tmp_path):
+    path = tmp_path / 'manifest.ndjson'
+    manifest = PublishManifest(str(path))
+    for status in ('failed', 'failed', 'published'):
+        manifest.record('a', 'h1', status)
+    manifest.compact()
+    manifest.record('b', 'h2', 'published')
+    manifest.close()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line['key'], line['status']) for line in lines] == [('a', 'published'), ('b', 'published')]
+
+
+def test_object_store_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        ObjectStore()
+    store = FilesystemStore(str(tmp_path))
+    store.put('x/y.json', b'{}')
+    assert store.exists('x/y.json') and (tmp_path / 'x' / 'y.json').read_bytes() == b'{}'
+    assert list((tmp_path / 'x').iterdir()) == [tmp_path / 'x' / 'y.json']
+
+
+def test_cli_exit_status(tmp_path, capsys):
+    (tmp_path / 'a.json').write_text(json.dumps(make_tutorial('a')))
+    args = [str(tmp_path / 'a.json'), '--store', str(tmp_path / 'store'),
+            '--manifest', str(tmp_path / 'manifest.ndjson')]
+    assert main(args) == 0
+    assert main(args) == 0
+    assert '1 already published' in capsys.readouterr().err
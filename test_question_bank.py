@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Question bank: ingest, search, replacement by source file and
+all-or-nothing rollback of a tutorial that cannot be indexed
+"""
+
+import copy
+import json
+
+import pytest
+
+from question_bank import QuestionBank
+from test_md_parser import SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+
+def make_tutorial(tutorial_id, questions=30, seed=0):
+    parser = SophisticatedMarkdownParser()
+    result = parser.parse_markdown_content(generate_paper(questions, seed=seed))
+    tutorial = parser.generate_json(result['examInfo'], result['questions'])
+    tutorial['tutorialId'] = tutorial_id
+    return tutorial
+
+
+def broken(tutorial):
+    """A copy whose last question has no questionId, so indexing fails partway through."""
+    tutorial = copy.deepcopy(tutorial)
+    del tutorial['questions'][-1]['questionId']
+    return tutorial
+
+
+@pytest.fixture(scope='module')
+def tutorial():
+    return make_tutorial('paper_a')
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path / 'bank.sqlite'))
+    yield bank
+    bank.close()
+
+
+def test_ingest_and_search(bank, tutorial):
+    assert bank.ingest_tutorial(tutorial) == 30
+    assert bank.stats()['questions'] == 30
+    stem = tutorial['questions'][0]['questionDetails'][0]['text']
+    word = max(stem.split(), key=len).strip('.,?$')
+    results = bank.search(text=word)
+    assert results and all('snippet' in result for result in results)
+    assert [result['questionId'] for result in bank.search(tutorial_id='paper_a', limit=3)] == ['Q1', 'Q2', 'Q3']
+    subject = tutorial['questions'][0]['subject']
+    assert all(result['subject'] == subject for result in bank.search(subject=subject, limit=100))
+    assert bank.search(text='zzzzunknownword') == []
+
+
+def test_reingesting_a_tutorial_id_replaces_it(bank, tutorial):
+    bank.ingest_tutorial(tutorial)
+    smaller = copy.deepcopy(tutorial)
+    smaller['questions'] = smaller['questions'][:5]
+    bank.ingest_tutorial(smaller)
+    assert bank.stats()['questions'] == 5
+
+
+def test_regenerated_json_replaces_the_copy_from_the_same_file(bank, tmp_path, tutorial):
+    path = tmp_path / 'paper.json'
+    path.write_text(json.dumps(tutorial), encoding='utf-8')
+    assert bank.ingest_json_file(str(path)) == 30
+    assert bank.ingest_json_file(str(path)) is None
+
+    # generate_json stamps a new tutorialId on every run
+    regenerated = {**tutorial, 'tutorialId': 'paper_a_regenerated', 'questions': tutorial['questions'][:10]}
+    path.write_text(json.dumps(regenerated), encoding='utf-8')
+    assert bank.ingest_json_file(str(path)) == 10
+    assert bank.stats()['tutorials'] == 1
+    assert bank.stats()['questions'] == 10
+
+
+def test_failed_ingest_leaves_the_bank_unchanged(tmp_path, tutorial):
+    path = str(tmp_path / 'bank.sqlite')
+    bank = QuestionBank(path, batch_questions=10000)
+    bank.ingest_tutorial(tutorial)
+    bank.flush()
+    other = make_tutorial('paper_b', questions=8, seed=1)
+    # Uncommitted batch writes from before the failure must survive it
+    bank.ingest_tutorial(other)
+    with pytest.raises(KeyError):
+        bank.ingest_tutorial(broken(tutorial))
+    bank.close()
+
+    reopened = QuestionBank(path)
+    assert reopened.stats()['questions'] == 38
+    assert len(reopened.search(tutorial_id='paper_a', limit=100)) == 30
+    reopened.close()
+
+
+def test_markdown_ingest_keeps_its_tutorial_id(bank, tmp_path):
+    path = tmp_path / 'paper.md'
+    path.write_text(generate_paper(12, seed=4), encoding='utf-8')
+    assert bank.ingest_markdown_file(str(path)) == 12
+    assert bank.ingest_markdown_file(str(path)) is None
+    (tutorial_id,) = {result['tutorialId'] for result in bank.search(limit=100)}
+    path.write_text(generate_paper(14, seed=4), encoding='utf-8')
+    assert bank.ingest_markdown_file(str(path)) == 14
+    assert {result['tutorialId'] for result in bank.search(limit=100)} == {tutorial_id}
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Content-addressed question cache: hits, invalidation by edit, parser
+version and configuration, persistence and renumbering
+"""
+
+import test_md_parser
+from test_md_parser import QuestionCache, SophisticatedMarkdownParser
+
+
+def test_question_cache_hits_and_invalidation(tmp_path, synthetic_paper):
+    cache_path = str(tmp_path / 'cache.sqlite')
+    cache = QuestionCache(sqlite_path=cache_path)
+    parser = SophisticatedMarkdownParser(cache=cache)
+    first = parser.parse_markdown_content(synthetic_paper)['questions']
+    assert cache.hits == 0 and cache.misses == len(first)
+
+    assert parser.parse_markdown_content(synthetic_paper)['questions'] == first
+    assert cache.hits == len(first)
+
+    # Editing one question only re-parses that question
+    edited = synthetic_paper.replace('Sol.', 'Sol. Edited.', 1)
+    misses = cache.misses
+    parser.parse_markdown_content(edited)
+    assert cache.misses == misses + 1
+    cache.close()
+
+    # The SQLite file survives; a parser with another symbol table never sees those entries
+    reopened = QuestionCache(sqlite_path=cache_path)
+    assert SophisticatedMarkdownParser(cache=reopened).parse_markdown_content(synthetic_paper)['questions'] == first
+    assert reopened.misses == 0
+    SophisticatedMarkdownParser(cache=reopened, extra_symbols={'\\foo': 'F'}).parse_markdown_content(synthetic_paper)
+    assert reopened.misses == len(first)
+    reopened.close()
+
+
+def test_question_cache_is_namespaced_by_parser_version(monkeypatch):
+    namespace = SophisticatedMarkdownParser().cache_namespace
+    monkeypatch.setattr(test_md_parser, 'PARSER_VERSION', test_md_parser.PARSER_VERSION + '-next')
+    assert SophisticatedMarkdownParser().cache_namespace != namespace
+
+
+def test_question_cache_keys_include_the_format_profile():
+    content = '1. Force (1) a (2) b Ans. (2)'
+    keys = {SophisticatedMarkdownParser(format_profile=profile).question_cache_key(content)
+            for profile in ('jee_main', 'neet', 'generic')}
+    assert len(keys) == 3
+
+
+def test_question_cache_keeps_renumbered_questions():
+    cache = QuestionCache()
+    parser = SophisticatedMarkdownParser(cache=cache)
+    content = '1. Force on a charge (1) a (2) b Ans. (2)\n'
+    first = parser.extract_questions(content)[0]
+    renumbered = parser.extract_questions('0. Intro Ans. (1)\n' + content.replace('1.', '2.', 1))[1]
+    assert cache.hits == 1
+    assert renumbered == {**first, 'questionIndex': '2', 'questionId': 'Q2'}
+
+
+def test_question_cache_lru_evicts_the_oldest_entry():
+    cache = QuestionCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, {'key': key})
+    assert cache.get('a') is None
+    assert cache.get('c') == {'key': 'c'}
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hitRate': 0.5, 'entries': 2}
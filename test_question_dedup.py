@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate index: exact copies across tutorials, rollback of a failed
+update and following the question bank
+"""
+
+import copy
+
+import pytest
+
+from question_bank import QuestionBank
+from question_dedup import DuplicateIndex
+from test_md_parser import SophisticatedMarkdownParser
+from benchmarks.synthetic import generate_paper
+
+
+@pytest.fixture(scope='module')
+def tutorial():
+    parser = SophisticatedMarkdownParser()
+    result = parser.parse_markdown_content(generate_paper(30, seed=0))
+    tutorial = parser.generate_json(result['examInfo'], result['questions'])
+    tutorial['tutorialId'] = 'paper_a'
+    return tutorial
+
+
+def broken(tutorial):
+    """A copy whose last question has no questionId, so indexing fails partway through."""
+    tutorial = copy.deepcopy(tutorial)
+    del tutorial['questions'][-1]['questionId']
+    return tutorial
+
+
+def test_duplicates_across_tutorials(tmp_path, tutorial):
+    index = DuplicateIndex(str(tmp_path / 'dedup.sqlite'))
+    index.add_tutorial('paper_a', tutorial['questions'])
+    pairs = index.add_tutorial('paper_a_copy', tutorial['questions'])
+    # Every indexed question is found again in the copy, as an exact match
+    copies = {a[1]: similarity for a, b, similarity in pairs
+              if (a[0], b[0]) == ('paper_a', 'paper_a_copy') and a[1] == b[1]}
+    assert len(copies) == index.stats()['questions'] // 2
+    assert set(copies.values()) == {1.0}
+    assert all(cluster['size'] >= 2 for cluster in index.clusters())
+    index.close()
+
+
+def test_failed_duplicate_update_keeps_the_previous_copy(tmp_path, tutorial):
+    path = str(tmp_path / 'dedup.sqlite')
+    index = DuplicateIndex(path)
+    index.add_tutorial('paper_a', tutorial['questions'])
+    index.flush()
+    before = index.stats()
+    with pytest.raises(KeyError):
+        index.add_tutorial('paper_a', broken(tutorial)['questions'])
+    assert index.stats() == before
+    index.close()
+    reopened = DuplicateIndex(path)
+    assert reopened.stats() == before
+    reopened.close()
+
+
+def test_rollback_discards_unflushed_updates(tmp_path, tutorial):
+    index = DuplicateIndex(str(tmp_path / 'dedup.sqlite'))
+    index.add_tutorial('paper_a', tutorial['questions'])
+    index.rollback()
+    assert index.stats() == {'tutorials': 0, 'questions': 0, 'pairs': 0}
+    index.close()
+
+
+def test_sync_bank_follows_ingests_and_removals(tmp_path, tutorial):
+    bank = QuestionBank(str(tmp_path / 'bank.sqlite'))
+    bank.ingest_tutorial(tutorial)
+    bank.ingest_tutorial({**tutorial, 'tutorialId': 'paper_a_copy'})
+    bank.flush()
+    index = DuplicateIndex(bank.path)
+    synced = dict(index.sync_bank(bank))
+    assert set(synced) == {'paper_a', 'paper_a_copy'}
+    assert list(index.sync_bank(bank)) == []
+
+    bank.remove_tutorial('paper_a_copy')
+    assert list(index.sync_bank(bank)) == [('paper_a_copy', None)]
+    assert index.stats()['tutorials'] == 1
+    index.close()
+    bank.close()
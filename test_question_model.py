@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Slotted question model: exact dict round-trips and extract_question_models
+"""
+
+import pytest
+
+from question_model import ImageRef, Option, Question, QuestionDetail
+from test_md_parser import SophisticatedMarkdownParser
+
+
+def test_round_trip_of_every_parsed_question(comprehensive_paper, synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    for paper in (comprehensive_paper, synthetic_paper):
+        for question in parser.extract_questions(paper):
+            assert Question.from_dict(question).to_dict() == question
+
+
+def test_round_trip_keeps_flags_and_images():
+    question = {
+        'questionIndex': '7',
+        'questionId': 'Q7',
+        'questionDetails': [{
+            'text': 'Stuck',
+            'textImages': [{'src': 'a.png', 'alt': 'plot', 'type': 'markdown'}],
+            'possibleAnswers': {'A': {'text': 'x', 'image': None}, 'B': {'text': 'y', 'image': 'b.png'}},
+            'correctAnswer': 'B',
+            'correctAnswerText': 'y'
+        }],
+        'subject': 'Physics',
+        'solution': '',
+        'marks': '4',
+        'flags': ['timeBudgetExceeded']
+    }
+    model = Question.from_dict(question)
+    assert model.index == 7 and model.flags == ('timeBudgetExceeded',)
+    assert model.details[0].images == (ImageRef('a.png', 'plot', 'markdown'),)
+    assert model.details[0].options[1] == Option('B', 'y', 'b.png')
+    assert model.to_dict() == question
+    assert 'flags' not in Question.from_dict({**question, 'flags': []}).to_dict()
+
+
+def test_models_share_strings_and_have_no_instance_dict():
+    question = {
+        'questionIndex': '1', 'questionId': 'Q1',
+        'questionDetails': [{'text': 't', 'textImages': [],
+                             'possibleAnswers': {'A': {'text': ''.join(['2', '2']), 'image': None}},
+                             'correctAnswer': 'A', 'correctAnswerText': ''.join(['2', '2'])}],
+        'subject': ''.join(['Phys', 'ics']), 'solution': '', 'marks': '4'
+    }
+    model = Question.from_dict(question)
+    detail = model.details[0]
+    assert detail.correct_answer_text is detail.options[0].text
+    assert model.subject is Question.from_dict(question).subject
+    for instance in (model, detail, detail.options[0]):
+        with pytest.raises(AttributeError):
+            instance.__dict__
+    assert isinstance(detail, QuestionDetail)
+
+
+def test_extract_question_models_matches_extract_questions(synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    questions = parser.extract_questions(synthetic_paper)
+    models = parser.extract_question_models(synthetic_paper)
+    assert all(isinstance(model, Question) for model in models)
+    assert [model.to_dict() for model in models] == questions
+    pooled = parser.extract_question_models(synthetic_paper, workers=2, chunk_size=9, parallel_threshold=1)
+    assert [model.to_dict() for model in pooled] == questions
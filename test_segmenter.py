@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+One-pass question segmenter: the same sections as the old re.split +
+per-section re.search, for str and UTF-8 buffers
+"""
+
+import re
+
+import pytest
+
+from test_md_parser import SophisticatedMarkdownParser
+
+
+def legacy_find_question_matches(content):
+    """find_question_matches before the one-pass segmenter (re.split + re.search per section)."""
+    matches = []
+    sections = re.split(r'^(\d+)\.\s*', content, flags=re.MULTILINE)
+    for i in range(1, len(sections), 2):
+        if i + 1 < len(sections):
+            number, section = sections[i], sections[i + 1]
+            next_question = re.search(r'^(\d+)\.\s*', section, re.MULTILINE)
+            if next_question:
+                section = section[:next_question.start()]
+            section = section.strip()
+            if re.search(r'\([1-4]\)|Ans\.|Sol\.', section):
+                matches.append({'number': number, 'content': section, 'type': 'numbered'})
+    matches.sort(key=lambda match: int(match['number']))
+    return matches
+
+
+EDGE_CASES = [
+    '',
+    'No questions here at all.',
+    '1. Stem only, no markers\n2. Another\n',
+    '1. 2. Nested numbering (1) a (2) b Ans. (1)\n',
+    '3. Out of order (1) a Ans. (1)\n1. First (2) b Ans. (2)\n',
+    '1. Trailing spaces   \n(1) a\n(2) b\nAns. (2)   \n\n\n',
+    '10. Sol. only a solution marker\n11.\n12. Ans. B',
+]
+
+
+@pytest.mark.parametrize('content', EDGE_CASES)
+def test_segmenter_matches_legacy_split_on_edge_cases(content):
+    assert SophisticatedMarkdownParser().find_question_matches(content) == legacy_find_question_matches(content)
+
+
+def test_segmenter_matches_legacy_split_on_papers(comprehensive_paper, synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    for content in (comprehensive_paper, synthetic_paper):
+        assert parser.find_question_matches(content) == legacy_find_question_matches(content)
+
+
+def test_segmenter_on_utf8_buffer_gives_the_same_sections(synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    buffer = synthetic_paper.encode('utf-8')
+    assert parser.find_question_matches(buffer) == parser.find_question_matches(synthetic_paper)
+
+
+def test_spans_record_which_markers_were_seen():
+    content = '1. Stem (1) a (2) b\n2. Ans. B\n3. Sol. worked\n'
+    spans = SophisticatedMarkdownParser().find_question_spans(content)
+    assert [(span.number, span.has_options, span.has_answer, span.has_solution) for span in spans] == [
+        ('1', True, False, False), ('2', False, True, False), ('3', False, False, True)
+    ]
+    assert [content[span.start:span.end] for span in spans] == ['Stem (1) a (2) b', 'Ans. B', 'Sol. worked']
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Per-question span table: every extract_* reads the same fields from the
+table as it finds on its own, and parse_question assembles them
+"""
+
+from test_md_parser import SophisticatedMarkdownParser
+
+
+def test_span_table_feeds_the_same_fields_as_standalone_extraction(comprehensive_paper, synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    for paper in (comprehensive_paper, synthetic_paper):
+        for match in parser.find_question_matches(paper):
+            content = match['content']
+            table = parser.build_span_table(content)
+            assert parser.extract_question_text(content, table) == parser.extract_question_text(content)
+            assert parser.extract_options(content, table) == parser.extract_options(content)
+            assert parser.extract_correct_answer(content, table) == parser.extract_correct_answer(content)
+            assert parser.extract_solution(content, table) == parser.extract_solution(content)
+            assert parser.extract_images(content, table) == parser.extract_images(content)
+            assert parser.extract_marks(content, table) == parser.extract_marks(content)
+
+
+def test_parse_question_fields():
+    content = ('1. A body of mass 2 kg has velocity $v$. Its momentum is\n'
+               '(1) $2v$\n(2) $v$\n(3) $v/2$\n(4) $4v$\n'
+               'Ans. (1)\nSol. $p = mv$ ![graph](fig-1.png)\n')
+    questions = SophisticatedMarkdownParser().extract_questions(content)
+    assert len(questions) == 1
+    question = questions[0]
+    details = question['questionDetails'][0]
+    assert question['questionId'] == 'Q1'
+    assert details['text'] == 'A body of mass 2 kg has velocity $v$. Its momentum is'
+    assert list(details['possibleAnswers']) == ['A', 'B', 'C', 'D']
+    assert details['correctAnswer'] == 'A'
+    assert details['correctAnswerText'] == '$2v$'
+    assert details['textImages'] == [{'src': 'fig-1.png', 'alt': 'graph', 'type': 'markdown'}]
+    assert question['subject'] == 'Physics'
+
+
+def test_answer_and_solution_markers_in_other_forms():
+    parser = SophisticatedMarkdownParser()
+    question = parser.extract_questions('1. Which is a noble gas?\nA) Neon B) Sodium\nCorrect answer is A\n'
+                                        'Sol. Neon has a full shell. 4 marks\n')[0]
+    details = question['questionDetails'][0]
+    assert details['correctAnswer'] == 'A'
+    assert details['correctAnswerText'] == 'Neon'
+    assert question['solution'] == 'Neon has a full shell. 4 marks'
+    assert question['marks'] == '4'
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Streaming parse: iter_questions over a file handle, write_ndjson and the
+CLI's output modes
+"""
+
+import io
+import json
+
+import pytest
+
+from test_md_parser import SophisticatedMarkdownParser, main, write_ndjson
+
+
+def without_id(tutorial):
+    # tutorialId carries the current time in seconds
+    return {key: value for key, value in tutorial.items() if key != 'tutorialId'}
+
+
+@pytest.fixture
+def paper_path(tmp_path, synthetic_paper):
+    path = tmp_path / 'paper.md'
+    path.write_text(synthetic_paper, encoding='utf-8')
+    return path
+
+
+@pytest.mark.parametrize('chunk_size', [1, 37, 4096])
+def test_iter_questions_streams_the_same_questions(synthetic_paper, chunk_size):
+    parser = SophisticatedMarkdownParser()
+    expected = parser.parse_markdown_content(synthetic_paper)['questions']
+    assert list(parser.iter_questions(io.StringIO(synthetic_paper), chunk_size)) == expected
+
+
+def test_iter_questions_yields_before_reading_the_whole_file(synthetic_paper):
+    reads = []
+
+    class Tracked(io.StringIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    parser = SophisticatedMarkdownParser(format_profile='jee_main')
+    first = next(parser.iter_questions(Tracked(synthetic_paper), 1024))
+    assert first['questionId'] == 'Q1'
+    assert len(reads) * 1024 < len(synthetic_paper) / 2
+
+
+def test_iter_questions_on_an_empty_file():
+    assert list(SophisticatedMarkdownParser().iter_questions(io.StringIO(''))) == []
+
+
+def test_write_ndjson_writes_one_question_per_line(paper_path, synthetic_paper):
+    out = io.StringIO()
+    assert write_ndjson(str(paper_path), out) == 60
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == SophisticatedMarkdownParser().parse_markdown_content(
+        synthetic_paper
+    )['questions']
+
+
+def test_cli_writes_tutorial_json_to_stdout(paper_path, synthetic_paper, capsys):
+    main([str(paper_path)])
+    output = capsys.readouterr().out
+    parser = SophisticatedMarkdownParser()
+    result = parser.parse_markdown_content(synthetic_paper)
+    assert without_id(json.loads(output)) == without_id(parser.generate_json(result['examInfo'], result['questions']))
+    assert output.startswith('{\n  "tutorialId"')
+
+    main([str(paper_path), '--compact'])
+    compact = capsys.readouterr().out
+    assert '\n' not in compact.rstrip('\n')
+    assert without_id(json.loads(compact)) == without_id(json.loads(output))
+
+
+def test_cli_streams_ndjson_to_stdout_or_a_file(paper_path, tmp_path, capsys):
+    main([str(paper_path), '--ndjson', '-'])
+    streamed = capsys.readouterr().out.splitlines()
+    assert len(streamed) == 60
+
+    ndjson_path = tmp_path / 'paper.ndjson'
+    main([str(paper_path), '--ndjson', str(ndjson_path)])
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert '60 questions streamed' in captured.err
+    assert ndjson_path.read_text(encoding='utf-8').splitlines() == streamed
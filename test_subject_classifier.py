@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Weighted keyword-trie subject classifier, its false hits and batch modes
+"""
+
+import random
+
+import pytest
+
+from test_md_parser import (
+    DEFAULT_SUBJECT_CLASSIFIER, SUBJECT_KEYWORD_FALSE_HITS, SUBJECT_KEYWORDS, SophisticatedMarkdownParser,
+    SubjectClassifier
+)
+
+KEYWORD_TOKENS = [
+    'math', 'Mathematics', '\\mathrm', '\\mathbb{R}', '\\limits', '\\lim', 'limit', 'database', 'data', 'base',
+    'wave', 'wavelength', 'electromagnetic', 'ATOM', 'atomic', 'force', ' ', '\n', 'x', 'é', 'functional group',
+]
+
+
+def reference_keywords(text, keywords, false_hits=SUBJECT_KEYWORD_FALSE_HITS):
+    """Every keyword occurring in ``text`` outside an occurrence of a false hit, by brute force."""
+    text = text.lower()
+    excluded = []
+    for hit in false_hits:
+        start = text.find(hit)
+        while start >= 0:
+            excluded.append((start, start + len(hit)))
+            start = text.find(hit, start + 1)
+    found = set()
+    for keyword in keywords:
+        start = text.find(keyword)
+        while start >= 0:
+            if not any(low <= start and start + len(keyword) <= high for low, high in excluded):
+                found.add(keyword)
+                break
+            start = text.find(keyword, start + 1)
+    return found
+
+
+def random_texts(count, seed=0, max_tokens=12):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(KEYWORD_TOKENS) for _ in range(rng.randint(0, max_tokens))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('text, subject', [
+    ('electromagnetic wavelength', 'Physics'),
+    ('the mathematics of a circuit', 'Mathematics'),
+    ('Find $\\mathrm{d}x$ and $\\lim\\limits_{x}$ from the database', 'Mixed'),
+    ('\\mathrm{atom}', 'Mixed'),
+    ('A functional group of an organic acid', 'Chemistry'),
+])
+def test_classifier_examples(text, subject):
+    assert DEFAULT_SUBJECT_CLASSIFIER.classify(text)['subject'] == subject
+
+
+def test_classifier_false_hits_do_not_count():
+    scores = DEFAULT_SUBJECT_CLASSIFIER.score('$\\mathbb{R}$ \\limits database')
+    assert not any(scores.values())
+    # The same keywords outside the false hits still count
+    scores = DEFAULT_SUBJECT_CLASSIFIER.score('math limit base')
+    assert scores['Mathematics'] == 2.0 and scores['Chemistry'] == 1.0
+
+
+def test_classifier_matches_brute_force_keywords():
+    classifier = DEFAULT_SUBJECT_CLASSIFIER
+    for text in random_texts(2000, seed=2):
+        assert classifier.score(text) == classifier._scores(reference_keywords(text, classifier.weights)), text
+
+
+def test_classifier_batch_and_buffer_agree_with_score():
+    classifier = DEFAULT_SUBJECT_CLASSIFIER
+    texts = random_texts(300, seed=3)
+    assert classifier.score_many(texts) == [classifier.score(text) for text in texts]
+    for text in texts[:100]:
+        buffer = text.encode('utf-8')
+        for window in (1, 3, 8):
+            assert classifier.score_buffer(buffer, window) == classifier.score(text), (text, window)
+
+
+def test_classify_many_matches_classify():
+    classifier = DEFAULT_SUBJECT_CLASSIFIER
+    texts = random_texts(300, seed=4) + ['', 'force and acid']
+    assert classifier.classify_many(texts) == [classifier.classify(text) for text in texts]
+    assert classifier.classify_many([]) == []
+    parser = SophisticatedMarkdownParser()
+    subjects = [result['subject'] for result in parser.determine_subjects(texts)]
+    assert subjects == [parser.determine_subject(text) for text in texts]
+
+
+def test_custom_keyword_table_and_no_false_hits():
+    classifier = SubjectClassifier({'Biology': {'cell': 2.0, 'cells': 1.0}, 'Physics': {'cell': 1.0}}, false_hits=())
+    assert classifier.classify('Cells divide')['scores'] == {'Biology': 3.0, 'Physics': 1.0}
+    assert classifier.classify('Cells divide')['subject'] == 'Biology'
+    assert SubjectClassifier(SUBJECT_KEYWORDS, false_hits=()).score('\\mathrm')['Mathematics'] == 1.0
+    parser = SophisticatedMarkdownParser(subject_keywords={'Biology': {'cell': 1.0}})
+    assert parser.determine_subject('a cell wall') == 'Biology'
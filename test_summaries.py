@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Paper listings: summarize() reads only a paper's header for its exam info,
+run_summaries() and the --summarize CLI row per paper
+"""
+
+import json
+
+import pytest
+
+from test_md_parser import SophisticatedMarkdownParser, main, run_summaries, summarize_paper_file
+from benchmarks.synthetic import generate_paper
+
+
+def test_summarize_matches_exam_info(tmp_path, comprehensive_paper, synthetic_paper):
+    parser = SophisticatedMarkdownParser()
+    for content in (comprehensive_paper, synthetic_paper):
+        path = tmp_path / 'paper.md'
+        path.write_text(content, encoding='utf-8')
+        assert parser.summarize(str(path)) == parser.extract_exam_info(content)
+
+
+def test_summarize_reads_details_from_the_header_only(tmp_path):
+    parser = SophisticatedMarkdownParser()
+    # Time named only past the header gets the default, but every question is still counted
+    body = generate_paper(40, seed=2).replace('Time: 3 hrs .\n', '')
+    path = tmp_path / 'paper.md'
+    path.write_text(body + '\nTime: 2 hours\n', encoding='utf-8')
+    summary = parser.summarize(str(path), header_bytes=256)
+    assert summary['time'] == '3 hours'
+    assert summary['title'] == parser.extract_exam_info(body)['title']
+    assert summary['totalQuestions'] == parser.count_questions(body) > 0
+    assert parser.summarize(str(path), header_bytes=path.stat().st_size + 1)['time'] == '2 hours'
+
+
+def test_summarize_cuts_the_header_at_a_whole_line(tmp_path):
+    path = tmp_path / 'paper.md'
+    path.write_text('# JEE Main 2023 Paper\nTime: 3 hours\nM.M : 300\n', encoding='utf-8')
+    parser = SophisticatedMarkdownParser()
+    # The title line is cut after "Main 20"; the partial line must not become the title or the year
+    summary = parser.summarize(str(path), header_bytes=16)
+    assert summary['title'] == 'Exam Paper'
+    assert summary['totalQuestions'] == 0
+
+
+def test_summary_rows_record_errors(tmp_path):
+    (tmp_path / 'empty.md').write_bytes(b'')
+    (tmp_path / 'broken.md').write_bytes(b'# Paper\n\xff\xfe\n')
+    empty = summarize_paper_file(str(tmp_path / 'empty.md'))
+    assert empty['error'] is None and empty['totalQuestions'] == 0
+    broken = summarize_paper_file(str(tmp_path / 'broken.md'))
+    assert broken['error'].startswith('UnicodeDecodeError')
+    assert summarize_paper_file(str(tmp_path / 'missing.md'))['error'].startswith('FileNotFoundError')
+
+
+def test_run_summaries_keeps_order_across_a_pool(tmp_path):
+    parser = SophisticatedMarkdownParser()
+    paths, counts = [], []
+    for index in range(6):
+        path = tmp_path / f'paper{index}.md'
+        path.write_text(generate_paper(index + 1, seed=index), encoding='utf-8')
+        paths.append(str(path))
+        counts.append(parser.count_questions(path.read_text(encoding='utf-8')))
+    serial = list(run_summaries(paths, workers=1))
+    assert [row['file'] for row in serial] == paths
+    assert [row['totalQuestions'] for row in serial] == counts
+    assert list(run_summaries(paths, workers=2)) == serial
+
+
+@pytest.mark.parametrize('broken, status', [(False, 0), (True, 1)])
+def test_cli_summarize_writes_one_ndjson_row_per_paper(tmp_path, capsys, broken, status):
+    (tmp_path / 'a.md').write_text(generate_paper(3, seed=1), encoding='utf-8')
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'b.md').write_text(generate_paper(4, seed=2), encoding='utf-8')
+    parser = SophisticatedMarkdownParser()
+    expected = [parser.summarize(str(tmp_path / 'a.md')), parser.summarize(str(tmp_path / 'sub' / 'b.md'))]
+    if broken:
+        (tmp_path / 'c.md').write_bytes(b'\xff')
+    assert main(['--summarize', str(tmp_path), '--workers', '1']) == status
+    captured = capsys.readouterr()
+    rows = [json.loads(line) for line in captured.out.splitlines()]
+    assert [{**row, 'file': None, 'error': None} for row in rows if not row['error']] == [
+        {'file': None, **summary, 'error': None} for summary in expected
+    ]
+    assert len(rows) == 2 + broken
+    assert 'papers summarized' in captured.err
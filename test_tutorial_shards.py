@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Sharded tutorials: shard files with their manifest, and the lazy reader
+that loads only the shards a lookup needs
+"""
+
+import pytest
+
+from test_md_parser import (
+    SHARD_MANIFEST_NAME, ShardedTutorial, SophisticatedMarkdownParser, main, write_tutorial_shards
+)
+from benchmarks.synthetic import generate_paper
+
+
+def without_id(tutorial):
+    # tutorialId carries the current time in seconds
+    return {key: value for key, value in tutorial.items() if key != 'tutorialId'}
+
+
+@pytest.fixture(scope='module')
+def parsed():
+    parser = SophisticatedMarkdownParser()
+    return parser, parser.parse_markdown_content(generate_paper(45, image_rate=0.2, seed=11))
+
+
+@pytest.mark.parametrize('shard_by', ['subject', 7])
+def test_shards_round_trip(tmp_path, parsed, shard_by):
+    parser, result = parsed
+    # Fixed-size shards are written one at a time, so they take a generator
+    questions = result['questions'] if shard_by == 'subject' else iter(result['questions'])
+    manifest = parser.write_shards(str(tmp_path), result['examInfo'], questions, shard_by=shard_by)
+    assert sum(shard['questionCount'] for shard in manifest['shards']) == 45
+
+    tutorial = ShardedTutorial(str(tmp_path / SHARD_MANIFEST_NAME))
+    assert len(tutorial) == 45
+    assert tutorial.exam_info == result['examInfo']
+    assert without_id(tutorial.to_tutorial()) == without_id(parser.generate_json(result['examInfo'], result['questions']))
+
+
+def test_sharded_lookups_open_only_the_shards_they_need(tmp_path, parsed):
+    parser, result = parsed
+    parser.write_shards(str(tmp_path), result['examInfo'], result['questions'], shard_by=10)
+    tutorial = ShardedTutorial(str(tmp_path / SHARD_MANIFEST_NAME), max_open_shards=1)
+    assert tutorial.question('Q23') == result['questions'][22]
+    assert tutorial.question(24) == result['questions'][23]
+    assert tutorial.shards_loaded == 1
+    with pytest.raises(KeyError):
+        tutorial.question('Q99')
+
+    subject = result['questions'][0]['subject']
+    expected = [question for question in result['questions'] if question['subject'] == subject]
+    assert list(tutorial.questions(subject)) == expected
+
+
+def test_tampered_shard_fails_its_checksum(tmp_path, parsed):
+    parser, result = parsed
+    manifest = parser.write_shards(str(tmp_path), result['examInfo'], result['questions'])
+    shard = manifest['shards'][0]
+    path = tmp_path / shard['path']
+    path.write_bytes(path.read_bytes().replace(b'"questionId"', b'"questionID"', 1))
+    with pytest.raises(ValueError):
+        ShardedTutorial(str(tmp_path / SHARD_MANIFEST_NAME)).load_shard(shard['name'])
+    assert ShardedTutorial(str(tmp_path / SHARD_MANIFEST_NAME), verify=False).load_shard(shard['name'])
+
+
+def test_shards_from_a_custom_opener(tmp_path, parsed):
+    parser, result = parsed
+    parser.write_shards(str(tmp_path), result['examInfo'], result['questions'])
+    opened = []
+
+    def opener(path):
+        opened.append(path)
+        return (tmp_path / path).read_bytes()
+
+    tutorial = ShardedTutorial(str(tmp_path / SHARD_MANIFEST_NAME), opener=opener)
+    assert len(list(tutorial.questions())) == 45
+    assert sorted(opened) == sorted(shard['path'] for shard in tutorial.manifest['shards'])
+
+
+def test_subjects_with_colliding_file_names_get_their_own_shards(tmp_path):
+    subjects = ['Physics', 'physics', 'PHYSICS!', 'Manifest', '???', 'physics 2']
+    questions = [{'subject': subject, 'questionIndex': str(index)} for index, subject in enumerate(subjects, 1)]
+    manifest = write_tutorial_shards(str(tmp_path), {'tutorialId': 'T'}, questions)
+    paths = [shard['path'] for shard in manifest['shards']]
+    assert len(set(paths)) == len(subjects)
+    assert SHARD_MANIFEST_NAME not in paths
+    tutorial = ShardedTutorial(str(tmp_path / SHARD_MANIFEST_NAME))
+    assert tutorial.to_tutorial()['questions'] == questions
+
+
+@pytest.mark.parametrize('shard_by', ['subject', '5'])
+def test_cli_writes_shards(tmp_path, synthetic_paper, shard_by):
+    path = tmp_path / 'paper.md'
+    path.write_text(synthetic_paper, encoding='utf-8')
+    main([str(path), '--shards', str(tmp_path / 'shards'), '--shard-by', shard_by])
+    tutorial = ShardedTutorial(str(tmp_path / 'shards' / SHARD_MANIFEST_NAME))
+    questions = sorted(tutorial.questions(), key=lambda question: int(question['questionIndex']))
+    assert questions == SophisticatedMarkdownParser().parse_markdown_file(str(path))['questions']
+    if shard_by == '5':
+        assert len(tutorial.manifest['shards']) == 12
+    with pytest.raises(SystemExit):
+        main([str(path), '--shards', str(tmp_path / 'shards'), '--shard-by', '0'])